@@ -0,0 +1,174 @@
+"""Copy of the rule base parser as it was before the single-pass parser, the baseline of parse_benchmark.
+
+Every line is matched against the rule, measurement and 4-tuple patterns in turn (re.fullmatch with the
+pattern strings) until one fits; kept as it was, apart from the class names being local to this module.
+"""
+
+import re
+
+from fuzzy_fuss.fuzz.fuzzy_rule import Rule, Atom
+from fuzzy_fuss.fuzz.fuzzy_rule_base import RuleBase
+from fuzzy_fuss.fuzz.fuzzy4tuple import Fuzzy4Tuple
+from fuzzy_fuss.fuzz.fuzzy_variable import FuzzyVariable
+
+
+class ParsedObj(object):
+    PATTERN = None
+
+    @classmethod
+    def match(cls, line, silent=True, **kwargs):
+        if not cls.PATTERN:
+            raise NotImplementedError(f"Pattern for class {cls.__name__} not specified")
+
+        m = re.fullmatch(cls.PATTERN, line.replace('the ', ''), re.IGNORECASE)
+        if not m:
+            if silent:
+                return
+            raise RuntimeError(f"Failed to match '{line}' for class {cls.__name__} (pattern: {cls.PATTERN})")
+
+        return cls.process_match(m, **kwargs)
+
+    @classmethod
+    def process_match(cls, m, **kwargs) -> tuple:
+        raise NotImplementedError("Match processing method not implemented")
+
+
+class ParsedObjDict(dict):
+    def __init__(self, object_type: type(ParsedObj), item_type=None, **kwargs):
+        super().__init__(**kwargs)
+        self._object_type = object_type
+        self._item_type = item_type or object_type
+
+    def __setitem__(self, key, value):
+        if not isinstance(value, self._item_type):
+            raise TypeError(f"__setitem__: value not an instance of {self._item_type} "
+                            f"(got {value} of type {type(value)})")
+
+        super().__setitem__(key, value)
+
+    def parse(self, line, **kwargs):
+        match = self._object_type.match(line)
+
+        if match:
+            self[match[0]] = match[1]
+            return True  # success
+        return False     # fail
+
+
+class ParsedAtom(Atom, ParsedObj):
+    PATTERN = r"\s*(?P<variable>\w+) (?:is|will be) (?P<value>\w+)\s*"
+
+    @classmethod
+    def process_match(cls, m, **kwargs):
+        vals = tuple(m.groupdict().values())
+        return cls(vals)
+
+    @staticmethod
+    def match_all(line, split_pattern=None):
+        split_pattern = split_pattern or " and | or | AND | OR"
+        props = re.split(split_pattern, line, re.IGNORECASE)
+        return tuple(ParsedAtom.match(prop, silent=False) for prop in props)
+
+
+class ParsedMeasurement(ParsedAtom):
+    PATTERN = r"\s*(?P<variable>\w+)\s*=\s*(?P<value>-{0,1}\d+(\.\d*){0,1})\s*"
+
+    def __new__(cls, vals):
+        try:
+            vals_new = (vals[0], float(vals[1]))
+        except ValueError:
+            raise ValueError(f"Cannot convert {vals[1]} to float")
+
+        return super(ParsedMeasurement, cls).__new__(ParsedMeasurement, vals_new)
+
+
+class ParsedRule(Rule, ParsedObj):
+    PATTERN = r"(?P<name>Rule\s*\d+):{0,1} if (?P<propositions>.+) then (?P<conclusion>.+)"
+
+    @classmethod
+    def process_match(cls, m, **kwargs):
+        md = m.groupdict()
+
+        prop = ParsedAtom.match_all(md['propositions'])
+        connectives = [s.strip(' ') for s in re.findall(r" and | or ", md['propositions'].lower())]
+        conclusion = ParsedAtom.match(md['conclusion'], silent=False)
+
+        rule = cls(name=md['name'], prop_atoms=prop, prop_connectives=connectives, conclusion=conclusion)
+        return rule.name, rule
+
+
+class ParsedTuple(ParsedObj, Fuzzy4Tuple):
+    PATTERN = r"\s*(?P<value>\w+)\s+(?P<numbers>[-\s\d.]+)\s*"
+
+    @classmethod
+    def process_match(cls, m, **kwargs) -> tuple:
+        value = m.group('value')
+
+        nums = re.split(r'\s+', m.group('numbers').strip(' '))
+
+        if len(nums) != 4:
+            raise ValueError(f"Matching a 4-tuple '{m.string}': expected 4 values, got {len(nums)}")
+
+        try:
+            num_nums = tuple(map(float, nums))
+        except ValueError:
+            raise ValueError(f"Invalid format for numerical values encountered in '{nums}'")
+
+        return value, cls(*num_nums, value_name=value)
+
+
+class ParsedVariable(ParsedObjDict, FuzzyVariable):
+    def __init__(self, name, **kwargs):
+        super(ParsedVariable, self).__init__(name=name, object_type=ParsedTuple, **kwargs)
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+
+
+class RuleBaseParser(object):
+    def __init__(self):
+        self.rules = ParsedObjDict(ParsedRule)
+        self.variables = {}
+        self.measurements = ParsedObjDict(ParsedMeasurement, float)
+        self.name = None
+        self._current_name = None
+
+    def parse(self, filename):
+        self.name = None
+        self.variables[None] = ParsedVariable(None)
+
+        with open(filename) as f:
+            for line in f:
+                line = line.strip('\n')
+                if not line:
+                    continue
+
+                if self.rules.parse(line) or self.measurements.parse(line) \
+                        or self.variables[self._current_name].parse(line):
+                    continue
+
+                if not re.fullmatch(r'\s*\w+\s*', line):
+                    raise RuntimeError(f"Failed to match line: {line}")
+
+                line = line.strip(' ')
+
+                if not self.name:
+                    self.name = line
+                else:
+                    self.variables[line] = ParsedVariable(line)
+                    self._current_name = line
+
+        if len(self.variables[None]):
+            raise RuntimeError(f"Encountered 4-tuples for unspecified variables: {dict(self.variables[None].items())}")
+        self.variables.pop(None)
+
+        self._current_name = None
+
+        return self.make_rule_base(), self.measurements
+
+    def make_rule_base(self):
+        rulebase = RuleBase(self.name, self.variables)
+        for rule in self.rules.values():
+            rulebase.add_rule(rule)
+
+        return rulebase
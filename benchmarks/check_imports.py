@@ -0,0 +1,71 @@
+"""Check that the inference modules import without the plotting and DataFrame libraries, and time the import.
+
+Each module is imported in a fresh interpreter; the check fails (exit status 1) if any of them loads one of the
+FORBIDDEN modules.
+
+    python -m benchmarks.check_imports
+"""
+
+import sys
+import json
+import subprocess
+
+# modules needed for inference, which must only load NumPy
+MODULES = (
+    'fuzzy_fuss.fuzz.func',
+    'fuzzy_fuss.fuzz.fuzzy_set',
+    'fuzzy_fuss.fuzz.fuzzy4tuple',
+    'fuzzy_fuss.fuzz.fuzzy_variable',
+    'fuzzy_fuss.fuzz.fuzzy_set_array',
+    'fuzzy_fuss.fuzz.fuzzy_rule',
+    'fuzzy_fuss.fuzz.fuzzy_rule_base',
+    'fuzzy_fuss.fuzz.compiled_rule_base',
+    'fuzzy_fuss.fuzz.incremental_evaluator',
+    'fuzzy_fuss.fuzz.parallel',
+    'fuzzy_fuss.fuzz.inference_server',
+    'fuzzy_fuss.rbs.rule_base_parser',
+    'fuzzy_fuss.rbs.binary_rule_base',
+    'fuzzy_fuss.rbs.reloadable_rule_base',
+)
+
+FORBIDDEN = ('matplotlib', 'pandas', 'scipy')
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps(dict(elapsed=elapsed, modules=sorted(sys.modules))))
+"""
+
+
+def probe(module):
+    """Import time of the module in a fresh interpreter, and the top-level packages it loaded"""
+
+    result = subprocess.run([sys.executable, '-c', PROBE.format(module=module)], capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    output = json.loads(result.stdout)
+    return output['elapsed'], sorted(set(name.partition('.')[0] for name in output['modules']))
+
+
+def check(modules=MODULES, stream=sys.stdout):
+    failed = []
+    for module in modules:
+        elapsed, packages = probe(module)
+        loaded = [name for name in FORBIDDEN if name in packages]
+        print(f"{module:<40} {elapsed * 1e3:>8.1f} ms  {'loads ' + ', '.join(loaded) if loaded else 'ok'}",
+              file=stream)
+        if loaded:
+            failed.append(module)
+
+    return failed
+
+
+if __name__ == '__main__':
+    failures = check(sys.argv[1:] or MODULES)
+    if failures:
+        print(f"{len(failures)} modules load {' / '.join(FORBIDDEN)} at import time: {', '.join(failures)}",
+              file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,62 @@
+"""Synthetic rule bases of arbitrary size, for benchmarking without external data."""
+
+import numpy as np
+from itertools import product
+
+
+def term_names(n_terms):
+    return [f"t{i}" for i in range(n_terms)]
+
+
+def partition(n_terms, low=0., high=100.):
+    """4-tuples (a, b, alpha, beta) of trapezoids evenly partitioning [low, high]"""
+
+    step = (high - low) / n_terms
+    return [(low + (i + 0.25) * step, low + (i + 0.75) * step, step / 2, step / 2) for i in range(n_terms)]
+
+
+def generate_text(n_rules, n_inputs=2, n_terms=5, atoms_per_rule=2, connectives=('and', 'or'), seed=0):
+    """Text of a rule base with 'n_rules' random rules over 'n_inputs' input variables and one output 'out'"""
+
+    rng = np.random.default_rng(seed)
+    inputs = [f"x{i}" for i in range(n_inputs)]
+    terms = term_names(n_terms)
+    atoms_per_rule = min(atoms_per_rule, n_inputs)
+
+    lines = ["SyntheticRuleBase", ""]
+    for r in range(n_rules):
+        variables = rng.choice(inputs, size=atoms_per_rule, replace=False)
+        atoms = [f"{var} is {terms[rng.integers(n_terms)]}" for var in variables]
+        prop = atoms[0]
+        for atom in atoms[1:]:
+            prop += f" {connectives[rng.integers(len(connectives))]} {atom}"
+        lines.append(f"Rule {r + 1}: If {prop} then out is {terms[rng.integers(n_terms)]}")
+    lines.append("")
+
+    for var in inputs + ['out']:
+        lines.extend([var, ""])
+        lines.extend(f"{term} {a:g} {b:g} {alpha:g} {beta:g}" for term, (a, b, alpha, beta)
+                     in zip(terms, partition(n_terms)))
+        lines.append("")
+
+    lines.extend(f"{var} = {value:g}" for var, value in zip(inputs, rng.uniform(0, 100, n_inputs).round(1)))
+
+    return '\n'.join(lines) + '\n'
+
+
+def write(filename, *args, **kwargs):
+    with open(filename, 'w') as f:
+        f.write(generate_text(*args, **kwargs))
+    return filename
+
+
+def full_grid_text(n_inputs=2, n_terms=5, seed=0):
+    """Rule base with one AND-rule for every combination of input terms"""
+
+    rng = np.random.default_rng(seed)
+    terms = term_names(n_terms)
+    combos = list(product(terms, repeat=n_inputs))
+    text = generate_text(0, n_inputs=n_inputs, n_terms=n_terms, seed=seed).split('\n')
+    rules = [f"Rule {r + 1}: If " + ' and '.join(f"x{i} is {t}" for i, t in enumerate(combo)) +
+             f" then out is {terms[rng.integers(n_terms)]}" for r, combo in enumerate(combos)]
+    return '\n'.join(text[:2] + rules + text[2:])
@@ -0,0 +1,43 @@
+"""Parsing time of a large synthetic rule base: single-pass parser vs. the previous parser (baseline_parser), which
+tries every line pattern in turn."""
+
+import os
+import time
+import tempfile
+from argparse import ArgumentParser
+
+from fuzzy_fuss.rbs.rule_base_parser import RuleBaseParser
+
+from benchmarks import generate, baseline_parser
+
+
+def best_time(func, *args, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser("Rule base parsing benchmark")
+    parser.add_argument('--rules', type=int, default=50000, help="Number of rules in the generated rule base")
+    parser.add_argument('--inputs', type=int, default=4, help="Number of input variables")
+    parser.add_argument('--terms', type=int, default=7, help="Number of terms per variable")
+    parser.add_argument('--atoms', type=int, default=3, help="Number of atoms in the premise of every rule")
+    parser.add_argument('--repeat', type=int, default=3, help="Number of timed runs (the best one is reported)")
+    args = parser.parse_args()
+
+    fd, filename = tempfile.mkstemp(suffix='.txt')
+    os.close(fd)
+    try:
+        generate.write(filename, args.rules, n_inputs=args.inputs, n_terms=args.terms, atoms_per_rule=args.atoms)
+
+        single_pass = best_time(lambda fn: RuleBaseParser().parse(fn), filename, repeat=args.repeat)
+        baseline = best_time(lambda fn: baseline_parser.RuleBaseParser().parse(fn), filename, repeat=args.repeat)
+    finally:
+        os.remove(filename)
+
+    print(f"{args.rules} rules: single-pass {single_pass:.3f} s, previous parser {baseline:.3f} s "
+          f"(speed-up {baseline / single_pass:.1f}x)")
@@ -0,0 +1,231 @@
+"""Benchmark suite of the hot paths: membership functions, defuzzification, rule weights, evaluation and parsing.
+
+Results are printed and, with --output, written as JSON (with the commit and versions they were measured on);
+--compare prints the ratio of every timing to the one of a previous results file.
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --quick --compare results.json
+"""
+
+import os
+import sys
+import json
+import time
+import timeit
+import tempfile
+import platform
+import subprocess
+import numpy as np
+from argparse import ArgumentParser
+
+from fuzzy_fuss.fuzz.func import Trapezoid
+from fuzzy_fuss.fuzz.fuzzy_rule import Rule, Atom
+from fuzzy_fuss.fuzz.fuzzy_set import FuzzySet
+from fuzzy_fuss.fuzz.defuzzifier import Defuzzifier
+from fuzzy_fuss.fuzz.fuzzy_variable import FuzzyVariable
+from fuzzy_fuss.fuzz.fuzzy_set_array import FuzzySetArray
+from fuzzy_fuss.rbs.rule_base_parser import RuleBaseParser
+
+from benchmarks import generate
+
+
+# cases register themselves here: name -> (group, function returning (parameter dicts, setup function))
+CASES = {}
+
+# generated files of the parsing cases, removed after the run
+_files = []
+
+
+def case(group):
+    def register(func):
+        CASES[func.__name__] = (group, func)
+        return func
+    return register
+
+
+def parsed(*args, **kwargs):
+    """Rule base and measurements parsed from a generated text"""
+
+    fd, filename = tempfile.mkstemp(suffix='.txt')
+    os.close(fd)
+    try:
+        return RuleBaseParser().parse(generate.write(filename, *args, **kwargs))
+    finally:
+        os.remove(filename)
+
+
+@case('membership')
+def trapezoid_call(quick):
+    def setup(size):
+        trapezoid = Trapezoid(20., 40., 60., 80.)
+        x = 50. if size == 1 else np.random.default_rng(0).uniform(0, 100, size)
+        return lambda: trapezoid(x)
+
+    return [dict(size=size) for size in ((1, 1000) if quick else (1, 100, 10000, 1000000))], setup
+
+
+@case('membership')
+def variable_memberships(quick):
+    def setup(terms, size):
+        variable = FuzzyVariable('x')
+        for i in range(terms):
+            variable[f"t{i}"] = FuzzySet(Trapezoid(*(100. * (i + np.array([-1., -.5, .5, 1.])) / terms)))
+        x = np.random.default_rng(0).uniform(0, 100, size)
+        out = np.empty((size, terms))
+        return lambda: variable.memberships(x, out=out)
+
+    sizes = (1000,) if quick else (100, 10000, 1000000)
+    return [dict(terms=terms, size=size) for terms in (5, 50) for size in sizes], setup
+
+
+@case('membership')
+def set_array_evaluate(quick):
+    def setup(size):
+        rng = np.random.default_rng(0)
+        a = rng.uniform(0, 100, size)
+        fsets = FuzzySetArray(a, a + rng.uniform(0, 20, size), rng.uniform(0, 10, size), rng.uniform(0, 10, size))
+        x, out = rng.uniform(-10, 140, size), np.empty(size)
+        return lambda: fsets.evaluate(x, out=out)
+
+    return [dict(size=size) for size in ((1000,) if quick else (100, 10000, 1000000))], setup
+
+
+@case('defuzzification')
+def defuzzify(quick):
+    def setup(method, grid_size):
+        func = FuzzySet(Trapezoid(10., 30., 50., 90.)).cut(0.7).membership_function
+        return lambda: Defuzzifier.defuzzify(func, grid_size=grid_size, method=method)
+
+    grids = (0.1,) if quick else (1, 0.1, 0.01)
+    return [dict(method=method, grid_size=grid) for method in Defuzzifier.METHODS for grid in grids], setup
+
+
+@case('rules')
+def choose_weight(quick):
+    def setup(atoms, batch):
+        rng = np.random.default_rng(0)
+        rule = Rule('chain', tuple(Atom((f"x{i}", 't0')) for i in range(atoms)),
+                    [('and', 'or')[i % 3 == 2] for i in range(atoms - 1)], Atom(('out', 't0')))
+        weights = list(rng.uniform(size=atoms) if batch == 1 else rng.uniform(size=(atoms, batch)))
+        return lambda: rule.choose_weight(weights)
+
+    sizes = (10, 100) if quick else (10, 100, 1000)
+    return [dict(atoms=atoms, batch=batch) for atoms in sizes for batch in (1, 1000)], setup
+
+
+@case('inference')
+def evaluate(quick):
+    def setup(rules, inputs):
+        rule_base, measurements = parsed(rules, n_inputs=inputs, n_terms=7, atoms_per_rule=min(inputs, 3))
+        return lambda: rule_base.evaluate(measurements, grid_size=0.1)
+
+    sizes = ((100, 2), (1000, 4)) if quick else \
+        [(rules, 4) for rules in (100, 1000, 10000)] + [(1000, inputs) for inputs in (2, 8, 16)]
+    return [dict(rules=rules, inputs=inputs) for rules, inputs in sizes], setup
+
+
+@case('inference')
+def evaluate_batch(quick):
+    def setup(rules, batch):
+        rule_base, _ = parsed(rules, n_inputs=4, n_terms=7, atoms_per_rule=3)
+        rng = np.random.default_rng(0)
+        measurements = {name: rng.uniform(0, 100, batch) for name in rule_base.input_names}
+        return lambda: rule_base.evaluate_batch(measurements, grid_size=0.1)
+
+    sizes = ((100, 1000),) if quick else ((100, 1000), (1000, 1000), (1000, 100000))
+    return [dict(rules=rules, batch=batch) for rules, batch in sizes], setup
+
+
+@case('parsing')
+def parse(quick):
+    def setup(rules):
+        fd, filename = tempfile.mkstemp(suffix='.txt')
+        os.close(fd)
+        generate.write(filename, rules, n_inputs=4, n_terms=7, atoms_per_rule=3)
+        _files.append(filename)
+        return lambda: RuleBaseParser().parse(filename)
+
+    return [dict(rules=rules) for rules in ((1000,) if quick else (1000, 10000, 50000))], setup
+
+
+def measure(func, repeat=5, min_time=0.2):
+    """Best and mean time of a call: the number of calls per run is chosen to last at least 'min_time'"""
+
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time or number >= 10 ** 6:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+
+    times = [t / number for t in timer.repeat(repeat, number)]
+    return dict(best=min(times), mean=float(np.mean(times)), number=number, repeat=repeat)
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+
+    return dict(commit=commit, timestamp=time.strftime('%Y-%m-%dT%H:%M:%S'), python=platform.python_version(),
+                numpy=np.__version__, machine=platform.machine(), system=platform.system())
+
+
+def result_key(result):
+    return result['case'], tuple(sorted(result['params'].items()))
+
+
+def run(names=None, quick=False, repeat=5, min_time=0.2, stream=sys.stdout):
+    results = []
+    try:
+        for name, (group, func) in CASES.items():
+            if names and not any(n in (name, group) for n in names):
+                continue
+
+            all_params, setup = func(quick)
+            for params in all_params:
+                timing = measure(setup(**params), repeat=repeat, min_time=min_time)
+                results.append(dict(case=name, group=group, params=params, **timing))
+                label = ', '.join(f"{k}={v}" for k, v in params.items())
+                print(f"{name:<16} {label:<40} {timing['best'] * 1e6:>14.2f} us", file=stream)
+    finally:
+        while _files:
+            os.remove(_files.pop())
+
+    return results
+
+
+def compare(results, baseline, stream=sys.stdout):
+    """Print the ratio of every timing to the baseline one (> 1 is slower)"""
+
+    previous = {result_key(r): r for r in baseline['results']}
+    print(f"\nCompared with {baseline['environment'].get('commit') or 'baseline'}:", file=stream)
+    for result in results:
+        old = previous.get(result_key(result))
+        if old:
+            label = ', '.join(f"{k}={v}" for k, v in result['params'].items())
+            print(f"{result['case']:<16} {label:<40} {result['best'] / old['best']:>8.2f}x", file=stream)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser("Benchmark suite")
+    parser.add_argument('cases', nargs='*', help=f"Cases or groups to run (default: all): {', '.join(CASES)}")
+    parser.add_argument('--quick', action='store_true', default=False, help="Run only the small sizes")
+    parser.add_argument('--repeat', type=int, default=5, help="Number of timed runs (the best one is reported)")
+    parser.add_argument('--min-time', type=float, default=0.2, help="Minimum duration of a timed run, in seconds")
+    parser.add_argument('--output', type=str, default=None, help="JSON file to write the results to")
+    parser.add_argument('--compare', type=str, default=None, help="JSON results file to compare with")
+    args = parser.parse_args()
+
+    results = run(args.cases, quick=args.quick, repeat=args.repeat, min_time=args.min_time)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(dict(environment=environment(), quick=args.quick, results=results), f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
@@ -28,12 +28,10 @@ i = parsed_args.var_indices
 var1 = var_names[i[0]]
 var2 = var_names[i[1]]
 
-results = np.zeros(2*(parsed_args.var_grid_size, ))
+grid1, grid2 = np.meshgrid(meas_grid[var1], meas_grid[var2], indexing='ij')
 
-print(f"Performing exhaustive check for {results.size} values...")
-for i1, val1 in enumerate(meas_grid[var1]):
-    for i2, val2 in enumerate(meas_grid[var2]):
-        results[i1, i2] = ruleset.evaluate(measurements={**measurements, var1: val1, var2: val2})
+print(f"Performing exhaustive check for {grid1.size} values...")
+results = ruleset.evaluate_batch({**measurements, var1: grid1.ravel(), var2: grid2.ravel()}).reshape(grid1.shape)
 print("Done")
 
 print(f"NaN values: {100*np.isnan(results).sum()/results.size:g}% of the grid")
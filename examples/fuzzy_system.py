@@ -1,7 +1,16 @@
+import csv
+import sys
+import json
+import time
+import numpy as np
+from itertools import islice
 from argparse import ArgumentParser
 
 from fuzzy_fuss.rbs.rule_base_parser import RuleBaseParser
+from fuzzy_fuss.rbs.binary_rule_base import BinaryRuleBase
+from fuzzy_fuss.rbs.reloadable_rule_base import ReloadableRuleBase
 from fuzzy_fuss.fuzz.defuzzifier import Defuzzifier
+from fuzzy_fuss.fuzz.inference_server import InferenceServer
 
 
 parser = ArgumentParser("Fuzzy rule-based reasoning system")
@@ -10,19 +19,170 @@ parser.add_argument('--composition', choices=['max-min', 'max-product'], default
                     help="Type of composition to be used when evaluating a fuzzy rule")
 parser.add_argument('--grid-size', type=float, default=0.1,
                     help="Size of grid used for defuzzification (the finer the grid, the more accurate the results)")
+parser.add_argument('--exact', action='store_true', default=False,
+                    help="Defuzzify analytically (exact, ignores the grid size)")
+parser.add_argument('--tolerance', type=float, default=None,
+                    help="Sample the conclusion adaptively down to this tolerance instead of on a grid (not with "
+                         "--stream or --serve, which evaluate on the grid or exactly)")
 parser.add_argument('--defuzz', choices=Defuzzifier.METHODS, default='coa',
                     help="Defuzzification method code")
 parser.add_argument('--plot', action='store_true', dest='plot', default=False,
                     help="Display plots of the parsed variables, rules, and the reasoning")
+parser.add_argument('--cache', action='store_true', default=False,
+                    help="Load the rule base from a binary cache next to the file ('<filename>.fzrb'), "
+                         "rewritten whenever the file changes")
+parser.add_argument('--profile', action='store_true', default=False,
+                    help="Print the time spent in every stage of the evaluation (to stderr)")
+parser.add_argument('--stream', type=str, default=None, metavar='INPUT',
+                    help="Evaluate measurement rows read from a CSV (with a header) or NDJSON file ('-' for stdin) "
+                         "instead of the measurements in the rule base file; variables missing from the input "
+                         "default to the latter")
+parser.add_argument('--input-format', choices=['csv', 'ndjson'], default=None,
+                    help="Format of the streamed input (default: from the file extension, CSV for stdin)")
+parser.add_argument('--output', type=str, default='-',
+                    help="File to write the streamed results to ('-' for stdout), in the format of the input")
+parser.add_argument('--chunk-size', type=int, default=10000,
+                    help="Number of streamed rows evaluated at once")
+parser.add_argument('--serve', type=str, default=None, metavar='[HOST:]PORT',
+                    help="Serve evaluations over TCP (line-delimited JSON, see InferenceServer) instead of evaluating "
+                         "the measurements in the rule base file; variables missing from a request default to the "
+                         "latter")
+parser.add_argument('--max-batch', type=int, default=256,
+                    help="Largest number of served requests evaluated at once")
+parser.add_argument('--max-delay', type=float, default=2.,
+                    help="Longest time a served request waits for others to be batched with, in milliseconds")
+parser.add_argument('--watch', type=float, default=None, metavar='SECONDS',
+                    help="Reload the served rule base file when it changes, checking every SECONDS")
+
+
+def read_chunks(stream, input_format, chunk_size, defaults):
+    """Yield dicts of measurement arrays, 'chunk_size' rows at a time"""
+
+    if input_format == 'csv':
+        reader = csv.reader(stream)
+        header = [name.strip() for name in next(reader)]
+        while True:
+            rows, lines, read = [], [], 0
+            for row in islice(reader, chunk_size):
+                read += 1
+                if not row:  # blank line
+                    continue
+                if len(row) != len(header):
+                    raise ValueError(f"Line {reader.line_num}: expected {len(header)} values ({', '.join(header)}), "
+                                     f"got {len(row)}")
+                rows.append(row)
+                lines.append(reader.line_num)
+            if not read:
+                return
+            if not rows:
+                continue
+
+            try:
+                columns = np.array(rows, dtype=float).T.copy()
+            except ValueError:  # find the first invalid value (an empty one included)
+                for line, row in zip(lines, rows):
+                    for name, value in zip(header, row):
+                        try:
+                            float(value)
+                        except ValueError:
+                            raise ValueError(f"Line {line}: invalid value of variable {name}: {value!r}") from None
+                raise
+            yield {**defaults, **dict(zip(header, columns))}
+
+    else:
+        lines = (line for line in stream if line.strip())
+        while True:
+            records = [json.loads(line) for line in islice(lines, chunk_size)]
+            if not records:
+                return
+            names = set(defaults).union(*records)
+            yield {name: np.array([r.get(name, defaults.get(name, np.nan)) for r in records], dtype=float)
+                   for name in names}
+
+
+def write_chunk(stream, output_format, results: dict):
+    """Write the rows of the result arrays (by conclusion name)"""
+
+    rows = zip(*results.values())
+    if output_format == 'csv':
+        stream.write(''.join(','.join('' if np.isnan(v) else f"{v:.12g}" for v in row) + '\n' for row in rows))
+    else:
+        stream.write(''.join(json.dumps({name: None if np.isnan(v) else float(v) for name, v in zip(results, row)})
+                             + '\n' for row in rows))
+
+
+def evaluate_stream(ruleset, measurements, args):
+    evaluator = ruleset.compile() if hasattr(ruleset, 'compile') else ruleset  # loaded from a binary: compiled
+
+    input_format = args.input_format or ('ndjson' if args.stream.endswith(('.ndjson', '.jsonl')) else 'csv')
+    conclusions = list(ruleset.conclusion_names)
+    kwargs = dict(composition=args.composition, grid_size=args.grid_size, defuzz_method=args.defuzz,
+                  exact=args.exact)
+
+    source = sys.stdin if args.stream == '-' else open(args.stream, newline='')
+    target = sys.stdout if args.output == '-' else open(args.output, 'w')
+
+    start = time.perf_counter()
+    rows = 0
+    try:
+        if input_format == 'csv':
+            target.write(','.join(conclusions) + '\n')
+
+        for chunk in read_chunks(source, input_format, args.chunk_size, dict(measurements)):
+            results = evaluator.evaluate_batch(chunk, **kwargs)
+            if not isinstance(results, dict):
+                results = {conclusions[0]: results}
+            write_chunk(target, input_format, results)
+            rows += len(results[conclusions[0]])
+    finally:
+        for stream in (source, target):
+            if stream not in (sys.stdin, sys.stdout):
+                stream.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Evaluated {rows} rows in {elapsed:.3f} s ({rows / elapsed if elapsed else 0:.0f} rows/s)", file=sys.stderr)
 
 
 if __name__ == '__main__':
     parsed_args = parser.parse_args()
+    if parsed_args.tolerance is not None and (parsed_args.stream or parsed_args.serve):
+        # batches are defuzzified on the grid or exactly: adaptive sampling is for a single evaluation
+        parser.error("--tolerance cannot be used with --stream or --serve (use --grid-size or --exact)")
     kwargs = dict(composition=parsed_args.composition,
                   grid_size=parsed_args.grid_size)
 
-    # parse the fuzzy rule base from the file
-    ruleset, measurements = RuleBaseParser().parse(parsed_args.filename)
+    # parse the fuzzy rule base from the file (the compiled plan is enough for streaming and serving)
+    if parsed_args.cache:
+        ruleset, measurements = BinaryRuleBase.load_cached(parsed_args.filename,
+                                                           compiled=bool(parsed_args.stream or parsed_args.serve))
+    else:
+        ruleset, measurements = RuleBaseParser().parse(parsed_args.filename)
+
+    if parsed_args.stream:
+        # evaluate the rule base with the streamed measurements
+        try:
+            evaluate_stream(ruleset, measurements, parsed_args)
+        except ValueError as e:  # invalid input
+            sys.exit(f"{parsed_args.stream}: {e}")
+        sys.exit()
+
+    if parsed_args.serve:
+        # serve evaluations with the rule base until interrupted
+        host, _, port = parsed_args.serve.rpartition(':')
+        if parsed_args.watch:
+            ruleset = ReloadableRuleBase(
+                parsed_args.filename, compiled=True,
+                on_reload=lambda version: print(f"Reloaded '{parsed_args.filename}' (version {version.number})",
+                                                file=sys.stderr),
+                on_error=lambda error: print(f"Reload failed, serving the previous version: {error}",
+                                             file=sys.stderr))
+            ruleset.start(parsed_args.watch)
+        server = InferenceServer(ruleset, max_batch=parsed_args.max_batch, max_delay=parsed_args.max_delay / 1e3,
+                                 defaults=measurements, composition=parsed_args.composition,
+                                 grid_size=parsed_args.grid_size, defuzz_method=parsed_args.defuzz,
+                                 exact=parsed_args.exact)
+        server.run(host or '127.0.0.1', int(port))
+        sys.exit()
 
     if parsed_args.plot:
         # plot parsed fuzzy variables
@@ -32,12 +192,23 @@ if __name__ == '__main__':
         # plot parsed rules
         ruleset.plot_rules(measurements=measurements, shade=0.1, composition=parsed_args.composition)
 
+    if parsed_args.profile:
+        ruleset.profile()
+
     # evaluate the rule base with the measurements
     crisp_val = ruleset.evaluate(measurements, composition=parsed_args.composition, grid_size=parsed_args.grid_size,
-                                 defuzz_method=parsed_args.defuzz)
-    print(f"Defuzzified conclusion ('{ruleset.conclusion_names[0]}'): {crisp_val:g}")
+                                 defuzz_method=parsed_args.defuzz, exact=parsed_args.exact,
+                                 tolerance=parsed_args.tolerance)
+    if isinstance(crisp_val, dict):
+        for name, value in crisp_val.items():
+            print(f"Defuzzified conclusion ('{name}'): {value:g}")
+    else:
+        print(f"Defuzzified conclusion ('{ruleset.conclusion_names[0]}'): {crisp_val:g}")
 
-    if parsed_args.plot:
-        # plot the evaluation procedure
+    if parsed_args.profile:
+        print(ruleset.stats, file=sys.stderr)
+
+    if parsed_args.plot and not isinstance(crisp_val, dict) and not ruleset.tsk_outputs:
+        # plot the evaluation procedure (of a single output concluded on by fuzzy sets)
         weights = ruleset.compute_weights(measurements)
         ruleset.plot_eval(weights, composition=parsed_args.composition, crisp_conclusion=crisp_val)
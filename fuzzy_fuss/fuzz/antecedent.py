@@ -0,0 +1,247 @@
+import numpy as np
+from functools import reduce
+from itertools import product
+from operator import itemgetter, mul
+
+
+class Antecedent(object):
+    """Operator tree of a rule antecedent, compiled once; calling it with the degrees of the atoms of the rule
+    (in order of appearance, scalars or arrays) returns the weight of the rule.
+
+    Nodes are NumPy ufuncs - minimum (and), maximum (or), complement (not) and power (hedges) - so a weight is a
+    walk over the tree with no other work per call, for scalars and batches alike. The tree is also stored as a
+    postfix program of (opcode, argument) pairs (see to_program).
+    """
+
+    ATOM, NOT, HEDGE, AND, OR = range(5)
+    HEDGES = {'very': 2., 'extremely': 3., 'somewhat': .5}
+    # groups of a node beyond which it is left unindexed (a single empty group), as the AND of k ORs of n atoms
+    # has n ** k groups
+    MAX_GROUPS = 256
+
+    def __call__(self, degrees):
+        raise NotImplementedError("Operator not implemented")
+
+    def groups(self, atoms):
+        """OR-ed groups of atoms (given per leaf) of which all must have non-zero degrees for a non-zero weight.
+
+        An empty group means the weight may be non-zero whatever the degrees (as under a negation, or for more than
+        MAX_GROUPS groups).
+        """
+        raise NotImplementedError("Operator not implemented")
+
+    def connectives(self):
+        """Connectives between the atoms if the antecedent is a plain chain of them ('and' binding stronger than
+        'or'), otherwise None"""
+        return None
+
+    def to_program(self, atoms):
+        """Postfix program (opcode, argument): the argument of an atom is taken from 'atoms' (given per leaf), of a
+        hedge it is the power, and of 'and' / 'or' the number of operands"""
+
+        program = []
+        self._emit(program, atoms)
+        return program
+
+    def _emit(self, program, atoms):
+        raise NotImplementedError("Operator not implemented")
+
+    @staticmethod
+    def from_program(ops, args):
+        """Operator tree of a postfix program; the leaves are numbered in order, whatever the atom arguments"""
+
+        stack, leaves = [], 0
+        for op, arg in zip(ops, args):
+            if op == Antecedent.ATOM:
+                stack.append(Operand(leaves))
+                leaves += 1
+            elif op == Antecedent.NOT:
+                stack.append(Not(stack.pop()))
+            elif op == Antecedent.HEDGE:
+                stack.append(Hedge(stack.pop(), arg))
+            elif op in (Antecedent.AND, Antecedent.OR):
+                operands = stack[len(stack) - int(arg):]
+                del stack[len(stack) - int(arg):]
+                stack.append((And if op == Antecedent.AND else Or).of(operands))
+            else:
+                raise ValueError(f"Unknown antecedent opcode: {op}")
+
+        if len(stack) != 1:
+            raise ValueError(f"Invalid antecedent program (left {len(stack)} operands)")
+        return stack[0]
+
+    @staticmethod
+    def run_program(ops, args, degrees):
+        """Evaluate a postfix program directly, the atom arguments indexing 'degrees'"""
+
+        stack = []
+        for op, arg in zip(ops.tolist(), args.tolist()):
+            if op == Antecedent.ATOM:
+                stack.append(degrees[int(arg)])
+            elif op == Antecedent.NOT:
+                stack.append(np.subtract(1., stack.pop()))
+            elif op == Antecedent.HEDGE:
+                stack.append(np.power(stack.pop(), arg))
+            else:
+                operands = stack[len(stack) - int(arg):]
+                del stack[len(stack) - int(arg):]
+                stack.append(reduce(np.minimum if op == Antecedent.AND else np.maximum, operands))
+
+        return stack[0]
+
+    @staticmethod
+    def from_connectives(connectives):
+        """Antecedent of a chain of atoms joined by 'and' / 'or' ('and' binding stronger than 'or')"""
+
+        groups = [[Operand(0)]]
+        for i, conn in enumerate(connectives, 1):
+            if conn == 'or':
+                groups.append([Operand(i)])
+            else:
+                groups[-1].append(Operand(i))
+
+        return Or.of([And.of(group) for group in groups])
+
+    def format(self, atoms):
+        """Text of the antecedent with the given labels of the leaves"""
+        raise NotImplementedError("Operator not implemented")
+
+
+class Operand(Antecedent):
+    def __init__(self, index):
+        self.index = index
+
+    def __call__(self, degrees):
+        return degrees[self.index]
+
+    def groups(self, atoms):
+        return [(atoms[self.index],)]
+
+    def connectives(self):
+        return [] if self.index == 0 else None
+
+    def _emit(self, program, atoms):
+        program.append((self.ATOM, atoms[self.index]))
+
+    def format(self, atoms):
+        return str(atoms[self.index])
+
+
+class Not(Antecedent):
+    def __init__(self, operand):
+        self.operand = operand
+
+    def __call__(self, degrees):
+        return np.subtract(1., self.operand(degrees))
+
+    def groups(self, atoms):
+        return [()]
+
+    def _emit(self, program, atoms):
+        self.operand._emit(program, atoms)
+        program.append((self.NOT, 0.))
+
+    def format(self, atoms):
+        text = self.operand.format(atoms)
+        return f"NOT ({text})" if isinstance(self.operand, (And, Or)) else f"NOT {text}"
+
+
+class Hedge(Antecedent):
+    def __init__(self, operand, power):
+        self.operand = operand
+        self.power = float(power)
+
+    def __call__(self, degrees):
+        return np.power(self.operand(degrees), self.power)
+
+    def groups(self, atoms):
+        return self.operand.groups(atoms) if self.power > 0 else [()]
+
+    def _emit(self, program, atoms):
+        self.operand._emit(program, atoms)
+        program.append((self.HEDGE, self.power))
+
+    def format(self, atoms):
+        names = [name for name, power in self.HEDGES.items() if power == self.power]
+        text = self.operand.format(atoms)
+        return f"{names[0].upper() if names else f'POWER {self.power:g}'} " \
+               f"{f'({text})' if isinstance(self.operand, (And, Or)) else text}"
+
+
+class _Reduction(Antecedent):
+    OPCODE = None
+    REDUCE = None
+    CONNECTIVE = ''
+
+    def __init__(self, operands):
+        self.operands = tuple(operands)
+
+        # operands all atoms: gathered by a single itemgetter call
+        indices = [operand.index for operand in self.operands if isinstance(operand, Operand)]
+        self._gather = itemgetter(*indices) if len(indices) == len(self.operands) > 1 else None
+
+    @classmethod
+    def of(cls, operands):
+        """Node of the operands, with nested nodes of the same kind merged; a single operand is returned as is"""
+
+        flat = []
+        for operand in operands:
+            flat.extend(operand.operands if type(operand) is cls else (operand,))
+
+        return flat[0] if len(flat) == 1 else cls(flat)
+
+    def __call__(self, degrees):
+        if self._gather is not None:
+            return reduce(self.REDUCE, self._gather(degrees))
+        return reduce(self.REDUCE, (operand(degrees) for operand in self.operands))
+
+    def _emit(self, program, atoms):
+        for operand in self.operands:
+            operand._emit(program, atoms)
+        program.append((self.OPCODE, float(len(self.operands))))
+
+    def format(self, atoms):
+        texts = [f"({operand.format(atoms)})" if isinstance(operand, _Reduction) else operand.format(atoms)
+                 for operand in self.operands]
+        return f" {self.CONNECTIVE.upper()} ".join(texts)
+
+
+class And(_Reduction):
+    OPCODE = Antecedent.AND
+    REDUCE = np.minimum
+    CONNECTIVE = 'and'
+
+    def groups(self, atoms):
+        operand_groups = [operand.groups(atoms) for operand in self.operands]
+        if reduce(mul, map(len, operand_groups), 1) > self.MAX_GROUPS:
+            return [()]
+        return [sum(groups, ()) for groups in product(*operand_groups)]
+
+    def connectives(self):
+        if all(isinstance(operand, Operand) and operand.index == i for i, operand in enumerate(self.operands)):
+            return ['and'] * (len(self.operands) - 1)
+        return None
+
+
+class Or(_Reduction):
+    OPCODE = Antecedent.OR
+    REDUCE = np.maximum
+    CONNECTIVE = 'or'
+
+    def groups(self, atoms):
+        groups = [group for operand in self.operands for group in operand.groups(atoms)]
+        return groups if len(groups) <= self.MAX_GROUPS else [()]
+
+    def connectives(self):
+        connectives, start = [], 0
+        for operand in self.operands:
+            indices = [o.index for o in operand.operands if isinstance(o, Operand)] if isinstance(operand, And) \
+                else [operand.index] if isinstance(operand, Operand) else []
+            if not indices or indices != list(range(start, start + len(indices))) or \
+                    (isinstance(operand, And) and len(indices) != len(operand.operands)):
+                return None
+
+            connectives.extend((['or'] if start else []) + ['and'] * (len(indices) - 1))
+            start += len(indices)
+
+        return connectives
@@ -0,0 +1,215 @@
+import numpy as np
+
+from fuzzy_fuss.fuzz.func import Trapezoid, Triangle
+from fuzzy_fuss.fuzz.antecedent import Antecedent
+from fuzzy_fuss.fuzz.defuzzifier import Defuzzifier
+from fuzzy_fuss.fuzz.fuzzy_rule import LinearConclusion
+from fuzzy_fuss.fuzz.fuzzy_rule_base import RuleBase
+
+
+class CompiledRuleBase(object):
+    """Immutable, array-based inference plan of a RuleBase.
+
+    All fuzzy sets are stored as rows of trapezoid parameter matrices (a, b, c, d). Every rule antecedent is
+    pre-parsed into OR-groups of AND-ed atoms, kept as a padded matrix of set indices, so that evaluation is a
+    handful of array operations without any dict lookups or object construction. Antecedents with parentheses,
+    negations or hedges are kept as postfix programs (see Antecedent.to_program) run over the degree table.
+    Linear conclusions of Takagi-Sugeno rules are rows of a coefficient matrix over the inputs (and a constant).
+    """
+
+    def __init__(self, rule_base: RuleBase):
+        rules = list(rule_base)
+        variables = rule_base.variables
+
+        self.name = rule_base.name
+        self.rule_names = tuple(rule.name for rule in rules)
+        self.conclusion_names = tuple(sorted(set(rule.conclusion[0] for rule in rules)))
+        self.rule_outputs = np.array([self.conclusion_names.index(rule.conclusion[0]) for rule in rules], dtype=int)
+
+        set_index = {}
+        for rule in rules:
+            for atom in rule.prop_atoms:
+                set_index.setdefault(tuple(atom), len(set_index))
+
+        linear = [r for r, rule in enumerate(rules) if isinstance(rule.conclusion, LinearConclusion)]
+        self.input_names = tuple(sorted(set(var for var, _ in set_index).union(
+            *(rules[r].conclusion.input_names for r in linear))))
+        self.set_names = tuple(set_index)
+        self.set_params = self._stack_params([variables[var][val] for var, val in self.set_names])
+        self.set_inputs = np.array([self.input_names.index(var) for var, _ in self.set_names], dtype=int)
+
+        conclusion_index = {}
+        for rule in rules:
+            if not isinstance(rule.conclusion, LinearConclusion):
+                conclusion_index.setdefault(tuple(rule.conclusion), len(conclusion_index))
+
+        self.conclusion_set_names = tuple(conclusion_index)
+        self.conclusion_params = self._stack_params([variables[var][val] for var, val in self.conclusion_set_names])
+        self.rule_conclusions = np.array([conclusion_index.get(tuple(rule.conclusion), -1) for rule in rules],
+                                         dtype=int)
+
+        # linear conclusions: one row per Takagi-Sugeno rule, a coefficient per input then the constant term
+        self.tsk_outputs = tuple(sorted(set(rules[r].conclusion[0] for r in linear)))
+        self.tsk_rules = np.array(linear, dtype=int)
+        self.tsk_coefficients = np.zeros((len(linear), len(self.input_names) + 1))
+        for row, r in zip(self.tsk_coefficients, linear):
+            for name, coefficient in rules[r].conclusion.coefficients.items():
+                row[self.input_names.index(name) if name else -1] = coefficient
+
+        ones = len(self.set_names)  # index of an all-ones row padding the shorter groups
+
+        # connective tree of each rule: a tuple of OR-ed groups, each a tuple of AND-ed set indices
+        # (a placeholder for the rules evaluated by a program)
+        rule_groups = [((ones,),) if rule.prop_connectives is None else
+                       tuple(map(tuple, rule.group([set_index[tuple(atom)] for atom in rule.prop_atoms])))
+                       for rule in rules]
+
+        programs = [(r, rule.antecedent.to_program([set_index[tuple(atom)] for atom in rule.prop_atoms]))
+                    for r, rule in enumerate(rules) if rule.prop_connectives is None]
+        self.program_rules = np.array([r for r, _ in programs], dtype=int)
+        self.program_starts = np.cumsum([0] + [len(program) for _, program in programs]).astype(int)
+        self.program_ops = np.array([op for _, program in programs for op, _ in program], dtype=np.int8)
+        self.program_args = np.array([arg for _, program in programs for _, arg in program], dtype=float)
+
+        groups = [group for groups in rule_groups for group in groups]
+        width = max(len(group) for group in groups)
+
+        self.group_atoms = np.full((len(groups), width), ones, dtype=int)
+        for i, group in enumerate(groups):
+            self.group_atoms[i, :len(group)] = group
+        self.rule_group_starts = np.cumsum([0] + [len(g) for g in rule_groups[:-1]]).astype(int)
+
+        for value in vars(self).values():
+            if isinstance(value, np.ndarray):
+                value.setflags(write=False)
+        self._frozen = True
+
+    @classmethod
+    def from_state(cls, state: dict):
+        """Compiled rule base with the given attributes (as in vars() of another one), without a RuleBase"""
+
+        compiled = cls.__new__(cls)
+        compiled.__setstate__({**state, '_frozen': True})
+        return compiled
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        for value in state.values():
+            if isinstance(value, np.ndarray):
+                value.setflags(write=False)
+
+    def __setattr__(self, key, value):
+        if getattr(self, '_frozen', False):
+            raise AttributeError(f"{type(self).__name__} is immutable")
+        super().__setattr__(key, value)
+
+    def __repr__(self):
+        return f"Compiled rule base '{self.name}' with {len(self.input_names)} inputs, " \
+               f"{len(self.set_names)} antecedent sets and {len(self.rule_names)} rules"
+
+    @staticmethod
+    def _stack_params(fuzzy_sets):
+        params = []
+        for fset in fuzzy_sets:
+            mf = fset.membership_function
+            if not isinstance(mf, (Trapezoid, Triangle)):
+                raise TypeError(f"Cannot compile a fuzzy set with membership function of type {type(mf)} "
+                                f"({fset.variable_name}: {fset.value_name})")
+            params.append(mf.params)
+
+        return np.array(params, dtype=float).reshape(-1, 4)
+
+    def group_by_conclusion(self):
+        """Indices of the rules concluding on each variable, by variable name (all rules for a single output)"""
+
+        if len(self.conclusion_names) == 1:
+            return {self.conclusion_names[0]: slice(None)}
+
+        return {name: np.flatnonzero(self.rule_outputs == i) for i, name in enumerate(self.conclusion_names)}
+
+    def _inputs(self, measurements):
+        batch = RuleBase.as_batch(measurements)
+
+        try:
+            return np.stack([batch[name] for name in self.input_names])
+        except KeyError as e:
+            raise ValueError(f"Missing data for variable {e.args[0]}")
+
+    def fuzzify(self, inputs):
+        """Membership degrees of all antecedent sets (sets x batch), given inputs (variables x batch)"""
+
+        a, b, c, d = (p[:, None] for p in self.set_params.T)
+        return Trapezoid.evaluate_params(inputs[self.set_inputs], a, b, c, d)
+
+    def compute_weights(self, measurements):
+        """Rule weights (rules x batch) in the order of 'rule_names'"""
+
+        return self._weights(self._inputs(measurements))
+
+    def _weights(self, inputs):
+        degrees = self.fuzzify(inputs)
+        degrees = np.vstack([degrees, np.ones((1, degrees.shape[1]))])
+
+        group_weights = degrees[self.group_atoms].min(axis=1)
+        weights = np.maximum.reduceat(group_weights, self.rule_group_starts, axis=0)
+
+        starts = self.program_starts.tolist()
+        for r, start, stop in zip(self.program_rules.tolist(), starts, starts[1:]):
+            weights[r] = Antecedent.run_program(self.program_ops[start:stop], self.program_args[start:stop], degrees)
+
+        return weights
+
+    def conclusion_memberships(self, xdata, rules=slice(None)):
+        """Conclusion set of each rule (or of the selected rules) sampled on the grid (rules x grid)"""
+
+        a, b, c, d = (p[:, None] for p in self.conclusion_params[self.rule_conclusions[rules]].T)
+        return Trapezoid.evaluate_params(xdata[None, :], a, b, c, d)
+
+    def evaluate_batch(self, measurements, grid_size=1, defuzz_method='coa', composition='max-min', chunk_size=None,
+                       exact=False):
+        """Crisp conclusions (or a dict of them by variable name for several outputs), see RuleBase.evaluate_batch"""
+
+        inputs = self._inputs(measurements)
+        weights = self._weights(inputs)
+
+        results = {}
+        for name, rules in self.group_by_conclusion().items():
+            if name in self.tsk_outputs:  # weighted average of the linear outputs
+                rows = np.searchsorted(self.tsk_rules, np.arange(len(self.rule_names))[rules])
+                results[name] = RuleBase.tsk_average(weights[rules], self._tsk_values(rows, inputs))
+                continue
+
+            params = self.conclusion_params[self.rule_conclusions[rules]]
+
+            if exact:
+                results[name] = Defuzzifier.defuzzify_trapezoids(params, weights[rules], composition=composition,
+                                                                 method=defuzz_method)
+                continue
+
+            xdata = np.arange(params[:, 0].min(), params[:, 3].max(), grid_size)
+            results[name] = Defuzzifier.defuzzify_aggregate(xdata, self.conclusion_memberships(xdata, rules),
+                                                            weights[rules], composition=composition,
+                                                            method=defuzz_method, chunk_size=chunk_size)
+
+        return results if len(results) > 1 else results.popitem()[1]
+
+    def _tsk_values(self, rows, inputs):
+        """Linear functions of the Takagi-Sugeno rules (rows of tsk_coefficients) for a batch of inputs, summed term
+        by term as LinearConclusion does - the constant, then the inputs by name (the order of input_names) - for
+        the same rounding"""
+
+        coefficients = self.tsk_coefficients[rows]
+        values = np.repeat(coefficients[:, -1:], inputs.shape[1], axis=1)
+        for j in range(len(self.input_names)):
+            if coefficients[:, j].any():
+                values += coefficients[:, j:j + 1] * inputs[j]
+
+        return values
+
+    def evaluate(self, measurements: dict, grid_size=1, defuzz_method='coa', composition='max-min', exact=False):
+        results = self.evaluate_batch(measurements, grid_size=grid_size, defuzz_method=defuzz_method,
+                                      composition=composition, exact=exact)
+
+        if isinstance(results, dict):
+            return {name: None if np.isnan(crisp[0]) else crisp[0] for name, crisp in results.items()}
+        return None if np.isnan(results[0]) else results[0]
@@ -1,23 +1,149 @@
 import numpy as np
 
+from fuzzy_fuss.fuzz import piecewise
 from fuzzy_fuss.fuzz.func import Func
 
 
 class Defuzzifier(object):
     METHODS = ('coa', 'som', 'lom', 'mom')
+    COMPOSITIONS = ('max-min', 'max-product')
+    BATCH_CHUNK_ELEMENTS = 2 ** 22  # max. size of the (batch rows x grid points) aggregate held in memory at once
+    ADAPTIVE_INTERVALS = 32  # initial number of intervals of the adaptive sampling
+    LINEARITY_EPS = 1e-9  # deviation from linear at an interval midpoint below which it is not refined
 
     @staticmethod
-    def defuzzify(func: Func, grid_size=1, method='coa'):
+    def defuzzify(func: Func, grid_size=1, method='coa', exact=False, tolerance=None, stats=None):
+        """Defuzzify a function sampled on a grid, or - with 'exact' - analytically from its breakpoints.
+
+        With a 'tolerance' instead of a grid size, the function is sampled adaptively (see generate_adaptive_data)
+        and the samples are defuzzified as a piecewise-linear function. 'stats' (an EvaluationStats) records the
+        sampling as a separate stage, with the number of samples.
+        """
+
         if not isinstance(func, Func):
             raise TypeError(f"Argument is not a Func object (got {type(func)})")
 
+        if exact:
+            return Defuzzifier.defuzzify_exact(*piecewise.restrict(*func.breakpoints, *func.support), method=method)
+
+        method = method.lower()
+
+        if method in Defuzzifier.METHODS:
+            if tolerance is not None:
+                xdata, ydata = Defuzzifier.generate_adaptive_data(func, tolerance)
+                reduce = getattr(Defuzzifier, f'_defuzzify_exact_{method}')
+            else:
+                xdata, ydata = Defuzzifier.generate_data(func, grid_size)
+                reduce = getattr(Defuzzifier, f'_defuzzify_{method}')
+
+            if stats is not None:
+                stats.lap('sampling', samples=len(xdata))
+            return reduce(xdata, ydata)
+        else:
+            raise ValueError(f"Unknown defuzzification method code: {method}")
+
+    @staticmethod
+    def defuzzify_exact(xdata, ydata, method='coa'):
+        """Defuzzify a piecewise-linear function given by its breakpoints, integrating segment by segment"""
+
+        method = method.lower()
+
+        if method in Defuzzifier.METHODS:
+            return getattr(Defuzzifier, f'_defuzzify_exact_{method}')(np.asarray(xdata), np.asarray(ydata))
+        else:
+            raise ValueError(f"Unknown defuzzification method code: {method}")
+
+    @staticmethod
+    def defuzzify_trapezoids(params, weights, composition='max-min', method='coa'):
+        """Exact defuzzification of max-aggregated trapezoids (rows of 'params': a, b, c, d) cut at 'weights'.
+
+        'weights' holds one weight per trapezoid, or a (trapezoids x batch) array; in the latter case an array
+        of crisp values is returned, with NaN where the area is zero for 'coa'. Rules concluding on the same set
+        are collapsed first: only the largest weight per distinct trapezoid matters to the aggregate.
+        """
+
+        if composition not in Defuzzifier.COMPOSITIONS:
+            raise ValueError(f"Unknown composition method: {composition}")
+
+        params, sets = np.unique(np.asarray(params, dtype=float).reshape(-1, 4), axis=0, return_inverse=True)
+        weights = np.asarray(weights, dtype=float)
+        set_weights = np.zeros((len(params),) + weights.shape[1:])
+        np.maximum.at(set_weights, sets.ravel(), weights)
+
+        if weights.ndim == 1:
+            return Defuzzifier._defuzzify_trapezoids(params, set_weights, composition, method)
+
+        # one envelope per distinct column of set weights
+        columns, inverse = np.unique(set_weights, axis=1, return_inverse=True)
+        results = np.empty(columns.shape[1])
+        for i, column in enumerate(columns.T):
+            try:
+                results[i] = Defuzzifier._defuzzify_trapezoids(params, column, composition, method)
+            except ZeroDivisionError:
+                results[i] = np.nan
+        return results[inverse.ravel()]
+
+    @staticmethod
+    def _defuzzify_trapezoids(params, weights, composition, method):
+        # zero function over the whole support, so that non-firing rules still define the output range
+        functions = [(np.array([params[:, 0].min(), params[:, 3].max()]), np.zeros(2))]
+        for (a, b, c, d), w in zip(params, weights):
+            if w <= 0:
+                continue
+            if composition == 'max-min':
+                functions.append(piecewise.trapezoid(a, b, c, d, height=min(w, 1.)))
+            else:
+                xs, ys = piecewise.trapezoid(a, b, c, d)
+                functions.append((xs, w * ys))
+
+        return Defuzzifier.defuzzify_exact(*piecewise.envelope(functions), method=method)
+
+    @staticmethod
+    def defuzzify_batch(xdata, ydata, method='coa'):
+        """Defuzzify a batch of functions sampled on a common grid (one function per row of ydata)"""
+
         method = method.lower()
 
         if method in Defuzzifier.METHODS:
-            return getattr(Defuzzifier, f'_defuzzify_{method}')(*Defuzzifier.generate_data(func, grid_size))
+            return getattr(Defuzzifier, f'_defuzzify_batch_{method}')(np.asarray(xdata), np.atleast_2d(ydata))
         else:
             raise ValueError(f"Unknown defuzzification method code: {method}")
 
+    @staticmethod
+    def defuzzify_aggregate(xdata, memberships, weights, composition='max-min', method='coa', chunk_size=None):
+        """Defuzzify a batch of aggregated, cut conclusions.
+
+        'memberships' holds the conclusion of each rule sampled on 'xdata' (rules x grid) and 'weights' the
+        rule weights for each batch row (rules x batch). Returns an array of crisp values (one per batch row).
+        """
+
+        if composition not in Defuzzifier.COMPOSITIONS:
+            raise ValueError(f"Unknown composition method: {composition}")
+
+        size = weights.shape[1]
+        chunk_size = chunk_size or max(1, Defuzzifier.BATCH_CHUNK_ELEMENTS // max(len(xdata), 1))
+
+        results = np.empty(size)
+        for start in range(0, size, chunk_size):
+            chunk = slice(start, start + chunk_size)
+            aggregate = Defuzzifier._aggregate(memberships, weights[:, chunk], composition)
+            results[chunk] = Defuzzifier.defuzzify_batch(xdata, aggregate, method=method)
+
+        return results
+
+    @staticmethod
+    def _aggregate(memberships, weights, composition):
+        aggregate = np.zeros((weights.shape[1], memberships.shape[1]))
+        partial = np.empty_like(aggregate)
+        for w, mf in zip(weights, memberships):
+            if composition == 'max-min':
+                np.minimum(w[:, None], mf[None, :], out=partial)
+            else:
+                np.multiply(w[:, None], mf[None, :], out=partial)
+            np.maximum(aggregate, partial, out=aggregate)
+
+        return aggregate
+
     @staticmethod
     def _defuzzify_coa(xdata, ydata):
         """Calculate centroid of area"""
@@ -48,6 +174,124 @@ class Defuzzifier(object):
         ydata = func(xdata)
         return xdata, ydata
 
+    @staticmethod
+    def generate_adaptive_data(func, tolerance):
+        """Samples of a function over its support, refined only where it is not linear between them.
+
+        Sampling starts from a coarse uniform grid merged with the known feature points of the function (see
+        _seed_points), so that features narrower than the grid are not missed. Intervals whose midpoint deviates
+        from the line through their ends are then halved until no interval is split or all of them are narrower
+        than 'tolerance'. Linear pieces stay coarse; for a piecewise-linear function every breakpoint is a sample,
+        for other functions the support edges of the operands of unions / intersections are.
+        """
+
+        if tolerance <= 0:
+            raise ValueError(f"Tolerance must be positive (got {tolerance})")
+
+        low, high = func.support
+        xdata = np.linspace(low, high, Defuzzifier.ADAPTIVE_INTERVALS + 1)
+        points = Defuzzifier._seed_points(func)
+        xdata = np.unique(np.concatenate([xdata, points[(points > low) & (points < high)]]))
+        ydata = np.broadcast_to(func(xdata), xdata.shape).astype(float)
+        candidates = np.arange(len(xdata) - 1)
+
+        while candidates.size:
+            candidates = candidates[xdata[candidates + 1] - xdata[candidates] > tolerance]
+            xmid = (xdata[candidates] + xdata[candidates + 1]) / 2
+            ymid = np.broadcast_to(func(xmid), xmid.shape)
+
+            split = np.abs(ymid - (ydata[candidates] + ydata[candidates + 1]) / 2) > Defuzzifier.LINEARITY_EPS
+            candidates = candidates[split]
+            xdata = np.insert(xdata, candidates + 1, xmid[split])
+            ydata = np.insert(ydata, candidates + 1, ymid[split])
+
+            # both halves of every split interval are checked in the next round
+            shifted = candidates + np.arange(len(candidates))
+            candidates = np.sort(np.concatenate([shifted, shifted + 1]))
+
+        return xdata, ydata
+
+    @staticmethod
+    def _seed_points(func):
+        """Breakpoints of a piecewise-linear function; otherwise those (or the support edges) of the operands of a
+        union / intersection, recursively, or the support edges"""
+
+        bp = func._get_breakpoints()
+        if bp is not None:
+            return np.asarray(bp[0], dtype=float)
+
+        operands = getattr(func, 'operands', None)
+        if operands:
+            return np.concatenate([Defuzzifier._seed_points(operand) for operand in operands])
+
+        try:
+            return np.asarray(func.support, dtype=float)
+        except NotImplementedError:
+            return np.empty(0)
+
     @staticmethod
     def _get_max_range(xdata, ydata):
-        return xdata[np.where(ydata == ydata.max())]
\ No newline at end of file
+        return xdata[np.where(ydata == ydata.max())]
+
+    @staticmethod
+    def _get_max_mask(ydata):
+        return ydata == ydata.max(axis=1, keepdims=True)
+
+    @staticmethod
+    def _defuzzify_batch_coa(xdata, ydata):
+        # row-wise sums (rather than a matrix product) give the same result however the batch is chunked
+        area = ydata.sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(area > 0, (ydata * xdata).sum(axis=1) / area, np.nan)
+
+    @staticmethod
+    def _defuzzify_batch_som(xdata, ydata):
+        return xdata[Defuzzifier._get_max_mask(ydata).argmax(axis=1)]
+
+    @staticmethod
+    def _defuzzify_batch_lom(xdata, ydata):
+        mask = Defuzzifier._get_max_mask(ydata)
+        return xdata[mask.shape[1] - 1 - mask[:, ::-1].argmax(axis=1)]
+
+    @staticmethod
+    def _defuzzify_batch_mom(xdata, ydata):
+        mask = Defuzzifier._get_max_mask(ydata)
+        return np.where(mask, xdata, 0.).sum(axis=1) / mask.sum(axis=1)
+
+    @staticmethod
+    def _defuzzify_exact_coa(xdata, ydata):
+        x0, x1, y0, y1 = xdata[:-1], xdata[1:], ydata[:-1], ydata[1:]
+        dx = x1 - x0
+
+        area = (dx * (y0 + y1)).sum() / 2
+        if area <= 0:
+            raise ZeroDivisionError("Area under the function is zero, cannot compute the centroid")
+
+        moment = (dx * (x0 * (2 * y0 + y1) + x1 * (y0 + 2 * y1))).sum() / 6
+        return moment / area
+
+    @staticmethod
+    def _get_exact_max_range(xdata, ydata):
+        """Breakpoints at the maximum, and the segments (x0, x1) of plateaus at the maximum"""
+
+        at_max = np.isclose(ydata, ydata.max(), rtol=0, atol=piecewise.EPS)
+        plateau = at_max[:-1] & at_max[1:] & (xdata[1:] > xdata[:-1])
+        return xdata[at_max], xdata[:-1][plateau], xdata[1:][plateau]
+
+    @staticmethod
+    def _defuzzify_exact_som(xdata, ydata):
+        return Defuzzifier._get_exact_max_range(xdata, ydata)[0].min()
+
+    @staticmethod
+    def _defuzzify_exact_lom(xdata, ydata):
+        return Defuzzifier._get_exact_max_range(xdata, ydata)[0].max()
+
+    @staticmethod
+    def _defuzzify_exact_mom(xdata, ydata):
+        """Centroid of the plateaus at the maximum (or mean of the points at the maximum, if there are none)"""
+
+        points, x0, x1 = Defuzzifier._get_exact_max_range(xdata, ydata)
+        if not x0.size:
+            return np.unique(points).mean()
+
+        return ((x1 - x0) * (x0 + x1)).sum() / (x1 - x0).sum() / 2
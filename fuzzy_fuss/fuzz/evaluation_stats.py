@@ -0,0 +1,68 @@
+import time
+from collections import defaultdict
+
+
+class EvaluationStats(object):
+    """Wall time and number of calls per stage of rule base evaluations, and counters (rules fired, grid points...).
+
+    Set as the 'stats' attribute of a RuleBase (see RuleBase.profile) to record its evaluations; the stages are
+    timed one after another with lap(). 'hook', if given, is called with the stage name, its wall time and its
+    counters each time a stage is recorded.
+    """
+
+    STAGES = ('fuzzification', 'activation', 'weights', 'aggregation', 'sampling', 'defuzzification')
+
+    def __init__(self, hook=None):
+        self.hook = hook
+        self.times = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.counters = defaultdict(int)
+        self.evaluations = 0
+        self._last = None
+
+    def reset(self):
+        self.times.clear()
+        self.calls.clear()
+        self.counters.clear()
+        self.evaluations = 0
+
+    def start(self):
+        """Start timing an evaluation"""
+
+        self.evaluations += 1
+        self._last = time.perf_counter()
+
+    def lap(self, stage, **counters):
+        """Record the time since the previous lap (or start) as spent in the stage"""
+
+        now = time.perf_counter()
+        self.record(stage, now - self._last, **counters)
+        self._last = time.perf_counter()
+
+    def record(self, stage, elapsed, **counters):
+        self.times[stage] += elapsed
+        self.calls[stage] += 1
+        for key, value in counters.items():
+            self.counters[key] += value
+
+        if self.hook is not None:
+            self.hook(stage, elapsed, counters)
+
+    @property
+    def total_time(self):
+        return sum(self.times.values())
+
+    def as_dict(self):
+        return dict(evaluations=self.evaluations, times=dict(self.times), calls=dict(self.calls),
+                    counters=dict(self.counters))
+
+    def __repr__(self):
+        total = self.total_time
+        stages = sorted(self.times, key=lambda s: self.STAGES.index(s) if s in self.STAGES else len(self.STAGES))
+
+        lines = [f"{self.evaluations} evaluations, {total:.6f} s"]
+        for stage in stages:
+            share = 100 * self.times[stage] / total if total else 0.
+            lines.append(f"  {stage:<16} {self.times[stage]:>12.6f} s {share:>6.1f}% {self.calls[stage]:>8} calls")
+        lines.extend(f"  {key:<16} {value:>12}" for key, value in sorted(self.counters.items()))
+        return '\n'.join(lines)
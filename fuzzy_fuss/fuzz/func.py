@@ -1,5 +1,7 @@
 import numpy as np
 
+from fuzzy_fuss.fuzz import piecewise
+
 
 class Func(object):
     DEFAULT_NAME = ''
@@ -24,7 +26,22 @@ class Func(object):
             raise NotImplementedError(f"Support of a fuzzy membership function {type(self)} is not defined")
         return self._support
 
+    @property
+    def breakpoints(self):
+        """Breakpoints (xs, ys) of a piecewise-linear function (see fuzzy_fuss.fuzz.piecewise)"""
+        raise NotImplementedError(f"Function {type(self)} is not known to be piecewise-linear")
+
+    def _get_breakpoints(self):
+        try:
+            return self.breakpoints
+        except NotImplementedError:
+            return None
+
     def inversion(self):
+        bp = self._get_breakpoints()
+        if bp is not None:
+            return PiecewiseLinear(bp[0], 1 - bp[1], name=f"{self.name} (inversion)", support=self.support)
+
         return Func(formula=(lambda *args: 1 - self(*args)), name=f"{self.name} (inversion)",
                     support=self.support)  # TODO: correct support - add core
 
@@ -33,31 +50,29 @@ class Func(object):
 
     def __add__(self, other):
         if isinstance(other, Func):
-            s_low = min(self.support[0], other.support[0])
-            s_high = max(self.support[1], other.support[1])
-
-            return Func(formula=(lambda *args: np.maximum(self(*args), other(*args))),
-                        name=f"{self.name} OR {other.name}",
-                        support=(s_low, s_high))
+            return Maximum.of(self, other)
 
         raise TypeError(f"Expected type Func, got {type(other)}")
 
     def __mul__(self, other):
         if isinstance(other, Func):
-            s_low = max(self.support[0], other.support[0])
-            s_high = min(self.support[1], other.support[1])
-
-            return Func(formula=(lambda *args: np.minimum(self(*args), other(*args))),
-                        name=f"{self.name} AND {other.name}",
-                        support=tuple(sorted((s_low, s_high))))
+            return Minimum.of(self, other)
 
         if isinstance(other, (int, float)):
+            bp = self._get_breakpoints()
+            if bp is not None:
+                return PiecewiseLinear(bp[0], other * bp[1], name=f"{other} * {self.name}", support=self.support)
+
             return Func(formula=lambda *args: other * self(*args),
                         name=f"{other} * {self.name}",
                         support=self.support)
 
         raise TypeError(f"Expected type Func, got {type(other)}")
 
+    def _key(self):
+        """Key of the function: equal keys denote the same function (see NaryFunc.of)"""
+        return id(self)
+
     @staticmethod
     def _to_float(x):
         if isinstance(x, np.ndarray):
@@ -73,11 +88,165 @@ class Func(object):
         if not isinstance(level, float):
             raise TypeError(f"Cut level should be a float (got {type(level)})")
 
+        bp = self._get_breakpoints()
+        if bp is not None:
+            return PiecewiseLinear(*piecewise.cut(*bp, level), support=self.support,
+                                   name=f"{self.name} cut at {level}")
+
         return Func(formula=(lambda x: np.minimum(self(x), level)),
                     support=self.support,
                     name=f"{self.name} cut at {level}")
 
 
+class PiecewiseLinear(Func):
+    """Function linear between breakpoints (see fuzzy_fuss.fuzz.piecewise), evaluated with a single np.interp.
+
+    Set operations (union, intersection, cut, scaling, inversion) of piecewise-linear functions produce new
+    breakpoint arrays rather than nested closures, so the cost of evaluation does not grow with the number of
+    operations that built the function.
+    """
+
+    DEFAULT_NAME = 'piecewise-linear'
+
+    def __init__(self, xs, ys, **kwargs):
+        super(PiecewiseLinear, self).__init__(**kwargs)
+        self.xs = np.asarray(xs, dtype=float)
+        self.ys = np.asarray(ys, dtype=float)
+
+        if self.xs.shape != self.ys.shape or self.xs.ndim != 1 or not self.xs.size:
+            raise ValueError(f"Breakpoints must be non-empty 1-D arrays of equal lengths "
+                             f"(got shapes {self.xs.shape} and {self.ys.shape})")
+
+        if np.any(np.diff(self.xs) < 0):
+            raise ValueError("Breakpoint x values must be non-decreasing")
+
+    def __call__(self, x):
+        return piecewise.evaluate(self.xs, self.ys, x)
+
+    def make(self, **kwargs):
+        if 'formula' in kwargs:
+            return super(PiecewiseLinear, self).make(**kwargs)
+
+        return PiecewiseLinear(self.xs, self.ys, **{**dict(name=self.name, support=self.support), **kwargs})
+
+    @property
+    def support(self):
+        return self._support or (self.xs[0], self.xs[-1])
+
+    @property
+    def breakpoints(self):
+        return self.xs, self.ys
+
+    def _key(self):
+        return PiecewiseLinear, self.xs.tobytes(), self.ys.tobytes(), self._support
+
+
+class NaryFunc(Func):
+    """Maximum or minimum of any number of functions: one node of an expression graph of unions/intersections.
+
+    Nested nodes of the same kind are flattened into one and repeated operands (by key) kept once, so the union
+    of N functions is a single node with N operands. If all of them are piecewise-linear, the node is evaluated
+    through the breakpoints of their envelope, computed once on first use; otherwise it reduces the values of the
+    operands in place, without a temporary per operand.
+    """
+
+    CONNECTIVE = ''
+    MINIMUM = False
+    REDUCE = None
+
+    def __init__(self, operands, keys=None, **kwargs):
+        super(NaryFunc, self).__init__(**kwargs)
+        self.operands = tuple(operands)
+        self._operand_keys = frozenset(keys if keys is not None else (operand._key() for operand in self.operands))
+        self._breakpoints = None
+
+    @classmethod
+    def of(cls, *functions, **kwargs):
+        operands, keys = [], set()
+        for func in functions:
+            if type(func) is cls and func._support is None:  # a node of the same kind (with derived support)
+                if not keys:
+                    operands.extend(func.operands)
+                    keys.update(func._operand_keys)
+                    continue
+                nested = func.operands
+            else:
+                nested = (func,)
+
+            for operand in nested:
+                key = operand._key()
+                if key not in keys:
+                    keys.add(key)
+                    operands.append(operand)
+
+        return cls(operands, keys=keys, **kwargs)
+
+    @property
+    def name(self):
+        return self._name or f" {self.CONNECTIVE} ".join(f"({operand.name})" if isinstance(operand, NaryFunc)
+                                                          else operand.name for operand in self.operands)
+
+    @name.setter
+    def name(self, value):
+        self._name = value
+
+    @property
+    def support(self):
+        if self._support:
+            return self._support
+
+        lows, highs = zip(*(operand.support for operand in self.operands))
+        if self.MINIMUM:
+            return tuple(sorted((max(lows), min(highs))))
+        return min(lows), max(highs)
+
+    @property
+    def breakpoints(self):
+        if self._breakpoints is None:
+            operands = [operand._get_breakpoints() for operand in self.operands]
+            self._breakpoints = False if any(bp is None for bp in operands) else \
+                piecewise.envelope(operands, minimum=self.MINIMUM)
+
+        if self._breakpoints is False:
+            raise NotImplementedError(f"Function {self.name} has operands not known to be piecewise-linear")
+        return self._breakpoints
+
+    def __call__(self, x):
+        bp = self._get_breakpoints()
+        if bp is not None:
+            return piecewise.evaluate(*bp, x)
+
+        result = np.array(self.operands[0](x), dtype=float)
+        for operand in self.operands[1:]:
+            self.REDUCE(result, operand(x), out=result)
+        return result[()]
+
+    def make(self, **kwargs):
+        if 'formula' in kwargs:
+            return super(NaryFunc, self).make(**kwargs)
+
+        return type(self)(self.operands, keys=self._operand_keys,
+                          **{**dict(name=self._name, support=self._support), **kwargs})
+
+    def _key(self):
+        return type(self), self._operand_keys, self._support
+
+
+class Maximum(NaryFunc):
+    """Union of functions"""
+
+    CONNECTIVE = 'OR'
+    REDUCE = np.maximum
+
+
+class Minimum(NaryFunc):
+    """Intersection of functions"""
+
+    CONNECTIVE = 'AND'
+    MINIMUM = True
+    REDUCE = np.minimum
+
+
 class Triangle(Func):
     DEFAULT_NAME = 'triangle'
 
@@ -96,6 +265,21 @@ class Triangle(Func):
 
             return np.maximum(np.minimum(y1, y2), 0)
 
+    @property
+    def params(self):
+        """Parameters of the equivalent trapezoid"""
+        return self.a, self.b, self.b, self.c
+
+    def _key(self):
+        return Triangle, self.params
+
+    def cut(self, level):
+        if isinstance(level, float) and level >= 0:  # a trapezoid
+            return PiecewiseLinear(*piecewise.trapezoid(*self.params, height=min(level, 1.)), support=self.support,
+                                   name=f"{self.name} cut at {level}")
+
+        return super(Triangle, self).cut(level)
+
     def __repr__(self):
         return f"{self.name.capitalize()} function with a={self.a}, b={self.b}, c={self.c}"
 
@@ -103,6 +287,10 @@ class Triangle(Func):
     def support(self):
         return self.a, self.c
 
+    @property
+    def breakpoints(self):
+        return piecewise.trapezoid(*self.params)
+
 
 class Trapezoid(Func):
     DEFAULT_NAME = 'trapezoid'
@@ -123,9 +311,53 @@ class Trapezoid(Func):
 
         return np.maximum(np.minimum(np.minimum(y1, y2), 1.), 0.)
 
+    @staticmethod
+    def evaluate_params(x, a, b, c, d):
+        """Membership values for arrays of trapezoid parameters, broadcast against x and each other"""
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            y1 = np.where(b != a, (x - a) / (b - a), a <= x)
+            y2 = np.where(d != c, (d - x) / (d - c), x <= d)
+
+        return np.clip(np.minimum(y1, y2), 0., 1.)
+
+    @staticmethod
+    def evaluate_params_into(x, a, b, c, d, out):
+        """As evaluate_params, writing into 'out' (of the broadcast shape) with a single temporary array"""
+
+        rise, fall = np.subtract(b, a), np.subtract(d, c)
+        tmp = np.empty_like(out)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            np.divide(np.subtract(x, a, out=out), rise, out=out)
+            np.divide(np.subtract(d, x, out=tmp), fall, out=tmp)
+        if not np.all(rise):  # vertical edges: steps
+            np.copyto(out, np.less_equal(a, x), where=rise == 0)
+        if not np.all(fall):
+            np.copyto(tmp, np.less_equal(x, d), where=fall == 0)
+
+        return np.clip(np.minimum(out, tmp, out=out), 0., 1., out=out)
+
+    @property
+    def params(self):
+        return self.a, self.b, self.c, self.d
+
+    def _key(self):
+        return Trapezoid, self.params
+
+    def cut(self, level):
+        if isinstance(level, float) and level >= 0:  # a lower trapezoid
+            return PiecewiseLinear(*piecewise.trapezoid(*self.params, height=min(level, 1.)), support=self.support,
+                                   name=f"{self.name} cut at {level}")
+
+        return super(Trapezoid, self).cut(level)
+
     def __repr__(self):
         return f"{self.name.capitalize()} function with a={self.a}, b={self.b}, c={self.c}, d={self.d}"
 
     @property
     def support(self):
         return self.a, self.d
+
+    @property
+    def breakpoints(self):
+        return piecewise.trapezoid(*self.params)
@@ -1,8 +1,9 @@
-import matplotlib.pyplot as plt
+import numpy as np
 from collections import defaultdict
 from typing import Tuple
 
 from fuzzy_fuss.misc import plotting
+from fuzzy_fuss.fuzz.antecedent import Antecedent
 
 
 class Atom(tuple):
@@ -16,17 +17,73 @@ class Atom(tuple):
         return f"({self[0]} = {self[1]})"
 
 
+class LinearConclusion(Atom):
+    """Conclusion of a Takagi-Sugeno (TSK) rule: the output variable and the coefficients of a linear function of the
+    inputs, as ((input name, coefficient), ...) with the constant term under the name ''"""
+
+    def __new__(cls, variable, coefficients):
+        coefficients = dict(coefficients)
+        coefficients.setdefault('', 0.)
+        return super(LinearConclusion, cls).__new__(cls, (variable, tuple(sorted(coefficients.items()))))
+
+    def __init__(self, variable, coefficients):
+        super(LinearConclusion, self).__init__(self)
+
+    def __getnewargs__(self):
+        return tuple(self)
+
+    @property
+    def coefficients(self):
+        return dict(self[1])
+
+    @property
+    def input_names(self):
+        return tuple(name for name, _ in self[1] if name)
+
+    def __call__(self, measurements):
+        """Value of the function for scalar or array measurements (by variable name)"""
+
+        value = self.coefficients['']
+        for name, coefficient in self[1]:
+            if name:
+                try:
+                    value = value + coefficient * np.asarray(measurements[name], dtype=float)
+                except KeyError:
+                    raise ValueError(f"Missing data for variable {name}")
+        return value
+
+    def __repr__(self):
+        terms = [f"{c:g} * {name}" for name, c in self[1] if name] + [f"{self.coefficients['']:g}"]
+        return f"({self[0]} = {' + '.join(terms).replace('+ -', '- ')})"
+
+
 class Rule(object):
-    def __init__(self, name: str, prop_atoms: Tuple[Atom], prop_connectives, conclusion: Atom):
+    """Fuzzy rule: 'if <antecedent> then <conclusion>'.
+
+    The antecedent is either a chain of atoms joined by connectives ('and' binding stronger than 'or'), or - with
+    parentheses, negations or hedges - an operator tree over the atoms given as 'antecedent', with
+    'prop_connectives' None. Either way it is compiled once into an Antecedent tree, which computes the weight.
+    """
+
+    def __init__(self, name: str, prop_atoms: Tuple[Atom], prop_connectives, conclusion: Atom,
+                 antecedent: Antecedent = None):
         la = len(prop_atoms)
-        lc = len(prop_connectives)
-        if not lc == la - 1:
-            raise ValueError(f"Improper number of connectives for {la} atoms: expected {la - 1}, got {lc}")
+        if antecedent is None:
+            lc = len(prop_connectives)
+            if not lc == la - 1:
+                raise ValueError(f"Improper number of connectives for {la} atoms: expected {la - 1}, got {lc}")
 
         self.name = name
         self.prop_atoms = prop_atoms
         self.prop_connectives = prop_connectives
         self.conclusion = conclusion
+        self._antecedent = antecedent
+
+    @property
+    def antecedent(self):
+        if self._antecedent is None:  # built on first use for a chain of connectives
+            self._antecedent = Antecedent.from_connectives(self.prop_connectives)
+        return self._antecedent
 
     @property
     def prop_names(self):
@@ -40,6 +97,9 @@ class Rule(object):
         pc = self.prop_connectives
         pa = self.prop_atoms
 
+        if pc is None:
+            return f"{self.name}: {self.antecedent.format(pa)} => {str(self.conclusion)}"
+
         prop = str(pa[0])
 
         for i in range(len(self.prop_connectives)):
@@ -51,43 +111,53 @@ class Rule(object):
     @plotting.refine_multiplot
     def plot(self, variables, measurements=None, axes=None, fig=None, title=None, composition='coa', **kwargs):
         if axes is None:
-            fig, axes = plt.subplots(1, len(self.prop_atoms)+1, sharey='all', figsize=(8, 4))
+            fig, axes = plotting.pyplot().subplots(1, len(self.prop_atoms)+1, sharey='all', figsize=(8, 4))
 
         markers = defaultdict(lambda: None, measurements)
 
         for i, (a_name, a_value) in enumerate(self.prop_atoms):
             variables[a_name][a_value].plot(ax=axes[i], marker=markers[a_name], **kwargs)
 
-        conc = variables[self.conclusion[0]][self.conclusion[1]]
-        if measurements:
+        if isinstance(self.conclusion, LinearConclusion):  # no fuzzy set to plot: show the function (and output)
+            text = str(self.conclusion)
+            if measurements:
+                text += f"\n= {float(self.conclusion(measurements)):g}" \
+                        f"\nweight {float(self.compute_weight(variables, measurements)):g}"
+            axes[-1].text(0.5, 0.5, text, ha='center', va='center', transform=axes[-1].transAxes)
+        elif measurements:
+            conc = variables[self.conclusion[0]][self.conclusion[1]]
             out_cut = self.compute_weight(variables, measurements)
             conc.plot_cut(out_cut, ax=axes[-1], composition=composition, **kwargs)
         else:
-            conc.plot(ax=axes[-1], **kwargs)
+            variables[self.conclusion[0]][self.conclusion[1]].plot(ax=axes[-1], **kwargs)
 
         axes[0].set_ylabel("membership values")
 
         fig.suptitle(title or str(self))
         fig.subplots_adjust(top=0.8)
 
-    def choose_weight(self, weights):
-        statement = [weights[0]]
-        for i, conn in enumerate(self.prop_connectives):
-            statement.extend([conn, weights[i+1]])
+    def group(self, items):
+        """Split items given per atom into OR-ed groups of AND-ed items ('and' binds stronger than 'or').
 
-        def pick(_stat):
-            if len(_stat) < 2:
-                return _stat[0]
+        Only for a chain of connectives; see Antecedent.groups for any antecedent.
+        """
 
-            if 'or' in _stat:
-                ix = _stat.index('or')
-                return max(pick(_stat[:ix]), pick(_stat[ix+1:]))
+        if self.prop_connectives is None:
+            raise ValueError(f"Rule {self.name} is not a chain of connectives")
 
-            head = _stat[0]
-            tail = pick(_stat[2:]) if len(_stat) > 3 else _stat[2]
-            return min(head, tail)  # and
+        groups = [[items[0]]]
+        for conn, item in zip(self.prop_connectives, items[1:]):
+            if conn == 'or':
+                groups.append([item])
+            else:
+                groups[-1].append(item)
 
-        return pick(statement)
+        return groups
+
+    def choose_weight(self, weights):
+        # a walk over the operator tree of the antecedent (given the degrees of the atoms);
+        # its ufuncs make it work for scalar and array (batch) weights alike
+        return self.antecedent(weights)
 
     def compute_weight(self, variables: dict, measurements: dict):
 
@@ -105,6 +175,9 @@ class Rule(object):
         return weight, self.get_conclusion(variables, weight)
 
     def get_conclusion(self, variables, weight=None, composition='max-min'):
+        if isinstance(self.conclusion, LinearConclusion):
+            raise TypeError(f"Rule {self.name} concludes with a linear function, not a fuzzy set")
+
         conc = variables[self.conclusion[0]][self.conclusion[1]]
         if weight is not None:
             conc = conc.cut(weight, composition=composition)
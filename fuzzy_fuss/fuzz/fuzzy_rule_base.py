@@ -1,19 +1,32 @@
-import matplotlib.pyplot as plt
+import numpy as np
+from itertools import groupby
 from collections import defaultdict
 
 from fuzzy_fuss.misc import plotting
-from fuzzy_fuss.fuzz.fuzzy_rule import Rule
+from fuzzy_fuss.fuzz.func import Trapezoid, Triangle
+from fuzzy_fuss.fuzz.fuzzy_set import FuzzySet
+from fuzzy_fuss.fuzz.fuzzy_rule import Rule, LinearConclusion
+from fuzzy_fuss.fuzz.defuzzifier import Defuzzifier
+from fuzzy_fuss.fuzz.lookup_table import LookupTable
+from fuzzy_fuss.fuzz.evaluation_stats import EvaluationStats
 
 
 class RuleBase(dict):
     def __init__(self, name, variables):
         self.name = name
         self.variables = variables
+        self._index = None
+        self.stats = None  # EvaluationStats recording the evaluations, if set (see profile)
         super(RuleBase, self).__init__()
 
     def __setitem__(self, key, value):
         self._check_rule_type(value)
         super(RuleBase, self).__setitem__(key, value)
+        self._index = None
+
+    def __delitem__(self, key):
+        super(RuleBase, self).__delitem__(key)
+        self._index = None
 
     def __iter__(self):
         for key in sorted(self.keys()):  # sort by rule name
@@ -32,6 +45,15 @@ class RuleBase(dict):
         self._check_rule_type(rule)
         self[rule.name] = rule
 
+    def add_rules(self, rules):
+        """Add rules (by their names) in one update"""
+
+        rules = list(rules)
+        for rule in rules:
+            self._check_rule_type(rule)
+        super(RuleBase, self).update((rule.name, rule) for rule in rules)
+        self._index = None
+
     def get_partial_conclusions(self, weights=None, **kwargs):
         weights = weights or defaultdict(lambda: None)
         conclusions = [rule.get_conclusion(self.variables, weights[rule.name], **kwargs) for rule in self]
@@ -43,26 +65,351 @@ class RuleBase(dict):
 
     @property
     def conclusion_names(self):
-        return list(set([rule.conclusion[0] for rule in self]))
+        return list(self._get_index()['conclusions'])
+
+    def group_by_conclusion(self):
+        """Indices of the rules (in iteration order) concluding on each variable, by variable name"""
+
+        return self._get_index()['conclusions']
+
+    def _get_index(self):
+        """Rules in iteration order and the indices built from them, rebuilt after the rules change"""
+
+        if self._index is None:
+            rules = list(self)
+            pairs = sorted(set(tuple(atom) for rule in rules for atom in rule.prop_atoms))
+            antecedents = {pair: i for i, pair in enumerate(pairs)}
+
+            # activation index: the groups of atoms (numbered across all the rules) using each pair, of which
+            # all must have non-zero degrees for a rule to fire; a rule with an empty group may always fire
+            pair_groups = [[] for _ in pairs]
+            group_sizes, group_rules, always_active = [], [], []
+            for r, rule in enumerate(rules):
+                for group in rule.antecedent.groups([antecedents[tuple(atom)] for atom in rule.prop_atoms]):
+                    if not group:
+                        always_active.append(r)
+                    for row in group:
+                        pair_groups[row].append(len(group_sizes))
+                    group_sizes.append(len(group))
+                    group_rules.append(r)
+
+            conclusions, conclusion_sets, linear = {}, {}, {}
+            for r, rule in enumerate(rules):
+                name = rule.conclusion[0]
+                conclusions.setdefault(name, []).append(r)
+                conclusion_sets.setdefault(name, set()).add(rule.conclusion[1])
+                if linear.setdefault(name, isinstance(rule.conclusion, LinearConclusion)) != \
+                        isinstance(rule.conclusion, LinearConclusion):
+                    raise ValueError(f"Rules concluding on {name} mix fuzzy sets and linear functions")
+
+            self._index = dict(rules=rules, antecedents=antecedents,
+                               pair_groups=[np.array(groups, dtype=int) for groups in pair_groups],
+                               group_sizes=np.array(group_sizes, dtype=int),
+                               group_rules=np.array(group_rules, dtype=int),
+                               always_active=np.unique(np.array(always_active, dtype=int)),
+                               conclusions=dict(sorted(conclusions.items())),
+                               tsk_outputs={name for name, is_linear in linear.items() if is_linear},
+                               conclusion_sets={name: sorted(values) for name, values in conclusion_sets.items()})
+
+        return self._index
+
+    @property
+    def input_names(self):
+        return sorted(set(name for rule in self for name in rule.prop_names) |
+                      set(name for rule in self if isinstance(rule.conclusion, LinearConclusion)
+                          for name in rule.conclusion.input_names))
+
+    @property
+    def tsk_outputs(self):
+        """Names of the output variables concluded on by linear functions (Takagi-Sugeno rules)"""
+
+        return self._get_index()['tsk_outputs']
+
+    @staticmethod
+    def tsk_average(weights, outputs):
+        """Average of the rule outputs weighted by the rule weights (rules x batch, or per rule for scalars); NaN
+        where no rule fires"""
+
+        weights, outputs = np.broadcast_arrays(np.asarray(weights, dtype=float), np.asarray(outputs, dtype=float))
+        total = weights.sum(axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(total > 0, (weights * outputs).sum(axis=0) / np.where(total > 0, total, 1.), np.nan)
 
     def sum(self, weights, **kwargs):
         conclusions = self.get_partial_conclusions(weights, **kwargs)
 
-        return sum(conclusions)
+        return FuzzySet.union(*conclusions)
+
+    @property
+    def antecedent_index(self):
+        """Row of every (variable, term) pair of the rule antecedents in the degree table (see fuzzify)"""
+
+        return self._get_index()['antecedents']
+
+    def fuzzify(self, measurements):
+        """Dense degree table: the membership degree of every antecedent (variable, term) pair, computed once.
+
+        Rows follow antecedent_index; for array measurements every row is an array of degrees per input.
+        """
+
+        pairs = list(self.antecedent_index)
+        degrees = [None] * len(pairs)
+
+        for name, rows in groupby(range(len(pairs)), key=lambda i: pairs[i][0]):
+            rows = list(rows)
+            try:
+                x = np.asarray(measurements[name], dtype=float)
+            except KeyError:
+                raise ValueError(f"Missing data for variable {name}")
+
+            sets = [self.variables[name][pairs[i][1]] for i in rows]
+            functions = [fset.membership_function for fset in sets]
+
+            if all(isinstance(f, (Trapezoid, Triangle)) for f in functions):
+                # all the terms of the variable in one call
+                a, b, c, d = (p.reshape((-1,) + (1,) * x.ndim) for p in np.array([f.params for f in functions]).T)
+                degrees[rows[0]:rows[-1] + 1] = Trapezoid.evaluate_params(x, a, b, c, d)
+            else:
+                for i, fset in zip(rows, sets):
+                    degrees[i] = fset.get_values(x)
+
+        return np.array(degrees, dtype=float)
+
+    def active_rules(self, degrees):
+        """Indices of the rules (in iteration order) which may fire, given the degree table (see fuzzify).
+
+        These are the rules with a group of atoms all of non-zero degree (for some input, for a batch), and those
+        which may fire whatever the degrees (with negations); found through the groups using each non-zero pair, so
+        the cost depends on the active rules only.
+        """
+
+        index = self._get_index()
+        nonzero = degrees != 0
+        rows = np.flatnonzero(nonzero if nonzero.ndim == 1 else nonzero.any(axis=1))
+        if not rows.size:
+            return index['always_active']
+
+        groups, counts = np.unique(np.concatenate([index['pair_groups'][row] for row in rows]), return_counts=True)
+        active = index['group_rules'][groups[counts == index['group_sizes'][groups]]]
+        return np.unique(np.concatenate([active, index['always_active']]))
+
+    def compute_weights(self, measurements, degrees=None, rules=None):
+        """Weights of the rules (all by default) by rule name, read from the degree table (computed unless given)"""
+
+        index = self.antecedent_index
+        if degrees is None:
+            degrees = self.fuzzify(measurements)
+
+        return {rule.name: rule.choose_weight([degrees[index[atom]] for atom in rule.prop_atoms])
+                for rule in (self if rules is None else rules)}
+
+    def profile(self, hook=None):
+        """Record the time spent in every stage of the following evaluations; returns the EvaluationStats.
+
+        'hook' is called with the stage name, its wall time and counters as each stage ends. Call
+        profile(False) to stop recording.
+        """
+
+        self.stats = None if hook is False else EvaluationStats(hook=hook)
+        return self.stats
+
+    def _conclusion_support(self, name):
+        sets = [self.variables[name][value] for value in self._get_index()['conclusion_sets'][name]]
+        return min(fset.support[0] for fset in sets), max(fset.support[1] for fset in sets)
+
+    def _conclusion_params(self, conclusions):
+        try:
+            return np.array([conc.membership_function.params for conc in conclusions], dtype=float)
+        except AttributeError:
+            raise TypeError("Exact defuzzification requires trapezoidal or triangular conclusion sets")
+
+    def evaluate(self, measurements: dict, grid_size=1, defuzz_method='coa', exact=False, tolerance=None, **kwargs):
+        """Crisp conclusion; with rules concluding on several variables, a dict of crisp conclusions by variable.
+
+        With a 'tolerance', the aggregate is sampled adaptively instead of on a grid (see Defuzzifier.defuzzify).
+        Variables concluded on by linear functions (Takagi-Sugeno rules) are the average of the rule outputs
+        weighted by the rule weights, without defuzzification (None where no rule fires).
+
+        Only the rules which fire are weighted and aggregated (see active_rules); the aggregate keeps the support
+        of all the conclusions, so the result does not depend on which rules were skipped.
+        """
+
+        stats = self.stats
+        if stats is not None:
+            stats.start()
+
+        degrees = self.fuzzify(measurements)
+        if stats is not None:
+            stats.lap('fuzzification')
+
+        rules = self._get_index()['rules']
+        active = [rules[i] for i in self.active_rules(degrees)]
+        if stats is not None:
+            stats.lap('activation', rules_active=len(active))
+
+        weights = self.compute_weights(measurements, degrees, rules=active)
+
+        firing = defaultdict(list)
+        for rule in active:
+            if weights[rule.name] != 0:
+                firing[rule.conclusion[0]].append(rule)
+        if stats is not None:
+            stats.lap('weights', rules_fired=sum(len(group) for group in firing.values()))
+
+        results = {}
+        for name, indices in self.group_by_conclusion().items():
+            group = firing[name]
+            if name in self.tsk_outputs:  # weighted average of the rule outputs
+                crisp = self.tsk_average([weights[rule.name] for rule in group],
+                                         [rule.conclusion(measurements) for rule in group]) if group else np.nan
+                results[name] = None if np.isnan(crisp) else float(crisp)
+                if stats is not None:
+                    stats.lap('aggregation', conclusions=len(group))
+                continue
+
+            if not group:  # nothing fires: aggregate all the (zero) conclusions
+                group = [rules[i] for i in indices]
+                weights.update(self.compute_weights(measurements, degrees, rules=group))
+
+            compound_conclusion = FuzzySet.union(*(rule.get_conclusion(self.variables, weights[rule.name], **kwargs)
+                                                   for rule in group))
+            if len(group) < len(indices):
+                mf = compound_conclusion.membership_function
+                compound_conclusion = FuzzySet(mf.make(support=self._conclusion_support(name)),
+                                               variable_name=compound_conclusion.variable_name,
+                                               value_name=compound_conclusion.value_name)
+            if stats is not None:
+                stats.lap('aggregation', conclusions=len(group))
+
+            results[name] = compound_conclusion.defuzzify(grid_size=grid_size, method=defuzz_method, exact=exact,
+                                                          tolerance=tolerance, stats=stats)
+            if stats is not None:
+                stats.lap('defuzzification')
+
+        return results if len(results) > 1 else results.popitem()[1]
+
+    @staticmethod
+    def as_batch(measurements):
+        """Convert a dict of arrays (or scalars) or a DataFrame to a dict of equal-length 1-D float arrays"""
+
+        names = list(measurements.keys())
+        try:
+            arrays = np.broadcast_arrays(*(np.asarray(measurements[name], dtype=float) for name in names))
+        except ValueError:
+            raise ValueError(f"Measurement arrays for variables {names} do not have equal lengths")
+
+        arrays = [np.atleast_1d(arr) for arr in arrays]
+        if arrays and arrays[0].ndim != 1:
+            raise ValueError(f"Measurements must be one-dimensional arrays (got shape {arrays[0].shape})")
+
+        return dict(zip(names, arrays))
+
+    def evaluate_batch(self, measurements, grid_size=1, defuzz_method='coa', composition='max-min', chunk_size=None,
+                       exact=False):
+        """Evaluate the rule base for a batch of measurements.
+
+        'measurements' is a dict of equal-length arrays (scalars are broadcast) or a DataFrame with a column
+        per variable. Returns an array of crisp conclusions (NaN where no rule fires for 'coa'), or a dict of such
+        arrays by variable name if the rules conclude on several variables; the rule weights are computed once
+        for all of them. With 'exact', the conclusions are defuzzified analytically instead of on a grid.
+        Takagi-Sugeno outputs are weighted averages, as in evaluate.
+        """
+
+        stats = self.stats
+        if stats is not None:
+            stats.start()
+
+        batch = self.as_batch(measurements)
+        size = len(next(iter(batch.values())))
+
+        degrees = self.fuzzify(batch)
+        if stats is not None:
+            stats.lap('fuzzification', rows=size)
+
+        rules = self._get_index()['rules']
+        active = self.active_rules(degrees)
+        if stats is not None:
+            stats.lap('activation', rules_active=len(active))
+
+        rule_weights = self.compute_weights(batch, degrees, rules=[rules[i] for i in active])
+        active = set(active.tolist())
+        if stats is not None:
+            stats.lap('weights')
+
+        results = {}
+        for name, indices in self.group_by_conclusion().items():
+            rows = [i for i in indices if i in active]
+            if name in self.tsk_outputs:  # weighted average of the rule outputs
+                results[name] = self.tsk_average([np.broadcast_to(rule_weights[rules[i].name], size) for i in rows],
+                                                 [np.broadcast_to(rules[i].conclusion(batch), size) for i in rows]) \
+                    if rows else np.full(size, np.nan)
+                if stats is not None:
+                    stats.lap('aggregation', conclusions=len(rows))
+                continue
+
+            if not rows:  # nothing fires: aggregate all the (zero) conclusions
+                rows = indices
+                rule_weights.update(self.compute_weights(batch, degrees, rules=[rules[i] for i in rows]))
+
+            if exact:  # weights of all the rules, as the conclusions set the output range
+                weights = np.stack([np.broadcast_to(rule_weights.get(rules[i].name, 0.), size) for i in indices])
+                params = self._conclusion_params([rules[i].get_conclusion(self.variables) for i in indices])
+                if stats is not None:
+                    stats.lap('aggregation', conclusions=len(indices))
+
+                results[name] = Defuzzifier.defuzzify_trapezoids(params, weights, composition=composition,
+                                                                 method=defuzz_method)
+                if stats is not None:
+                    stats.lap('defuzzification')
+                continue
+
+            weights = np.stack([np.broadcast_to(rule_weights[rules[i].name], size) for i in rows])
+            if stats is not None:
+                stats.lap('aggregation', conclusions=len(rows))
+
+            xdata = np.arange(*self._conclusion_support(name), grid_size)
+            memberships = np.stack([rules[i].get_conclusion(self.variables).get_values(xdata) for i in rows])
+            if stats is not None:
+                stats.lap('sampling', samples=len(xdata))
+
+            results[name] = Defuzzifier.defuzzify_aggregate(xdata, memberships, weights, composition=composition,
+                                                            method=defuzz_method, chunk_size=chunk_size)
+            if stats is not None:
+                stats.lap('defuzzification')
+
+        return results if len(results) > 1 else results.popitem()[1]
+
+    def compile(self):
+        """Build an immutable, array-based inference plan of the rule base (see CompiledRuleBase)"""
+
+        from fuzzy_fuss.fuzz.compiled_rule_base import CompiledRuleBase
+        return CompiledRuleBase(self)
+
+    def incremental(self, measurements: dict, **kwargs):
+        """Stateful evaluator re-evaluating only what changes with some of the measurements (see
+        IncrementalEvaluator); keyword arguments are those of evaluate"""
+
+        from fuzzy_fuss.fuzz.incremental_evaluator import IncrementalEvaluator
+        return IncrementalEvaluator(self, measurements, **kwargs)
+
+    def evaluate_parallel(self, measurements, workers=None, chunk_size=None, **kwargs):
+        """Evaluate a batch of measurements in chunks across a pool of worker processes (see ParallelEvaluator).
 
-    def compute_weights(self, measurements):
-        return {rule.name: rule.compute_weight(self.variables, measurements) for rule in self}
+        Results are identical to those of evaluate_batch; keyword arguments are passed to it.
+        """
 
-    def evaluate(self, measurements: dict, grid_size=1, defuzz_method='coa', **kwargs):
-        conc_names = self.conclusion_names
-        if len(conc_names) > 1:
-            raise RuntimeError(f"More than on target variable (rule conclusion) in the rule base: {conc_names}")
+        from fuzzy_fuss.fuzz.parallel import ParallelEvaluator
+        with ParallelEvaluator(self, workers=workers) as evaluator:
+            return evaluator.evaluate_batch(measurements, chunk_size=chunk_size, **kwargs)
 
-        weights = self.compute_weights(measurements)
+    def to_lookup_table(self, grid_spec: dict, **kwargs) -> LookupTable:
+        """Precompute the response surface on a grid (variable name -> (start, stop, number of points) or array).
 
-        compound_conclusion = self.sum(weights, **kwargs)
+        Returns a LookupTable evaluating by multilinear interpolation; keyword arguments are passed to
+        evaluate_batch.
+        """
 
-        return compound_conclusion.defuzzify(grid_size=grid_size, method=defuzz_method)
+        return LookupTable.build(self, grid_spec, **kwargs)
 
     def plot_rules(self, **kwargs):
         for fr in self:
@@ -74,6 +421,7 @@ class RuleBase(dict):
 
         rules = list(self)
 
+        plt = plotting.pyplot()
         fig, axes = plt.subplots(1, len(self)+1, figsize=(15, 4), sharey='all', sharex='all')
         for i, conc in enumerate(self.conclusions):
             conc.plot_cut(ax=axes[i], cut_level=weights[rules[i].name], composition=composition,
@@ -82,7 +430,7 @@ class RuleBase(dict):
         for i, conc in enumerate(conclusions_cut):
             conc.plot(ax=axes[-1], label=rules[i].name, linewidth=1, linestyle='--')
 
-        compound_conc = sum(conclusions_cut)
+        compound_conc = FuzzySet.union(*conclusions_cut)
         compound_conc.plot(ax=axes[-1], shade=0, color='k', label="Aggregate",
                            title=f"{compound_conc.variable_name}: composition")
 
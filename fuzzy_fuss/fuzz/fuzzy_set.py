@@ -3,7 +3,7 @@ from copy import deepcopy
 from collections import abc
 
 from fuzzy_fuss.misc import plotting
-from fuzzy_fuss.fuzz.func import Func
+from fuzzy_fuss.fuzz.func import Func, Maximum
 from fuzzy_fuss.fuzz.defuzzifier import Defuzzifier
 
 
@@ -101,6 +101,24 @@ class FuzzySet(object):
         else:
             raise TypeError(f"item not an instance of FuzzySet (got {type(other)})")
 
+    @staticmethod
+    def union(*fsets):
+        """Union of any number of sets as a single n-ary node (summing them would rebuild the union per set)"""
+
+        if not fsets:
+            raise ValueError("Union of no sets")
+        if len(fsets) == 1:
+            return fsets[0]
+
+        first = fsets[0]
+        for fset in fsets:
+            if not isinstance(fset, FuzzySet):
+                raise TypeError(f"item not an instance of FuzzySet (got {type(fset)})")
+            first._var_check(fset)
+        return first._make(func=Maximum.of(*(fset.membership_function for fset in fsets)),
+                           variable_name=next((fset.variable_name for fset in fsets if fset.variable_name), None),
+                           value_name=" OR ".join(f"({fset.value_name})" for fset in fsets))
+
     def __mul__(self, other):
         if isinstance(other, FuzzySet):
             self._var_check(other)
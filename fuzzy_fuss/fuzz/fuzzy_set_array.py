@@ -0,0 +1,179 @@
+import numpy as np
+
+from fuzzy_fuss.fuzz.func import Trapezoid, Triangle
+from fuzzy_fuss.fuzz.fuzzy4tuple import Fuzzy4Tuple
+from fuzzy_fuss.fuzz.fuzzy_variable import FuzzyVariable
+
+
+class FuzzySetArray(object):
+    """Compact storage of many 4-tuple fuzzy sets, as one contiguous float array per parameter (a, b, alpha, beta).
+
+    Variable and value names are interned: each set holds the codes of its names in the name tables, so a set
+    takes 40 bytes whatever the length of its names. Fuzzy4Tuple objects are only built on access (indexing with
+    an integer, iteration); other indices (slices, masks, index arrays) return a FuzzySetArray sharing the name
+    tables, and for slices the parameter arrays too. Memberships are evaluated for all the sets at once.
+    """
+
+    # sets (or memberships, for several values) evaluated at a time, bounding the temporary arrays
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self, a, b, alpha, beta, variable_names=None, value_names=None):
+        self.a, self.b, self.alpha, self.beta = (np.ascontiguousarray(p, dtype=float) for p in (a, b, alpha, beta))
+        if self.a.ndim != 1 or not len(self.a) == len(self.b) == len(self.alpha) == len(self.beta):
+            raise ValueError(f"Parameters must be one-dimensional arrays of the same length "
+                             f"(got shapes {', '.join(str(p.shape) for p in self.params)})")
+        if np.any(self.alpha < 0) or np.any(self.beta < 0):
+            raise ValueError("Spreads alpha and beta must be non-negative")
+
+        self.variable_table, self.variable_codes = self._intern(variable_names, len(self))
+        self.value_table, self.value_codes = self._intern(value_names, len(self))
+
+    @staticmethod
+    def _intern(names, size):
+        """Table of the distinct names (in order of appearance) and the code of every name; a single name (or
+        None) applies to all the sets"""
+
+        if names is None or isinstance(names, str):
+            return (names,), np.zeros(size, dtype=np.int32)
+
+        table = {}
+        codes = np.fromiter((table.setdefault(name, len(table)) for name in names), dtype=np.int32)
+        if len(codes) != size:
+            raise ValueError(f"Expected {size} names (got {len(codes)})")
+        return tuple(table), codes
+
+    @classmethod
+    def _view(cls, params, variable_table, variable_codes, value_table, value_codes):
+        fsets = cls.__new__(cls)
+        fsets.a, fsets.b, fsets.alpha, fsets.beta = params
+        fsets.variable_table, fsets.variable_codes = variable_table, variable_codes
+        fsets.value_table, fsets.value_codes = value_table, value_codes
+        return fsets
+
+    @staticmethod
+    def from_points(v1, v2, v3, v4, variable_names=None, value_names=None):
+        """Sets of the arrays of trapezoid corners (as Fuzzy4Tuple.from_points)"""
+
+        v1, v2, v3, v4 = (np.asarray(v, dtype=float) for v in (v1, v2, v3, v4))
+        if not (np.all(v1 <= v2) and np.all(v2 <= v3) and np.all(v3 <= v4)):
+            raise ValueError("Values are not in order")
+
+        return FuzzySetArray(v2, v3, v2 - v1, v4 - v3, variable_names=variable_names, value_names=value_names)
+
+    @staticmethod
+    def from_sets(fsets):
+        """Array of 4-tuple, trapezoid or triangle fuzzy sets, with their names (other sets are up to rounding)"""
+
+        params, variable_names, value_names = [], [], []
+        for fset in fsets:
+            if isinstance(fset, Fuzzy4Tuple):
+                params.append((fset.a, fset.b, fset.alpha, fset.beta))
+            elif isinstance(fset.membership_function, (Trapezoid, Triangle)):
+                v1, v2, v3, v4 = fset.membership_function.params
+                params.append((v2, v3, v2 - v1, v4 - v3))
+            else:
+                raise TypeError(f"Set '{fset.value_name}' is not a 4-tuple (got {fset.membership_function!r})")
+            variable_names.append(fset.variable_name)
+            value_names.append(fset.value_name)
+
+        a, b, alpha, beta = np.array(params, dtype=float).reshape(-1, 4).T
+        return FuzzySetArray(a, b, alpha, beta, variable_names=variable_names, value_names=value_names)
+
+    def __len__(self):
+        return len(self.a)
+
+    def __repr__(self):
+        return f"Array of {len(self)} fuzzy sets ({len(self.variable_table)} variable names, " \
+               f"{len(self.value_table)} value names)"
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            if not -len(self) <= key < len(self):
+                raise IndexError(f"Set index {key} out of range for {len(self)} sets")
+            i = key % len(self)
+            return Fuzzy4Tuple(float(self.a[i]), float(self.b[i]), float(self.alpha[i]), float(self.beta[i]),
+                               variable_name=self.variable_table[self.variable_codes[i]],
+                               value_name=self.value_table[self.value_codes[i]])
+
+        return self._view(tuple(p[key] for p in self.params), self.variable_table, self.variable_codes[key],
+                          self.value_table, self.value_codes[key])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    @property
+    def params(self):
+        return self.a, self.b, self.alpha, self.beta
+
+    @property
+    def nbytes(self):
+        return sum(p.nbytes for p in self.params) + self.variable_codes.nbytes + self.value_codes.nbytes
+
+    @property
+    def variable_names(self):
+        return np.array(self.variable_table, dtype=object)[self.variable_codes]
+
+    @property
+    def value_names(self):
+        return np.array(self.value_table, dtype=object)[self.value_codes]
+
+    @property
+    def support(self):
+        """Lower and upper bounds of the supports, as arrays"""
+
+        return self.a - self.alpha, self.b + self.beta
+
+    def corners(self):
+        """Trapezoid parameters of the sets, as a (sets x 4) array"""
+
+        return np.stack([self.a - self.alpha, self.a, self.b, self.b + self.beta], axis=1)
+
+    def select(self, variable_name=None, value_name=None):
+        """Sets of the given variable and / or value name"""
+
+        mask = np.ones(len(self), dtype=bool)
+        for name, table, codes in ((variable_name, self.variable_table, self.variable_codes),
+                                   (value_name, self.value_table, self.value_codes)):
+            if name is not None:
+                mask &= codes == table.index(name) if name in table else False
+
+        return self[mask]
+
+    def to_variable(self, name):
+        """FuzzyVariable of the sets of the given variable name, as Fuzzy4Tuple sets by value name"""
+
+        variable = FuzzyVariable(name)
+        for fset in self.select(variable_name=name):
+            variable[fset.value_name] = fset
+        return variable
+
+    def evaluate(self, x, out=None):
+        """Membership degree of each set at the values x, broadcast against the sets: a value per set (as the
+        measurement of its entity) or a single value; 'out', if given, receives the degrees"""
+
+        x = np.asarray(x, dtype=float)
+        shape = np.broadcast_shapes(x.shape, (len(self),))
+        if out is None:
+            out = np.empty(shape)
+        elif out.shape != shape:
+            raise ValueError(f"Output array must have shape {shape} (got {out.shape})")
+
+        step = max(self.CHUNK_SIZE // max(int(np.prod(shape[:-1])), 1), 1)
+        for start in range(0, len(self), step):
+            chunk = slice(start, start + step)
+            a, b = self.a[chunk], self.b[chunk]
+            Trapezoid.evaluate_params_into(x[..., chunk] if x.ndim and x.shape[-1] > 1 else x,
+                                           a - self.alpha[chunk], a, b, b + self.beta[chunk], out=out[..., chunk])
+
+        return out
+
+    def memberships(self, data, out=None):
+        """Membership degrees of the values in every set, as a (values x sets) array (see FuzzyVariable.memberships);
+        for a single value, the degrees of the sets"""
+
+        x = np.asarray(data, dtype=float)
+        if x.ndim > 1:
+            raise ValueError(f"Data must be a value or a one-dimensional array (got shape {x.shape})")
+
+        return self.evaluate(x[:, None] if x.ndim else x, out=out)
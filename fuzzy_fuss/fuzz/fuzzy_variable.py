@@ -1,15 +1,39 @@
 import numpy as np
-import pandas as pd
-from collections import defaultdict
+from collections import defaultdict, namedtuple
 
 from fuzzy_fuss.misc import plotting
+from fuzzy_fuss.fuzz.func import Trapezoid, Triangle
 from fuzzy_fuss.fuzz.fuzzy_set import FuzzySet
 
 
+class SparseMemberships(namedtuple('SparseMemberships', ['names', 'indptr', 'indices', 'values'])):
+    """Non-zero membership degrees of a batch of values in CSR layout: the degrees of value i are
+    values[indptr[i]:indptr[i + 1]], of the terms names[j] for j in indices[indptr[i]:indptr[i + 1]]"""
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def row(self, i):
+        start, stop = self.indptr[i], self.indptr[i + 1]
+        return {self.names[j]: v for j, v in zip(self.indices[start:stop].tolist(), self.values[start:stop].tolist())}
+
+    def to_dense(self):
+        """Membership degrees as a (values x terms) array"""
+
+        dense = np.zeros((len(self), len(self.names)))
+        dense[np.repeat(np.arange(len(self)), np.diff(self.indptr)), self.indices] = self.values
+        return dense
+
+
 class FuzzyVariable(dict):
+    # values fuzzified at a time by memberships, bounding its temporary arrays
+    CHUNK_SIZE = 1 << 14
+
     def __init__(self, name):
         super(FuzzyVariable, self).__init__()
         self.name = name
+        self._interval_index = None
+        self._term_params = None
 
     def __setitem__(self, key, value):
         if not isinstance(value, FuzzySet):
@@ -23,6 +47,11 @@ class FuzzyVariable(dict):
             value.value_name = key
         if not value.variable_name:
             value.variable_name = self.name
+        self.reindex()
+
+    def __delitem__(self, key):
+        super(FuzzyVariable, self).__delitem__(key)
+        self.reindex()
 
     def add_set(self, value):
         self.__setitem__(None, value)
@@ -62,5 +91,134 @@ class FuzzyVariable(dict):
         self.plot(data, **kwargs)
 
     def get_values(self, data):
-        return pd.DataFrame({name: self[name].get_values(data) for name in self.keys()},
-                            index=data, columns=self.keys())
+        """Membership degrees as a DataFrame indexed by the values, with a column per term (see memberships)"""
+
+        import pandas as pd  # only for this output: inference does not load it
+
+        return pd.DataFrame(self.memberships(data), index=data, columns=list(self.keys()))
+
+    def reindex(self):
+        """Drop the interval index and the parameter matrix of the terms, e.g. after modifying a set in place"""
+
+        self._interval_index = None
+        self._term_params = None
+
+    def _get_term_params(self):
+        """Trapezoid parameters of the terms stacked as (1 x terms) rows, and the terms with other functions"""
+
+        if self._term_params is None:
+            functions = [fset.membership_function for fset in self.values()]
+            bounded = [i for i, f in enumerate(functions) if isinstance(f, (Trapezoid, Triangle))]
+            unbounded = [i for i, f in enumerate(functions) if not isinstance(f, (Trapezoid, Triangle))]
+            params = np.array([functions[i].params for i in bounded], dtype=float).reshape(-1, 4)
+
+            self._term_params = dict(bounded=bounded if len(bounded) < len(functions) else slice(None),
+                                     unbounded=unbounded, params=params.T[:, None, :])
+
+        return self._term_params
+
+    def memberships(self, data, out=None):
+        """Membership degrees of the values in every term, as a (values x terms) array with the terms in order.
+
+        Trapezoid (and triangle) terms are evaluated together from their stacked parameters, CHUNK_SIZE values at
+        a time, so the only temporary is one chunk of degrees; other functions are evaluated term by term. 'out', if
+        given, is a float array of that shape receiving the degrees (and returned). For a single value, returns
+        the degrees of the terms as a one-dimensional array.
+        """
+
+        params = self._get_term_params()
+        x = np.asarray(data, dtype=float)
+        if x.ndim > 1:
+            raise ValueError(f"Data must be a value or a one-dimensional array (got shape {x.shape})")
+
+        shape = x.shape + (len(self),)
+        if out is None:
+            out = np.empty(shape)
+        elif out.shape != shape:
+            raise ValueError(f"Output array must have shape {shape} (got {out.shape})")
+
+        rows = np.atleast_1d(x)[:, None]
+        columns = out.reshape(len(rows), len(self))
+        bounded, (a, b, c, d) = params['bounded'], params['params']
+
+        for start in range(0, len(rows), self.CHUNK_SIZE) if a.size else ():
+            xs = rows[start:start + self.CHUNK_SIZE]
+            # written in place when all terms are trapezoids, otherwise computed aside and copied
+            y = columns[start:start + len(xs)] if isinstance(bounded, slice) else np.empty((len(xs), a.shape[1]))
+            Trapezoid.evaluate_params_into(xs, a, b, c, d, out=y)
+            if not isinstance(bounded, slice):
+                columns[start:start + len(xs), bounded] = y
+
+        names = list(self.keys())
+        for i in params['unbounded']:
+            columns[:, i] = self[names[i]].get_values(x)
+
+        return out
+
+    def _get_interval_index(self):
+        """Terms covering every slot between the sorted support endpoints (CSR), and the unbounded terms.
+
+        Slot 2j + 1 is the endpoint e_j and slot 2j the open interval (e_j-1, e_j); a trapezoid or triangle on
+        [a, d] covers the slots from the one of a to the one of d. Other functions are evaluated for every value.
+        """
+
+        if self._interval_index is None:
+            functions = [fset.membership_function for fset in self.values()]
+            bounded = np.array([i for i, f in enumerate(functions) if isinstance(f, (Trapezoid, Triangle))], dtype=int)
+            unbounded = [i for i, f in enumerate(functions) if not isinstance(f, (Trapezoid, Triangle))]
+
+            params = np.array([functions[i].params for i in bounded], dtype=float).reshape(-1, 4)
+            endpoints = np.unique(params[:, [0, 3]])
+            first = 2 * np.searchsorted(endpoints, params[:, 0]) + 1
+            last = 2 * np.searchsorted(endpoints, params[:, 3]) + 1
+
+            lengths = last - first + 1
+            slots = np.repeat(first - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+            order = np.argsort(slots, kind='stable')
+            indptr = np.searchsorted(slots[order], np.arange(2 * len(endpoints) + 2))
+
+            self._interval_index = dict(names=tuple(self.keys()), params=params, endpoints=endpoints,
+                                        indptr=indptr, terms=np.repeat(np.arange(len(bounded)), lengths)[order],
+                                        bounded=bounded, unbounded=unbounded)
+
+        return self._interval_index
+
+    def get_nonzero_values(self, data):
+        """Terms with non-zero membership for each value, found through the interval index of the term supports.
+
+        For an array of values returns SparseMemberships; for a single value, a dict of degrees by term name. The
+        cost per value is O(log n + k) for n trapezoid (or triangle) terms of which k cover the value.
+        """
+
+        index = self._get_interval_index()
+        x = np.atleast_1d(np.asarray(data, dtype=float))
+        if x.ndim != 1:
+            raise ValueError(f"Data must be a value or a one-dimensional array (got shape {x.shape})")
+
+        endpoints = index['endpoints']
+        j = np.searchsorted(endpoints, x)
+        slot = 2 * j + (endpoints[np.minimum(j, len(endpoints) - 1)] == x) if len(endpoints) else np.zeros(len(x), int)
+
+        # candidate (value, term) pairs covered by the slots of the values
+        starts, counts = index['indptr'][slot], index['indptr'][slot + 1] - index['indptr'][slot]
+        rows = np.repeat(np.arange(len(x)), counts)
+        positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        terms = index['terms'][positions]
+
+        a, b, c, d = index['params'][terms].T
+        rows, terms, values = [rows], [index['bounded'][terms]], [Trapezoid.evaluate_params(x[rows], a, b, c, d)]
+
+        for i in index['unbounded']:
+            rows.append(np.arange(len(x)))
+            terms.append(np.full(len(x), i))
+            values.append(np.broadcast_to(np.asarray(self[index['names'][i]].get_values(x), dtype=float), x.shape))
+
+        rows, terms, values = np.concatenate(rows), np.concatenate(terms), np.concatenate(values)
+        nonzero = values != 0
+        rows, terms, values = rows[nonzero], terms[nonzero], values[nonzero]
+
+        order = np.lexsort((terms, rows))
+        sparse = SparseMemberships(index['names'], np.searchsorted(rows[order], np.arange(len(x) + 1)),
+                                   terms[order], values[order])
+
+        return sparse.row(0) if np.ndim(data) == 0 else sparse
@@ -0,0 +1,184 @@
+import numpy as np
+
+from fuzzy_fuss.fuzz.func import Trapezoid, Triangle
+from fuzzy_fuss.fuzz.fuzzy_set import FuzzySet
+from fuzzy_fuss.fuzz.fuzzy_rule import LinearConclusion
+
+
+class IncrementalEvaluator(object):
+    """Stateful evaluation of a RuleBase for measurements of which only some change at a time (as in control loops).
+
+    The degrees of the antecedent pairs, the rule weights and the crisp conclusions of the last measurements are
+    kept. update() recomputes only the degrees of the pairs of the changed variables and the weights of the rules
+    using the pairs whose degree changed.
+
+    Cuts of a set are monotonic in the level (for both compositions), so the aggregate of the rules concluding on
+    the same set is that set cut at their largest weight: the aggregate is kept as the largest weight per
+    conclusion set, and a conclusion is aggregated and defuzzified again only if one of these changed (or, for
+    Takagi-Sugeno rules, the weight of a rule or an input of a firing rule's linear function). Results are those
+    of RuleBase.evaluate with the same arguments (up to rounding for exact and adaptive defuzzification).
+
+    The rule base must not be modified while the evaluator is in use.
+    """
+
+    def __init__(self, rule_base, measurements: dict, grid_size=1, defuzz_method='coa', exact=False, tolerance=None,
+                 **kwargs):
+        self.rule_base = rule_base
+        self.options = dict(grid_size=grid_size, method=defuzz_method, exact=exact, tolerance=tolerance)
+        self.kwargs = kwargs
+
+        index = rule_base._get_index()
+        self.rules = index['rules']
+        pairs = list(index['antecedents'])
+
+        # variable -> rows of its pairs in the degree table, with trapezoid parameters when all its terms have them
+        self._variable_rows = {}
+        for row, (name, value) in enumerate(pairs):
+            self._variable_rows.setdefault(name, []).append(row)
+        self._variable_params = {}
+        for name, rows in self._variable_rows.items():
+            functions = [rule_base.variables[name][pairs[row][1]].membership_function for row in rows]
+            if all(isinstance(f, (Trapezoid, Triangle)) for f in functions):
+                self._variable_params[name] = tuple(np.array([f.params for f in functions]).T)
+        self._sets = [rule_base.variables[name][value] for name, value in pairs]
+
+        # rows of the atoms of each rule, the rules using each row, and the rules with a linear function of each input
+        self._rule_rows = [[index['antecedents'][tuple(atom)] for atom in rule.prop_atoms] for rule in self.rules]
+        self._row_rules = [[] for _ in pairs]
+        for r, rows in enumerate(self._rule_rows):
+            for row in set(rows):
+                self._row_rules[row].append(r)
+        self._linear_rules = {}
+        for r, rule in enumerate(self.rules):
+            if isinstance(rule.conclusion, LinearConclusion):
+                for name in rule.conclusion.input_names:
+                    self._linear_rules.setdefault(name, []).append(r)
+
+        self._outputs = {r: name for name, indices in index['conclusions'].items() for r in indices}
+        self._set_rules = {}
+        for r, rule in enumerate(self.rules):
+            if not isinstance(rule.conclusion, LinearConclusion):
+                self._set_rules.setdefault(tuple(rule.conclusion), []).append(r)
+        self.input_names = tuple(rule_base.input_names)
+
+        self.measurements = {}
+        for name in self.input_names:
+            try:
+                self.measurements[name] = float(measurements[name])
+            except KeyError:
+                raise ValueError(f"Missing data for variable {name}")
+
+        self.degrees = rule_base.fuzzify(self.measurements).tolist()
+        self.weights = [rule.choose_weight([self.degrees[row] for row in rows])
+                        for rule, rows in zip(self.rules, self._rule_rows)]
+        self.set_weights = {key: max(self.weights[r] for r in rules) for key, rules in self._set_rules.items()}
+        self.results = {name: self._conclude(name) for name in index['conclusions']}
+
+    def __repr__(self):
+        return f"Incremental evaluator of '{self.rule_base.name}' at " \
+               f"{', '.join(f'{name}={value:g}' for name, value in self.measurements.items())}"
+
+    @property
+    def value(self):
+        """Crisp conclusion, or a dict of them by variable name for several outputs (as returned by update)"""
+
+        return dict(self.results) if len(self.results) > 1 else next(iter(self.results.values()))
+
+    def rule_weights(self):
+        """Current weights of the rules by rule name"""
+
+        return {rule.name: weight for rule, weight in zip(self.rules, self.weights)}
+
+    def _fuzzify(self, name, x):
+        params = self._variable_params.get(name)
+        if params is not None:
+            return Trapezoid.evaluate_params(x, *params).tolist()
+        return [float(self._sets[row].get_values(x)) for row in self._variable_rows[name]]
+
+    def update(self, measurements: dict = None, **values):
+        """Set new values of some inputs and return the crisp conclusion(s), recomputing only what they change"""
+
+        values = {**(measurements or {}), **values}
+
+        changed_rows, dirty = [], set()
+        for name, x in values.items():
+            if name not in self.measurements:
+                raise ValueError(f"Variable {name} is not an input of rule base '{self.rule_base.name}'")
+
+            x = float(x)
+            if x == self.measurements[name]:
+                continue
+            self.measurements[name] = x
+
+            if name in self._variable_rows:  # not for inputs of linear conclusions only
+                for row, degree in zip(self._variable_rows[name], self._fuzzify(name, x)):
+                    if degree != self.degrees[row]:
+                        self.degrees[row] = degree
+                        changed_rows.append(row)
+
+            # the output of a firing Takagi-Sugeno rule changes with the inputs of its function
+            dirty.update(self._outputs[r] for r in self._linear_rules.get(name, ()) if self.weights[r] != 0)
+
+        stats = self.rule_base.stats
+        if stats is not None:
+            stats.start()
+            stats.lap('fuzzification', atoms_updated=len(changed_rows))
+
+        rules = sorted(set(r for row in changed_rows for r in self._row_rules[row]))
+        stale = set()  # conclusion sets of which the rule with the largest weight decreased
+        for r in rules:
+            weight = self.rules[r].choose_weight([self.degrees[row] for row in self._rule_rows[r]])
+            previous = self.weights[r]
+            if weight == previous:
+                continue
+            self.weights[r] = weight
+
+            key = tuple(self.rules[r].conclusion)
+            if key not in self._set_rules:  # linear conclusion
+                dirty.add(self._outputs[r])
+            elif weight > self.set_weights[key]:
+                self.set_weights[key] = weight
+                dirty.add(key[0])
+            elif previous == self.set_weights[key]:
+                stale.add(key)
+
+        for key in stale:
+            set_weight = max(self.weights[r] for r in self._set_rules[key])
+            if set_weight != self.set_weights[key]:
+                self.set_weights[key] = set_weight
+                dirty.add(key[0])
+        if stats is not None:
+            stats.lap('weights', rules_updated=len(rules))
+
+        for name in sorted(dirty):
+            self.results[name] = self._conclude(name, stats)
+
+        return self.value
+
+    def _conclude(self, name, stats=None):
+        if name in self.rule_base.tsk_outputs:  # weighted average of the rule outputs
+            firing = [r for r in self.rule_base.group_by_conclusion()[name] if self.weights[r] != 0]
+            crisp = self.rule_base.tsk_average([self.weights[r] for r in firing],
+                                               [self.rules[r].conclusion(self.measurements) for r in firing]) \
+                if firing else np.nan
+            if stats is not None:
+                stats.lap('aggregation', conclusions=len(firing))
+            return None if np.isnan(crisp) else float(crisp)
+
+        values = self.rule_base._get_index()['conclusion_sets'][name]
+        group = [value for value in values if self.set_weights[name, value] != 0] or values  # none: all cut to 0
+        compound_conclusion = FuzzySet.union(*(self.rule_base.variables[name][value].cut(self.set_weights[name, value],
+                                                                                         **self.kwargs)
+                                               for value in group))
+        if len(group) < len(values):
+            mf = compound_conclusion.membership_function
+            compound_conclusion = FuzzySet(mf.make(support=self.rule_base._conclusion_support(name)),
+                                           variable_name=compound_conclusion.variable_name,
+                                           value_name=compound_conclusion.value_name)
+        if stats is not None:
+            stats.lap('aggregation', conclusions=len(group))
+
+        crisp = compound_conclusion.defuzzify(stats=stats, **self.options)
+        if stats is not None:
+            stats.lap('defuzzification')
+        return crisp
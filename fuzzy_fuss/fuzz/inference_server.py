@@ -0,0 +1,277 @@
+import sys
+import json
+import time
+import asyncio
+import numpy as np
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ServerStats(object):
+    """Queue depth, batch sizes and request latencies (from arrival to result) of an InferenceServer.
+
+    Latency percentiles are computed over the last 'window' requests.
+    """
+
+    def __init__(self, window=100000):
+        self.batch_sizes = Counter()
+        self.latencies = deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+
+    def record_batch(self, size, latencies):
+        self.batch_sizes[size] += 1
+        self.latencies.extend(latencies)
+        self.requests += size
+
+    def histogram(self):
+        """Number of batches by size bucket (1, 2, 3-4, 5-8, ...)"""
+
+        buckets = Counter()
+        for size, count in self.batch_sizes.items():
+            upper = 1 << (size - 1).bit_length()
+            buckets[upper] += count
+
+        return {(f"{upper // 2 + 1}-{upper}" if upper > 2 else str(upper)): buckets[upper] for upper in sorted(buckets)}
+
+    def percentile(self, q):
+        return float(np.percentile(self.latencies, q)) if self.latencies else None
+
+    def as_dict(self):
+        batches = sum(self.batch_sizes.values())
+        return dict(requests=self.requests, errors=self.errors, batches=batches,
+                    mean_batch_size=self.requests / batches if batches else None,
+                    queue_depth=self.queue_depth, max_queue_depth=self.max_queue_depth,
+                    batch_sizes=self.histogram(), latency_p50=self.percentile(50), latency_p99=self.percentile(99))
+
+    def __repr__(self):
+        stats = self.as_dict()
+        p50, p99 = (f"{stats[key] * 1e3:.3f} ms" if stats[key] is not None else '-'
+                    for key in ('latency_p50', 'latency_p99'))
+
+        lines = [f"{stats['requests']} requests ({stats['errors']} errors) in {stats['batches']} batches, "
+                 f"latency p50 {p50}, p99 {p99}, queue depth {stats['queue_depth']} (max {stats['max_queue_depth']})"]
+        lines.extend(f"  batch size {bucket:<12} {count:>10}" for bucket, count in stats['batch_sizes'].items())
+        return '\n'.join(lines)
+
+
+class InferenceServer(object):
+    """Asyncio server evaluating measurements sent by clients, with concurrent requests grouped into micro-batches.
+
+    Requests wait in a queue until 'max_batch' of them are collected or the oldest has waited 'max_delay' seconds;
+    the batch is then evaluated with a single evaluate_batch call of the rule base (its compiled plan, when
+    available) in a worker thread, while the next batch is collected. Keyword arguments are passed to
+    evaluate_batch, and 'defaults' fill in the variables missing from a request. A source with an 'evaluator'
+    attribute (as a ReloadableRuleBase) is read again for every batch, so the server follows its reloads.
+
+    The protocol is line-delimited JSON over TCP: a request is an object of measurements by variable name, with
+    an optional 'id' echoed in the response; the response holds the crisp conclusions by variable name (null
+    where no rule fires), or an 'error'. The request {"op": "stats"} returns the ServerStats as an object.
+    """
+
+    def __init__(self, rule_base, max_batch=256, max_delay=0.002, defaults=None, **kwargs):
+        self._source = rule_base if hasattr(rule_base, 'evaluator') else None
+        try:
+            self._evaluator = rule_base.compile()
+        except (AttributeError, TypeError):
+            self._evaluator = rule_base  # already compiled, not compilable, or a source
+
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.defaults = dict(defaults or {})
+        self.kwargs = kwargs
+        self.stats = ServerStats()
+
+        self._queue = None
+        self._batcher = None
+        self._executor = None
+
+    @property
+    def evaluator(self):
+        return self._source.evaluator if self._source is not None else self._evaluator
+
+    @property
+    def input_names(self):
+        return tuple(self.evaluator.input_names)
+
+    @property
+    def output_names(self):
+        return tuple(sorted(self.evaluator.conclusion_names))
+
+    async def start(self):
+        if self._batcher is None:
+            self._queue = asyncio.Queue()
+            self._executor = ThreadPoolExecutor(1)  # batches are evaluated one at a time, in order
+            self._batcher = asyncio.ensure_future(self._run_batches())
+
+    async def stop(self):
+        if self._batcher is not None:
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+            self._executor.shutdown()
+            self._batcher = None
+
+    def _values(self, measurements):
+        values = dict(self.defaults)
+        for name, value in measurements.items():
+            try:
+                values[name] = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid value of variable {name}: {value!r}")
+
+        return values
+
+    async def evaluate(self, measurements: dict):
+        """Crisp conclusions (by variable name) of one set of measurements, evaluated within a micro-batch"""
+
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((self._values(measurements), future, time.perf_counter()))
+        self.stats.queue_depth = self._queue.qsize()
+        self.stats.max_queue_depth = max(self.stats.max_queue_depth, self.stats.queue_depth)
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_delay
+
+        while len(batch) < self.max_batch:
+            if self._queue.empty():
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            else:
+                batch.append(self._queue.get_nowait())
+
+        self.stats.queue_depth = self._queue.qsize()
+        return batch
+
+    def _evaluate_batch(self, requests):
+        """Results of the requests (dicts of values), or the exception for those which cannot be evaluated"""
+
+        evaluator = self.evaluator  # the same version for the whole batch
+        input_names = tuple(evaluator.input_names)
+        output_names = tuple(sorted(evaluator.conclusion_names))
+
+        results, rows = [], []
+        for values in requests:
+            missing = [name for name in input_names if name not in values]
+            results.append(ValueError(f"Missing data for variable {missing[0]}") if missing else None)
+            if not missing:
+                rows.append([values[name] for name in input_names])
+        if not rows:
+            return results
+
+        inputs = np.array(rows, dtype=float).reshape(len(rows), len(input_names)).T
+        outputs = evaluator.evaluate_batch(dict(zip(input_names, inputs)), **self.kwargs)
+        if not isinstance(outputs, dict):
+            outputs = {output_names[0]: outputs}
+
+        columns = [np.asarray(outputs[name], dtype=float).tolist() for name in output_names]
+        rows = iter(zip(*columns))
+        return [result if result is not None else
+                {name: None if np.isnan(value) else value for name, value in zip(output_names, next(rows))}
+                for result in results]
+
+    async def _run_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            try:
+                results = await loop.run_in_executor(self._executor, self._evaluate_batch, [r for r, _, _ in batch])
+            except Exception as e:  # counted as errors by the requests
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            now = time.perf_counter()
+            self.stats.record_batch(len(batch), [now - arrival for _, _, arrival in batch])
+            for (_, future, _), result in zip(batch, results):
+                if future.done():  # the client may be gone
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    async def _respond(self, line, writer):
+        request = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("A request must be a JSON object")
+
+            if request.get('op') == 'stats':
+                response = self.stats.as_dict()
+            else:
+                measurements = {key: value for key, value in request.items() if key not in ('id', 'op')}
+                response = await self.evaluate(measurements)
+        except Exception as e:
+            self.stats.errors += 1
+            response = {'error': str(e)}
+
+        if isinstance(request, dict) and 'id' in request:
+            response = {'id': request['id'], **response}
+        writer.write((json.dumps(response) + '\n').encode())
+        await writer.drain()
+
+    async def _handle(self, reader, writer):
+        # requests of a connection are answered as they complete, so a client may pipeline them (matching the ids)
+        pending = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    task = asyncio.ensure_future(self._respond(line, writer))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+
+            if pending:
+                await asyncio.wait(pending)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for task in pending:
+                task.cancel()
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8765, ready=None):
+        """Serve until cancelled; 'ready', if given, is called with the server once it listens"""
+
+        await self.start()
+        server = await asyncio.start_server(self._handle, host, port)
+        try:
+            if ready is not None:
+                ready(server)
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.stop()
+
+    def run(self, host='127.0.0.1', port=8765, stream=sys.stderr):
+        """Serve until interrupted, then print the statistics"""
+
+        def ready(server):
+            addresses = ', '.join(f"{s.getsockname()[0]}:{s.getsockname()[1]}" for s in server.sockets)
+            print(f"Serving {', '.join(self.output_names)} on {addresses}", file=stream)
+
+        try:
+            asyncio.run(self.serve(host, port, ready=ready))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            print(self.stats, file=stream)
@@ -0,0 +1,126 @@
+import numpy as np
+from bisect import bisect_right
+from itertools import product
+
+
+class LookupTable(object):
+    """Response surface of a rule base precomputed on a grid, evaluated by multilinear interpolation.
+
+    Inputs outside the grid are clamped to its edges. 'max_error' is the largest deviation from the rule base
+    measured at the centres of the grid cells when the table was built (NaN responses excluded).
+    """
+
+    def __init__(self, axes: dict, values, max_error=None, name=None):
+        self.names = tuple(axes.keys())
+        self.axes = tuple(np.asarray(axis, dtype=float) for axis in axes.values())
+        self.values = np.asarray(values, dtype=float)
+        self.max_error = max_error
+        self.name = name
+
+        if self.values.shape != tuple(len(axis) for axis in self.axes):
+            raise ValueError(f"Shape of the values {self.values.shape} does not match the grid "
+                             f"{tuple(len(axis) for axis in self.axes)}")
+
+        for name, axis in zip(self.names, self.axes):
+            if axis.ndim != 1 or len(axis) < 2 or np.any(np.diff(axis) <= 0):
+                raise ValueError(f"Grid for '{name}' must be an increasing array of at least 2 values")
+
+        # plain Python copies for the scalar path, which is faster than NumPy for a single point
+        self._axes_lists = [axis.tolist() for axis in self.axes]
+        self._strides = [stride // self.values.itemsize for stride in np.ascontiguousarray(self.values).strides]
+        self._flat = self.values.ravel().tolist()
+
+    def __repr__(self):
+        grid = ' x '.join(f"{name} ({len(axis)})" for name, axis in zip(self.names, self.axes))
+        return f"Lookup table{f' of {self.name}' if self.name else ''} over {grid}, max. error {self.max_error}"
+
+    def __call__(self, measurements: dict = None, **kwargs):
+        measurements = {**(measurements or {}), **kwargs}
+
+        try:
+            point = [measurements[name] for name in self.names]
+        except KeyError as e:
+            raise ValueError(f"Missing data for variable {e.args[0]}")
+
+        if all(isinstance(x, (int, float)) for x in point):
+            return self._interpolate_scalar(point)
+
+        return self._interpolate(np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in point)))
+
+    def _interpolate_scalar(self, point):
+        corners = [(0, 1.)]  # (flat index, weight)
+        for axis, stride, x in zip(self._axes_lists, self._strides, point):
+            i = min(max(bisect_right(axis, x) - 1, 0), len(axis) - 2)
+            t = min(max((x - axis[i]) / (axis[i + 1] - axis[i]), 0.), 1.)
+            corners = [(k + i * stride, w * (1 - t)) for k, w in corners] + \
+                      [(k + (i + 1) * stride, w * t) for k, w in corners]
+
+        return sum(w * self._flat[k] for k, w in corners if w)
+
+    def _interpolate(self, point):
+        indices, fractions = [], []
+        for axis, x in zip(self.axes, point):
+            i = np.clip(np.searchsorted(axis, x, side='right') - 1, 0, len(axis) - 2)
+            indices.append(i)
+            fractions.append(np.clip((x - axis[i]) / (axis[i + 1] - axis[i]), 0., 1.))
+
+        result = np.zeros(point[0].shape)
+        for corner in product((0, 1), repeat=len(point)):
+            weight = np.prod([t if bit else 1 - t for t, bit in zip(fractions, corner)], axis=0)
+            value = self.values[tuple(i + bit for i, bit in zip(indices, corner))]
+            result += np.where(weight > 0, weight * value, 0.)
+
+        return result
+
+    @staticmethod
+    def make_axis(spec):
+        """Grid points from a (start, stop, number of points) tuple, or an explicit array of points"""
+
+        if isinstance(spec, tuple) and len(spec) == 3:
+            return np.linspace(spec[0], spec[1], int(spec[2]))
+        return np.asarray(spec, dtype=float)
+
+    @staticmethod
+    def build(rule_base, grid_spec: dict, **kwargs):
+        """Tabulate 'rule_base' on the grid given by 'grid_spec' (variable name -> axis spec, see make_axis).
+
+        Keyword arguments are passed to the rule base's evaluate_batch.
+        """
+
+        if len(rule_base.conclusion_names) > 1:
+            raise RuntimeError(f"A lookup table tabulates a single output, the rule base concludes on "
+                               f"{list(rule_base.conclusion_names)}")
+
+        missing = set(rule_base.input_names) - set(grid_spec)
+        if missing:
+            raise ValueError(f"Grid not specified for input variables: {sorted(missing)}")
+
+        axes = {name: LookupTable.make_axis(spec) for name, spec in grid_spec.items()}
+
+        grid = np.meshgrid(*axes.values(), indexing='ij')
+        values = rule_base.evaluate_batch({name: g.ravel() for name, g in zip(axes, grid)}, **kwargs)
+        table = LookupTable(axes, values.reshape(grid[0].shape), name=rule_base.name)
+
+        # linear interpolation errors peak between the grid points: check the cell centres
+        centres = np.meshgrid(*((axis[1:] + axis[:-1]) / 2 for axis in table.axes), indexing='ij')
+        centres = {name: c.ravel() for name, c in zip(axes, centres)}
+        error = np.abs(table(centres) - rule_base.evaluate_batch(centres, **kwargs))
+        table.max_error = float(np.nanmax(error)) if not np.all(np.isnan(error)) else np.nan
+
+        return table
+
+    def save(self, filename):
+        """Save the table to a .npz file"""
+
+        arrays = {f'axis_{i}': axis for i, axis in enumerate(self.axes)}
+        np.savez(filename, values=self.values, names=np.array(self.names), name=np.array(self.name or ''),
+                 max_error=np.array(np.nan if self.max_error is None else self.max_error), **arrays)
+
+    @staticmethod
+    def load(filename):
+        with np.load(filename) as data:
+            names = [str(name) for name in data['names']]
+            axes = {name: data[f'axis_{i}'] for i, name in enumerate(names)}
+            max_error = float(data['max_error'])
+            return LookupTable(axes, data['values'], max_error=None if np.isnan(max_error) else max_error,
+                               name=str(data['name']) or None)
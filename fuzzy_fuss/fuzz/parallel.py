@@ -0,0 +1,114 @@
+import os
+import numpy as np
+import multiprocessing as mp
+from multiprocessing import shared_memory, resource_tracker
+
+from fuzzy_fuss.fuzz.fuzzy_rule_base import RuleBase
+
+
+# state of a worker process: the evaluator received once at start-up, and the shared blocks of the current call
+_worker = {}
+
+
+def _init_worker(evaluator, input_names, output_names):
+    _worker.clear()
+    _worker.update(evaluator=evaluator, input_names=input_names, output_names=output_names, blocks={})
+
+
+def _get_blocks(names):
+    if _worker['blocks'] and names != tuple(_worker['blocks']):
+        for shm in _worker['blocks'].values():  # blocks of a previous call are no longer needed
+            shm.close()
+        _worker['blocks'] = {}
+
+    if not _worker['blocks']:
+        _worker['blocks'] = {name: shared_memory.SharedMemory(name=name) for name in names}
+
+    return [_worker['blocks'][name] for name in names]
+
+
+def _evaluate_chunk(task):
+    input_name, output_name, size, start, stop, kwargs = task
+    input_shm, output_shm = _get_blocks((input_name, output_name))
+
+    inputs = np.ndarray((len(_worker['input_names']), size), dtype=float, buffer=input_shm.buf)
+    results = _worker['evaluator'].evaluate_batch(dict(zip(_worker['input_names'], inputs[:, start:stop])), **kwargs)
+    if not isinstance(results, dict):
+        results = {_worker['output_names'][0]: results}
+
+    outputs = np.ndarray((len(_worker['output_names']), size), dtype=float, buffer=output_shm.buf)
+    for row, name in zip(outputs, _worker['output_names']):
+        row[start:stop] = results[name]
+    return stop - start
+
+
+class ParallelEvaluator(object):
+    """Pool of worker processes evaluating batches of measurements with a rule base.
+
+    The rule base (its compiled plan, when available) is sent to every worker once, at start-up. Input and
+    output arrays are passed through shared memory and the workers only receive the row ranges to evaluate, so
+    results are identical to those of evaluate_batch and are returned in input order.
+    """
+
+    def __init__(self, rule_base, workers=None, context=None):
+        try:
+            self.evaluator = rule_base.compile()
+        except (AttributeError, TypeError):
+            self.evaluator = rule_base  # not compilable: needs the 'fork' start method to reach the workers
+
+        self.input_names = tuple(rule_base.input_names)
+        self.output_names = tuple(sorted(rule_base.conclusion_names))
+        self.workers = workers or os.cpu_count()
+        # workers must share the resource tracker of this process, which owns (and unlinks) the shared memory
+        resource_tracker.ensure_running()
+        self._pool = mp.get_context(context).Pool(self.workers, initializer=_init_worker,
+                                                  initargs=(self.evaluator, self.input_names, self.output_names))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
+
+    def evaluate_batch(self, measurements, chunk_size=None, **kwargs):
+        """Evaluate a batch split into chunks of rows (by default about 4 per worker) across the workers.
+
+        Keyword arguments are passed to evaluate_batch of the rule base.
+        """
+
+        batch = RuleBase.as_batch(measurements)
+        try:
+            columns = [batch[name] for name in self.input_names]
+        except KeyError as e:
+            raise ValueError(f"Missing data for variable {e.args[0]}")
+
+        size = len(columns[0])
+        chunk_size = chunk_size or max(1, -(-size // (4 * self.workers)))
+
+        input_shm = shared_memory.SharedMemory(create=True, size=max(1, 8 * size * len(columns)))
+        output_shm = shared_memory.SharedMemory(create=True, size=max(1, 8 * size * len(self.output_names)))
+        inputs = None
+        try:
+            inputs = np.ndarray((len(columns), size), dtype=float, buffer=input_shm.buf)
+            for row, column in zip(inputs, columns):
+                row[:] = column
+
+            tasks = [(input_shm.name, output_shm.name, size, start, min(start + chunk_size, size), kwargs)
+                     for start in range(0, size, chunk_size)]
+            for _ in self._pool.imap_unordered(_evaluate_chunk, tasks):
+                pass
+
+            outputs = np.ndarray((len(self.output_names), size), dtype=float, buffer=output_shm.buf).copy()
+        finally:
+            del inputs
+            for shm in (input_shm, output_shm):
+                shm.close()
+                shm.unlink()
+
+        if len(self.output_names) > 1:
+            return dict(zip(self.output_names, outputs))
+        return outputs[0]
@@ -0,0 +1,136 @@
+"""Algebra of piecewise-linear functions given by their breakpoints.
+
+A function is a pair of arrays (xs, ys) with non-decreasing xs; a repeated x value marks a jump. Between the
+breakpoints the function is linear, outside them it is constant, and at a jump it takes the right-hand value
+(the convention of np.interp). A closed right edge - a jump down that keeps the upper value at the edge, as for
+a trapezoid with c == d - is therefore placed one floating-point step to the right of the edge.
+"""
+
+import numpy as np
+
+
+EPS = 1e-12
+ENVELOPE_GROUP = 32  # functions merged at once by envelope, on the union of their breakpoints
+
+
+def trapezoid(a, b, c, d, height=1.):
+    """Breakpoints of a trapezoid with corners a <= b <= c <= d, clipped at the given height"""
+
+    xs = np.array([a, a + height * (b - a), d - height * (d - c), d], dtype=float)
+    ys = np.array([0., height, height, 0.])
+
+    if xs[3] == xs[2]:
+        xs[3] = np.nextafter(xs[3], np.inf)
+
+    return xs, ys
+
+
+def constant(value, x=0.):
+    return np.array([x], dtype=float), np.array([value], dtype=float)
+
+
+def evaluate(xs, ys, x):
+    return np.interp(x, xs, ys)
+
+
+def left_limit(xs, ys, x):
+    return np.interp(-np.asarray(x), -xs[::-1], ys[::-1])
+
+
+def simplify(xs, ys):
+    """Drop repeated and collinear breakpoints"""
+
+    repeated = np.zeros(len(xs), dtype=bool)
+    repeated[1:] = (np.diff(xs) == 0) & (np.diff(ys) == 0)
+    xs, ys = xs[~repeated], ys[~repeated]
+
+    if len(xs) < 3:
+        return xs, ys
+
+    dx1, dy1 = xs[1:-1] - xs[:-2], ys[1:-1] - ys[:-2]
+    dx2, dy2 = xs[2:] - xs[1:-1], ys[2:] - ys[1:-1]
+    scale = (np.abs(dx1) + np.abs(dy1)) * (np.abs(dx2) + np.abs(dy2))
+    collinear = (np.abs(dx1 * dy2 - dy1 * dx2) <= EPS * scale) & (dx1 * dx2 + dy1 * dy2 > 0)
+
+    keep = np.concatenate([[True], ~collinear, [True]])
+    return xs[keep], ys[keep]
+
+
+def _line_envelope(y0, y1):
+    """Kinks (t, y) of the upper envelope of lines y0 + (y1 - y0) * t on 0 < t < 1"""
+
+    slopes = y1 - y0
+    top = np.flatnonzero(y0 == y0.max())
+    j = top[slopes[top].argmax()]
+
+    kinks = []
+    while True:
+        steeper = np.flatnonzero(slopes > slopes[j])
+        if not steeper.size:
+            break
+
+        crossings = (y0[j] - y0[steeper]) / (slopes[steeper] - slopes[j])
+        t = crossings.min()
+        if t >= 1:
+            break
+
+        first = steeper[crossings <= t + EPS]
+        if t > 0:
+            kinks.append((t, y0[j] + slopes[j] * t))
+        j = first[slopes[first].argmax()]
+
+    return kinks
+
+
+def envelope(functions, minimum=False):
+    """Pointwise maximum (or minimum) of piecewise-linear functions, with breakpoints added where they cross.
+
+    Up to ENVELOPE_GROUP functions are evaluated together on the union of their breakpoints; more are split in
+    halves whose envelopes are merged, so the cost is O(K log N) for N functions of K breakpoints in all (with
+    envelopes of bounded size) rather than the O(N K) of evaluating every function on all the breakpoints.
+    """
+
+    functions = list(functions)
+    if len(functions) == 1:
+        return functions[0]
+    if len(functions) > ENVELOPE_GROUP:
+        middle = len(functions) // 2
+        functions = [envelope(functions[:middle], minimum), envelope(functions[middle:], minimum)]
+
+    sign = -1. if minimum else 1.
+    grid = np.unique(np.concatenate([xs for xs, _ in functions]))
+    right = sign * np.array([evaluate(xs, ys, grid) for xs, ys in functions])
+    left = sign * np.array([left_limit(xs, ys, grid) for xs, ys in functions])
+    right_top = right.max(axis=0)
+    left_top = left.max(axis=0)
+
+    # within interval i every function is linear from right[:, i] to left[:, i + 1]; unless a single function
+    # dominates at both ends, the envelope has kinks where the dominating function changes
+    y0, y1 = right[:, :-1], left[:, 1:]
+    dominated = ((y0 == right_top[:-1]) & (y1 == left_top[1:])).any(axis=0)
+
+    kink_x, kink_y = [], []
+    for i in np.flatnonzero(~dominated):
+        for t, y in _line_envelope(y0[:, i], y1[:, i]):
+            kink_x.append(grid[i] + t * (grid[i + 1] - grid[i]))
+            kink_y.append(y)
+
+    jumps = right_top != left_top
+    xs = np.concatenate([grid, grid[jumps], kink_x])
+    ys = np.concatenate([left_top, right_top[jumps], kink_y])
+    order = np.lexsort((np.concatenate([np.zeros(len(grid)), np.ones(jumps.sum()), np.full(len(kink_x), 2.)]), xs))
+
+    return simplify(xs[order], sign * ys[order])
+
+
+def cut(xs, ys, level):
+    return envelope([(xs, ys), constant(level, xs[0])], minimum=True)
+
+
+def restrict(xs, ys, low, high):
+    """Breakpoints of the function on the interval [low, high]"""
+
+    inner = (xs > low) & (xs < high)
+    xs_new = np.concatenate([[low], xs[inner], [high]])
+    ys_new = np.concatenate([[evaluate(xs, ys, low)], ys[inner], [left_limit(xs, ys, high)]])
+    return xs_new, ys_new
@@ -1,19 +1,30 @@
-import matplotlib.pyplot as plt
+# matplotlib is imported on the first plot, so that inference does not load it
+_pyplot = None
 
 
-def setup():
+def pyplot():
+    """matplotlib.pyplot, imported (and set up) on first use"""
+
+    global _pyplot
+    if _pyplot is None:
+        import matplotlib.pyplot as plt
+        setup(plt)
+        _pyplot = plt
+    return _pyplot
+
+
+def setup(plt=None):
+    plt = plt or pyplot()
     plt.rc('axes', grid=True)
     plt.rc('grid', color='lightgray')
     plt.rc('legend', fancybox=True, framealpha=0.5)
 
 
-setup()
-
-
 def refine_plot(show_default=False):
     def decorator(func):
         def wrapper(*args, ax=None, **kwargs):
             show = kwargs.pop('show', show_default)
+            plt = pyplot()
 
             if ax is None:
                 fig, ax = plt.subplots()
@@ -55,7 +66,7 @@ def refine_multiplot(func):
         func(*args, **kwargs)
 
         if show:
-            plt.show()
+            pyplot().show()
 
     return wrapper
 
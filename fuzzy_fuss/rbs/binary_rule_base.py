@@ -0,0 +1,229 @@
+import os
+import json
+import struct
+import hashlib
+import numpy as np
+
+from fuzzy_fuss.fuzz.func import Trapezoid, Triangle
+from fuzzy_fuss.fuzz.antecedent import Antecedent
+from fuzzy_fuss.fuzz.fuzzy_rule import Rule, Atom, LinearConclusion
+from fuzzy_fuss.fuzz.fuzzy4tuple import Fuzzy4Tuple
+from fuzzy_fuss.fuzz.fuzzy_variable import FuzzyVariable
+from fuzzy_fuss.fuzz.fuzzy_rule_base import RuleBase
+from fuzzy_fuss.fuzz.compiled_rule_base import CompiledRuleBase
+
+from fuzzy_fuss.rbs.rule_base_parser import RuleBaseParser
+
+
+class BinaryRuleBase(object):
+    """Binary file format of a parsed rule base, loaded without parsing or building per-rule objects.
+
+    The file holds a JSON header (name tables and the layout of the arrays) followed by raw little-endian arrays,
+    each aligned to 64 bytes: the 4-tuples of all variables, the rules as index arrays, and the arrays of the
+    compiled plan. load() memory-maps the file, so processes loading the same file share its pages.
+    """
+
+    MAGIC = b'FZRB'
+    VERSION = 3  # files of any other version are rejected (load_cached rewrites them)
+    ALIGNMENT = 64
+    PREAMBLE = struct.Struct('<4sIQ')  # magic, version, header length
+
+    # attributes of CompiledRuleBase stored in the header (names) and as arrays
+    PLAN_NAMES = ('name', 'rule_names', 'conclusion_names', 'input_names', 'set_names', 'conclusion_set_names',
+                  'tsk_outputs')
+    PLAN_ARRAYS = ('set_params', 'set_inputs', 'conclusion_params', 'rule_conclusions', 'group_atoms',
+                   'rule_group_starts', 'program_rules', 'program_starts', 'program_ops', 'program_args',
+                   'rule_outputs', 'tsk_rules', 'tsk_coefficients')
+    CONNECTIVES = ('and', 'or')
+
+    @staticmethod
+    def _tuple_params(fuzzy_set):
+        if isinstance(fuzzy_set, Fuzzy4Tuple):
+            return tuple(fuzzy_set)
+
+        mf = fuzzy_set.membership_function
+        if not isinstance(mf, (Trapezoid, Triangle)):
+            raise TypeError(f"Cannot save a fuzzy set with membership function of type {type(mf)} "
+                            f"({fuzzy_set.variable_name}: {fuzzy_set.value_name})")
+        a, b, c, d = mf.params
+        return b, c, b - a, d - c
+
+    @staticmethod
+    def save(filename, rule_base: RuleBase, measurements=None, source_hash=None):
+        variables = rule_base.variables
+        set_index = {(var, val): i for i, (var, val) in
+                     enumerate((var, val) for var in variables for val in variables[var])}
+
+        rules = list(rule_base)
+        atoms = [atom for rule in rules for atom in rule.prop_atoms]
+        # rules with other antecedents than chains of connectives are read from the programs of the plan
+        connectives = [0 if i == 0 or rule.prop_connectives is None else
+                       BinaryRuleBase.CONNECTIVES.index(rule.prop_connectives[i - 1])
+                       for rule in rules for i in range(len(rule.prop_atoms))]
+
+        arrays = {
+            'tuples': np.array([BinaryRuleBase._tuple_params(variables[var][val]) for var, val in set_index],
+                               dtype='<f8').reshape(-1, 4),
+            'rule_atom_starts': np.cumsum([0] + [len(rule.prop_atoms) for rule in rules], dtype='<i8'),
+            'rule_atoms': np.array([set_index[tuple(atom)] for atom in atoms], dtype='<i8'),
+            'rule_connectives': np.array(connectives, dtype='i1'),
+            # -1 for linear conclusions, read from the plan
+            'rule_conclusions': np.array([set_index.get(tuple(rule.conclusion), -1) for rule in rules], dtype='<i8'),
+        }
+
+        compiled = rule_base.compile()
+        arrays.update({f'plan_{key}': getattr(compiled, key) for key in BinaryRuleBase.PLAN_ARRAYS})
+
+        header = {
+            'name': rule_base.name,
+            'source_hash': source_hash,
+            'variables': [[var, list(variables[var])] for var in variables],
+            'rule_names': [rule.name for rule in rules],
+            'measurements': dict(measurements or {}),
+            'plan': {key: getattr(compiled, key) for key in BinaryRuleBase.PLAN_NAMES},
+            'arrays': {},
+        }
+
+        offset = 0
+        for key, array in arrays.items():
+            array = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder('<'))
+            arrays[key] = array
+            header['arrays'][key] = {'offset': offset, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+            offset += -(-array.nbytes // BinaryRuleBase.ALIGNMENT) * BinaryRuleBase.ALIGNMENT
+
+        encoded = json.dumps(header).encode()
+        encoded += b' ' * (-(BinaryRuleBase.PREAMBLE.size + len(encoded)) % BinaryRuleBase.ALIGNMENT)
+
+        with open(filename, 'wb') as f:
+            f.write(BinaryRuleBase.PREAMBLE.pack(BinaryRuleBase.MAGIC, BinaryRuleBase.VERSION, len(encoded)))
+            f.write(encoded)
+            start = f.tell()
+            for key, array in arrays.items():
+                f.seek(start + header['arrays'][key]['offset'])
+                f.write(array.tobytes())
+            f.truncate(start + offset)
+
+    @staticmethod
+    def read_header(filename):
+        with open(filename, 'rb') as f:
+            preamble = f.read(BinaryRuleBase.PREAMBLE.size)
+            if len(preamble) < BinaryRuleBase.PREAMBLE.size:
+                raise ValueError(f"'{filename}' is not a binary rule base file")
+
+            magic, version, length = BinaryRuleBase.PREAMBLE.unpack(preamble)
+            if magic != BinaryRuleBase.MAGIC:
+                raise ValueError(f"'{filename}' is not a binary rule base file")
+            if version != BinaryRuleBase.VERSION:
+                raise ValueError(f"Unsupported version {version} of the binary rule base file '{filename}'")
+
+            header = json.loads(f.read(length))
+
+        header['data_offset'] = BinaryRuleBase.PREAMBLE.size + length
+        return header
+
+    @staticmethod
+    def _read_arrays(filename, header, mmap=True):
+        if mmap:
+            data = np.memmap(filename, dtype=np.uint8, mode='r', offset=header['data_offset'])
+        else:
+            with open(filename, 'rb') as f:
+                f.seek(header['data_offset'])
+                data = np.frombuffer(f.read(), dtype=np.uint8)
+
+        arrays = {}
+        for key, layout in header['arrays'].items():
+            dtype = np.dtype(layout['dtype'])
+            size = int(np.prod(layout['shape'])) * dtype.itemsize
+            arrays[key] = data[layout['offset']:layout['offset'] + size].view(dtype).reshape(layout['shape'])
+
+        return arrays
+
+    @staticmethod
+    def load(filename, mmap=True):
+        """Compiled rule base (arrays memory-mapped unless 'mmap' is False) and measurements from a binary file"""
+
+        header = BinaryRuleBase.read_header(filename)
+        arrays = BinaryRuleBase._read_arrays(filename, header, mmap=mmap)
+
+        plan = header['plan']
+        state = {key: arrays[f'plan_{key}'] for key in BinaryRuleBase.PLAN_ARRAYS}
+        state.update({key: tuple(tuple(v) if isinstance(v, list) else v for v in plan[key])
+                      for key in BinaryRuleBase.PLAN_NAMES if key != 'name'}, name=plan['name'])
+
+        return CompiledRuleBase.from_state(state), header['measurements']
+
+    @staticmethod
+    def load_rule_base(filename):
+        """RuleBase (with its variables as 4-tuples) and measurements from a binary file"""
+
+        header = BinaryRuleBase.read_header(filename)
+        arrays = BinaryRuleBase._read_arrays(filename, header, mmap=False)
+
+        variables, set_names = {}, []
+        params = iter(arrays['tuples'].tolist())
+        for var, values in header['variables']:
+            variables[var] = FuzzyVariable(var)
+            for val in values:
+                variables[var][val] = Fuzzy4Tuple(*next(params), value_name=val)
+                set_names.append((var, val))
+
+        atoms = [Atom(name) for name in set_names]
+        starts = arrays['rule_atom_starts'].tolist()
+        rule_atoms = arrays['rule_atoms'].tolist()
+        connectives = [BinaryRuleBase.CONNECTIVES[c] for c in arrays['rule_connectives'].tolist()]
+
+        antecedents = {}
+        ops, args = arrays['plan_program_ops'], arrays['plan_program_args']
+        program_starts = arrays['plan_program_starts'].tolist()
+        for r, start, stop in zip(arrays['plan_program_rules'].tolist(), program_starts, program_starts[1:]):
+            antecedents[r] = Antecedent.from_program(ops[start:stop].tolist(), args[start:stop].tolist())
+
+        linear = {}
+        plan = header['plan']
+        outputs = arrays['plan_rule_outputs'].tolist()
+        for r, row in zip(arrays['plan_tsk_rules'].tolist(), arrays['plan_tsk_coefficients'].tolist()):
+            coefficients = {name: c for name, c in zip(plan['input_names'], row) if c != 0}
+            linear[r] = LinearConclusion(plan['conclusion_names'][outputs[r]], {**coefficients, '': row[-1]})
+
+        rule_base = RuleBase(header['name'], variables)
+        for r, (name, start, stop, conclusion) in enumerate(zip(header['rule_names'], starts, starts[1:],
+                                                                arrays['rule_conclusions'].tolist())):
+            antecedent = antecedents.get(r)
+            rule_base.add_rule(Rule(name=name, prop_atoms=tuple(atoms[i] for i in rule_atoms[start:stop]),
+                                    prop_connectives=None if antecedent else connectives[start + 1:stop],
+                                    conclusion=linear[r] if conclusion < 0 else atoms[conclusion],
+                                    antecedent=antecedent))
+
+        return rule_base, header['measurements']
+
+    @staticmethod
+    def source_hash(source):
+        with open(source, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    @staticmethod
+    def load_cached(source, cache=None, compiled=True):
+        """Load the text rule base 'source' from its binary cache ('<source>.fzrb' by default).
+
+        The cache is (re)written from the parsed text when missing, unreadable or made from a different text.
+        Returns a compiled rule base (or a RuleBase if 'compiled' is False) and the measurements.
+        """
+
+        cache = cache or f"{source}.fzrb"
+        digest = BinaryRuleBase.source_hash(source)
+
+        try:
+            valid = BinaryRuleBase.read_header(cache)['source_hash'] == digest
+        except (OSError, ValueError):
+            valid = False
+
+        if not valid:
+            rule_base, measurements = RuleBaseParser().parse(source)
+            temporary = f"{cache}.{os.getpid()}.tmp"
+            BinaryRuleBase.save(temporary, rule_base, measurements, source_hash=digest)
+            os.replace(temporary, cache)  # atomic: concurrent readers see either the old or the new file
+
+            if not compiled:
+                return rule_base, dict(measurements)
+
+        return BinaryRuleBase.load(cache) if compiled else BinaryRuleBase.load_rule_base(cache)
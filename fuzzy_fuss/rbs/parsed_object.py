@@ -9,7 +9,7 @@ class ParsedObj(object):
         if not cls.PATTERN:
             raise NotImplementedError(f"Pattern for class {cls.__name__} not specified")
 
-        m = re.fullmatch(cls.PATTERN, line.replace('the ', ''), re.IGNORECASE)
+        m = cls.compiled_pattern().fullmatch(line.replace('the ', ''))
         if not m:
             if silent:
                 return
@@ -17,6 +17,12 @@ class ParsedObj(object):
 
         return cls.process_match(m, **kwargs)
 
+    @classmethod
+    def compiled_pattern(cls):
+        if cls.__dict__.get('_compiled_pattern') is None:  # per class, since subclasses override PATTERN
+            cls._compiled_pattern = re.compile(cls.PATTERN, re.IGNORECASE)
+        return cls._compiled_pattern
+
     @classmethod
     def process_match(cls, m, **kwargs) -> tuple:
         raise NotImplementedError("Match processing method not implemented")
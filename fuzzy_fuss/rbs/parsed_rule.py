@@ -16,7 +16,7 @@ class ParsedAtom(Atom, ParsedObj):
     @staticmethod
     def match_all(line, split_pattern=None):
         split_pattern = split_pattern or " and | or | AND | OR"
-        props = re.split(split_pattern, line, re.IGNORECASE)
+        props = re.split(split_pattern, line, flags=re.IGNORECASE)
         return tuple(ParsedAtom.match(prop, silent=False) for prop in props)
 
 
@@ -0,0 +1,186 @@
+import os
+import time
+import threading
+from collections import namedtuple
+
+from fuzzy_fuss.rbs.rule_base_parser import RuleBaseParser, RuleBaseSyntaxError, _LineError
+
+
+# one loaded version of the file: replaced as a whole, so readers never see a mix of two versions
+RuleBaseVersion = namedtuple('RuleBaseVersion', ['rule_base', 'evaluator', 'measurements', 'number', 'loaded_at'])
+
+
+class ReloadableRuleBase(object):
+    """Handle on a rule base file, reloaded when the file changes (see check, or start for a polling thread).
+
+    A reload parses only the lines which changed: rules are cached by line and variables by their block of lines,
+    so the unchanged ones are kept as they are (with their caches) in the new RuleBase. The new version is built
+    aside - its index, and the compiled plan with 'compiled' - and swapped in with a single assignment, so
+    evaluations started on the previous version finish on it. A file which fails to parse leaves the current
+    version in place ('error' holds the exception).
+
+    'on_reload', if given, is called with the new version after every reload (not the initial load), and
+    'on_error' with the exception when a reload fails.
+    """
+
+    def __init__(self, filename, compiled=False, on_reload=None, on_error=None):
+        self.filename = filename
+        self.compiled = compiled
+        self.on_reload = on_reload
+        self.on_error = on_error
+        self.error = None
+
+        self._rules = {}  # stripped line -> rule
+        self._blocks = {}  # variable name -> (lines of its block, variable)
+        self._signature = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()  # one reload at a time
+
+        self.version = None
+        if not self.reload():
+            raise self.error
+
+    def __repr__(self):
+        return f"Reloadable rule base '{self.filename}' (version {self.version.number})"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    @property
+    def rule_base(self):
+        return self.version.rule_base
+
+    @property
+    def evaluator(self):
+        """Compiled plan of the current version (with 'compiled'), or its RuleBase"""
+
+        return self.version.evaluator
+
+    @property
+    def measurements(self):
+        return self.version.measurements
+
+    @property
+    def input_names(self):
+        return self.version.evaluator.input_names
+
+    @property
+    def conclusion_names(self):
+        return self.version.evaluator.conclusion_names
+
+    def evaluate(self, measurements, **kwargs):
+        return self.version.evaluator.evaluate(measurements, **kwargs)
+
+    def evaluate_batch(self, measurements, **kwargs):
+        return self.version.evaluator.evaluate_batch(measurements, **kwargs)
+
+    def _file_signature(self):
+        stat = os.stat(self.filename)
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def check(self):
+        """Reload the file if it changed since the last (attempted) load; returns True if a new version is in use"""
+
+        try:
+            signature = self._file_signature()
+        except OSError:  # being replaced: checked again next time
+            return False
+
+        return signature != self._signature and self.reload()
+
+    def reload(self):
+        """Load the file as a new version; returns False (and sets 'error') if it could not be"""
+
+        with self._lock:
+            signature = None
+            try:
+                signature = self._file_signature()
+                with open(self.filename) as f:
+                    lines = f.read().splitlines()
+                rule_base, measurements, rules, blocks = self._parse(lines)
+                evaluator = rule_base.compile() if self.compiled else rule_base
+                rule_base._get_index()  # built before the swap, not by the first evaluation
+            except (OSError, RuleBaseSyntaxError, ValueError, TypeError) as e:
+                self.error = e
+                if signature is not None:  # not tried again until the file changes
+                    self._signature = signature
+                failed = True
+            else:
+                failed = False
+                self._rules, self._blocks, self._signature, self.error = rules, blocks, signature, None
+                self.version = RuleBaseVersion(rule_base, evaluator, dict(measurements),
+                                               self.version.number + 1 if self.version else 1, time.time())
+
+        if failed:
+            if self.on_error is not None and self.version is not None:
+                self.on_error(self.error)
+            return False
+
+        if self.on_reload is not None and self.version.number > 1:
+            self.on_reload(self.version)
+        return True
+
+    def _parse(self, lines):
+        parser = RuleBaseParser()
+        rules, blocks = {}, {}
+        current = None  # lines (with their numbers) of the variable block being read
+
+        for lineno, line in enumerate(lines, 1):
+            key = line.strip()
+            rule = self._rules.get(key)
+            if rule is not None:  # unchanged rule
+                parser.rules[rule.name] = rules[key] = rule
+                continue
+
+            if key and '=' not in key and not parser.RULE_HEAD.match(line) and parser.name is not None:
+                if len(key.split()) == 1:  # variable name: a new block
+                    current = blocks[key] = []
+                if current is not None:  # parsed below, if it changed
+                    current.append((lineno, line))
+                    continue
+
+            rule = self._parse_line(parser, lineno, line)
+            if rule is not None:
+                rules[key] = rule
+
+        # unchanged variables: the previous objects, the others parsed from their lines
+        for name, block in blocks.items():
+            text = [line.strip() for _, line in block]
+            previous = self._blocks.get(name)
+            if previous is not None and previous[0] == text:
+                parser.variables[name] = previous[1]
+            else:
+                for lineno, line in block:
+                    self._parse_line(parser, lineno, line)
+            blocks[name] = (text, parser.variables[name])
+
+        return parser.make_rule_base(), parser.measurements, rules, blocks
+
+    def _parse_line(self, parser, lineno, line):
+        try:
+            return parser.parse_line(line)
+        except _LineError as e:
+            raise RuleBaseSyntaxError(str(e), self.filename, lineno, e.column, line) from None
+
+    def start(self, interval=1.):
+        """Check the file for changes every 'interval' seconds in a background thread"""
+
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, args=(interval,), daemon=True,
+                                            name=f"reload {self.filename}")
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _watch(self, interval):
+        while not self._stop.wait(interval):
+            self.check()
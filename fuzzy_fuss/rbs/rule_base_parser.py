@@ -1,58 +1,353 @@
+import gc
 import re
 
+from fuzzy_fuss.fuzz.antecedent import Antecedent, Operand, Not, Hedge, And, Or
+from fuzzy_fuss.fuzz.fuzzy_rule import LinearConclusion
 from fuzzy_fuss.fuzz.fuzzy_rule_base import RuleBase
 
-from fuzzy_fuss.rbs.parsed_rule import ParsedRule, ParsedMeasurement
+from fuzzy_fuss.rbs.parsed_rule import ParsedRule, ParsedAtom, ParsedMeasurement
 from fuzzy_fuss.rbs.parsed_object import ParsedObjDict
-from fuzzy_fuss.rbs.parsed_variable import ParsedVariable
+from fuzzy_fuss.rbs.parsed_variable import ParsedVariable, ParsedTuple
+
+
+class RuleBaseSyntaxError(RuntimeError):
+    def __init__(self, message, filename=None, line=None, column=None, text=None):
+        self.message = message
+        self.filename = filename
+        self.line = line
+        self.column = column
+        self.text = text
+
+        location = ':'.join(str(p) for p in (filename, line, column) if p is not None)
+        super().__init__(f"{location + ': ' if location else ''}{message}" + (f"\n    {text}" if text else ''))
+
+
+class _LineError(Exception):
+    def __init__(self, message, column=1):
+        super().__init__(message)
+        self.column = column
 
 
 class RuleBaseParser(object):
+    """Single-pass parser of rule base files.
+
+    Each line is dispatched on its form: a measurement ('name = value'), a single word (the rule base name, then
+    variable names), a rule (leading 'Rule <number>') or a 4-tuple of the current variable. Rules in the usual
+    layout are split with string methods and their atoms cached; any other rule goes through a token scanner,
+    which also reads parentheses, 'not' (before an atom, a parenthesis or a value) and hedges before a value
+    ('x is very high'). A conclusion '<variable> = <linear function>' ('tip = 0.5 * service + 10') makes a
+    Takagi-Sugeno rule. Errors report the line and column of the offending token.
+    """
+
+    RULE_HEAD = re.compile(r'\s*(rule\s*\d+)\s*:?\s+if\s', re.IGNORECASE)
+    SEGMENT = re.compile(r'\s*(?:the\s+)?(\w+)\s+(?:is|will\s+be)\s+(?:the\s+)?(\w+)\s*', re.IGNORECASE)
+    WORD = re.compile(r'\w+')
+    NUMBER = re.compile(r'-?\d+(\.\d*)?')
+    TOKEN = re.compile(r'\S+')
+    RULE_TOKEN = re.compile(r'[()]|[^\s()]+')
+    LINEAR_HEAD = re.compile(r'\s*(?:the\s+)?(\w+)\s*=\s*')
+    LINEAR_TERM = re.compile(r'\s*(?P<sign>[+-])?\s*(?:(?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)(?:\s*\*\s*'
+                             r'(?P<name>[^\W\d]\w*))?|(?P<variable>[^\W\d]\w*)(?:\s*\*\s*'
+                             r'(?P<factor>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?))?)\s*')
+    SKIPPED = 'the'
+
     def __init__(self):
         self.rules = ParsedObjDict(ParsedRule)
         self.variables = {}
         self.measurements = ParsedObjDict(ParsedMeasurement, float)
         self.name = None
         self._current_name = None
+        self._atoms = {}
+        self._segments = {}
 
     def parse(self, filename):
         self.name = None
-        self.variables[None] = ParsedVariable(None)
+        self._current_name = None
 
         with open(filename) as f:
-            for line in f:
-                line = line.strip('\n')
-                if not line:
-                    continue
+            lines = f.read().splitlines()
 
-                if self.rules.parse(line) or self.measurements.parse(line) \
-                        or self.variables[self._current_name].parse(line):
-                    continue
+        # the parsed objects hold no reference cycles: collecting while allocating them only costs time
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            parse_rule, parse_line = self._parse_rule_fast, self.parse_line
+            for lineno, line in enumerate(lines, 1):
+                try:
+                    # rules in the usual layout go straight to the fast path, everything else is dispatched
+                    if line[:4] == 'Rule' and '=' not in line and parse_rule(line) is not None:
+                        continue
+                    parse_line(line)
+                except _LineError as e:
+                    raise RuleBaseSyntaxError(str(e), filename, lineno, e.column, line) from None
+        finally:
+            if gc_enabled:
+                gc.enable()
 
-                if not re.fullmatch(r'\s*\w+\s*', line):
-                    raise RuntimeError(f"Failed to match line: {line}")
+        self._current_name = None
 
-                line = line.strip(' ')
+        return self.make_rule_base(), self.measurements
 
-                if not self.name:
-                    self.name = line
-                else:
-                    self.variables[line] = ParsedVariable(line)
-                    self._current_name = line
+    def parse_line(self, line):
+        """Parse one line of a rule base file; returns the rule if the line is one"""
 
-        if len(self.variables[None]):
-            raise RuntimeError(f"Encountered 4-tuples for unspecified variables: {dict(self.variables[None].items())}")
-        self.variables.pop(None)
+        stripped = line.strip()
+        if not stripped:
+            return
 
-        self._current_name = None
+        if stripped[:4].lower() == 'rule':
+            rule = self._parse_rule_fast(stripped) if '=' not in stripped else None
+            if rule is not None:
+                return rule
+            head = self.RULE_HEAD.match(line)
+            if head:
+                return self._parse_rule(line, head)
 
-        return self.make_rule_base(), self.measurements
+        if '=' in stripped:
+            self._parse_measurement(line)
+            return
+
+        tokens = stripped.split()
+        if len(tokens) == 1:
+            self._parse_name(line, tokens[0])
+        else:
+            self._parse_tuple(line, tokens)
+
+    def _column(self, line, offset=0, index=0):
+        """Column (1-based) of the index-th token of the line, starting at the offset"""
+
+        starts = [m.start() for m in self.TOKEN.finditer(line, offset)]
+        return (starts[index] if index < len(starts) else len(line)) + 1
+
+    def _parse_name(self, line, name):
+        if not self.WORD.fullmatch(name):
+            raise _LineError(f"Invalid name '{name}'", self._column(line))
+
+        if not self.name:
+            self.name = name
+        else:
+            self.variables[name] = ParsedVariable(name)
+            self._current_name = name
+
+    def _parse_measurement(self, line):
+        name, _, value = line.partition('=')
+        name, value = name.strip(), value.strip()
+
+        if not self.WORD.fullmatch(name):
+            raise _LineError(f"Invalid variable name '{name}' in a measurement", self._column(line))
+
+        if not self.NUMBER.fullmatch(value):
+            raise _LineError(f"Invalid measurement value '{value}'", self._column(line, line.index('=') + 1))
+
+        self.measurements[name] = float(value)
+
+    def _parse_tuple(self, line, tokens):
+        if self._current_name is None:
+            raise _LineError("Encountered a 4-tuple before any variable name", self._column(line))
+
+        value_name, numbers = tokens[0], tokens[1:]
+        if not self.WORD.fullmatch(value_name):
+            raise _LineError(f"Invalid value name '{value_name}'", self._column(line))
+
+        if len(numbers) != 4:
+            raise _LineError(f"Expected a value name and 4 numbers, got {len(numbers)} numbers",
+                             self._column(line, index=min(len(tokens), 5)))
+
+        params = []
+        for i, number in enumerate(numbers):
+            try:
+                params.append(float(number))
+            except ValueError:
+                raise _LineError(f"Invalid number '{number}'", self._column(line, index=i + 1))
+
+        self.variables[self._current_name][value_name] = ParsedTuple(*params, value_name=value_name)
+
+    def _get_atom(self, variable, value):
+        key = (variable, value)
+        atom = self._atoms.get(key)
+        if atom is None:  # atoms repeat across rules: build each one once
+            atom = self._atoms[key] = ParsedAtom(key)
+        return atom
+
+    def _get_segment(self, text):
+        """Atom of a '<variable> is <value>' segment of a rule, or None"""
+
+        atom = self._segments.get(text)
+        if atom is None:
+            m = self.SEGMENT.fullmatch(text)
+            if not m:
+                return None
+            atom = self._segments[text] = self._get_atom(*m.groups())
+        return atom
+
+    def _parse_rule_fast(self, line):
+        """Parse a rule in the usual layout ('Rule <n>: if|If <atom> and|or ... then <atom>', lower-case connectives)
+        with string methods only; returns None to leave it to _parse_rule"""
+
+        head = line.find(' if ')
+        if head < 0:
+            head = line.find(' If ')
+        then = line.rfind(' then ')
+        if head < 0 or then < head or line[-1] == ' ':
+            return None
+
+        name = line[:head]
+        if name[-1] == ':':
+            name = name[:-1]
+        if not (name[4:].lstrip().isdecimal() and name[4:5] in ' 0123456789' and name[:4].lower() == 'rule'):
+            return None
+
+        # separate the atoms and the connectives with NUL characters, which cannot occur in a valid atom
+        parts = line[head + 4:then].replace(' and ', '\0and\0').replace(' or ', '\0or\0').split('\0')
+        segments = self._segments
+        atoms = tuple(map(segments.get, parts[::2]))
+        if None in atoms:
+            atoms = tuple(map(self._get_segment, parts[::2]))
+        conclusion = segments.get(line[then + 6:]) or self._get_segment(line[then + 6:])
+        if None in atoms or conclusion is None:
+            return None
+
+        rule = ParsedRule(name, atoms, parts[1::2], conclusion)
+        dict.__setitem__(self.rules, name, rule)  # known to be a ParsedRule
+        return rule
+
+    def _parse_rule(self, line, head):
+        matches = list(self.RULE_TOKEN.finditer(line, head.end() - 1))
+        tokens = [m.group() for m in matches]
+        lowered = [token.lower() for token in tokens]
+
+        if 'then' not in lowered:
+            raise _LineError("Expected 'then' in a rule", len(line) + 1)
+        then = len(lowered) - 1 - lowered[::-1].index('then')
+        linear = '=' in line[matches[then].end():]
+
+        try:
+            atoms = []
+            i, antecedent = self._read_expression(tokens, lowered, 0, then, atoms)
+            if i < then:
+                raise _LineError(f"Expected 'and', 'or' or 'then', got '{tokens[i]}'", i)
+
+            if not linear:
+                i, conclusion, modifiers = self._read_atom(tokens, lowered, then + 1, len(tokens))
+                if modifiers:
+                    raise _LineError(f"Unexpected '{modifiers[0][1]}' in the conclusion", modifiers[0][0])
+                if i < len(tokens):
+                    raise _LineError(f"Unexpected '{tokens[i]}' after the conclusion", i)
+
+        except _LineError as e:  # column holds the index of the token
+            raise _LineError(str(e), matches[e.column].start() + 1 if e.column < len(matches) else len(line) + 1)
+
+        if linear:
+            conclusion = self._read_linear(line, matches[then].end())
+
+        name = head.group(1)
+        connectives = antecedent.connectives()
+        if connectives is None:
+            rule = ParsedRule(name=name, prop_atoms=tuple(atoms), prop_connectives=None, conclusion=conclusion,
+                              antecedent=antecedent)
+        else:
+            rule = ParsedRule(name=name, prop_atoms=tuple(atoms), prop_connectives=connectives, conclusion=conclusion)
+        self.rules[name] = rule
+        return rule
+
+    def _read_expression(self, tokens, lowered, i, stop, atoms, connective='or'):
+        """Read operands joined by 'or' (or by 'and', which binds stronger); returns the next index and the tree"""
+
+        read = self._read_factor if connective == 'and' else \
+            lambda *args: self._read_expression(*args, connective='and')
+
+        i, operand = read(tokens, lowered, i, stop, atoms)
+        operands = [operand]
+        while i < stop and lowered[i] == connective:
+            i, operand = read(tokens, lowered, i + 1, stop, atoms)
+            operands.append(operand)
+
+        return i, (And if connective == 'and' else Or).of(operands)
+
+    def _read_factor(self, tokens, lowered, i, stop, atoms):
+        """Read 'not <factor>', '(<expression>)' or an atom; returns the next index and the tree"""
+
+        if i < stop and lowered[i] == 'not':
+            i, operand = self._read_factor(tokens, lowered, i + 1, stop, atoms)
+            return i, Not(operand)
+
+        if i < stop and tokens[i] == '(':
+            i, operand = self._read_expression(tokens, lowered, i + 1, stop, atoms)
+            if i >= stop or tokens[i] != ')':
+                raise _LineError("Expected ')'" + (f", got '{tokens[i]}'" if i < stop else ''), i)
+            return i + 1, operand
+
+        i, atom, modifiers = self._read_atom(tokens, lowered, i, stop)
+        operand = Operand(len(atoms))
+        atoms.append(atom)
+        for _, modifier in reversed(modifiers):  # the innermost modifier comes last
+            operand = Not(operand) if modifier == 'not' else Hedge(operand, Antecedent.HEDGES[modifier])
+
+        return i, operand
+
+    def _read_atom(self, tokens, lowered, i, stop):
+        """Read '<variable> is|will be [not] [<hedge>...] <value>' from the i-th token on.
+
+        Returns the next index, the atom and the modifiers ('not' and hedges) as (token index, word) pairs.
+        """
+
+        if i < stop and lowered[i] == self.SKIPPED:
+            i += 1
+        if i + 3 > stop:
+            raise _LineError("Expected '<variable> is <value>'", i)
+
+        start = i
+        if lowered[i + 1] == 'is':
+            i += 2
+        elif lowered[i + 1] == 'will' and lowered[i + 2] == 'be' and i + 4 <= stop:
+            i += 3
+        else:
+            raise _LineError(f"Expected 'is' or 'will be' after '{tokens[i]}', got '{tokens[i + 1]}'", i + 1)
+
+        # modifiers are words followed by another word of the atom (so that they remain valid value names)
+        modifiers = []
+        while i + 1 < stop and self.WORD.fullmatch(tokens[i + 1]) and lowered[i + 1] not in ('and', 'or') and \
+                (lowered[i] in Antecedent.HEDGES or lowered[i] == 'not' and not modifiers):
+            modifiers.append((i, lowered[i]))
+            i += 1
+
+        if lowered[i] == self.SKIPPED and i + 1 < stop and self.WORD.fullmatch(tokens[i + 1]):
+            i += 1
+
+        for j in (start, i):
+            if not self.WORD.fullmatch(tokens[j]):
+                raise _LineError(f"Invalid name '{tokens[j]}'", j)
+
+        return i + 1, self._get_atom(tokens[start], tokens[i]), modifiers
+
+    def _read_linear(self, line, start):
+        """Read the conclusion '<variable> = <linear function of the inputs>' of a Takagi-Sugeno rule from 'start' on,
+        e.g. 'tip = 0.5 * service - 2 * wait + 10'"""
+
+        head = self.LINEAR_HEAD.match(line, start)
+        if not head:
+            raise _LineError("Expected '<variable> = <linear function>' as the conclusion", self._column(line, start))
+
+        coefficients, i = {}, head.end()
+        while i < len(line.rstrip()):
+            term = self.LINEAR_TERM.match(line, i)
+            if not term or (not term.group('sign') and coefficients):
+                raise _LineError("Expected a term '[+|-] <number> [* <variable>]' or '[+|-] <variable> [* <number>]'",
+                                 self._column(line, i))
+
+            sign = -1. if term.group('sign') == '-' else 1.
+            number = term.group('number') or term.group('factor')
+            name = term.group('name') or term.group('variable') or ''
+            coefficients[name] = coefficients.get(name, 0.) + sign * (float(number) if number else 1.)
+            i = term.end()
+
+        if not coefficients:
+            raise _LineError("Expected a linear function after '='", len(line) + 1)
+
+        return LinearConclusion(head.group(1), coefficients)
 
     def make_rule_base(self):
         rulebase = RuleBase(self.name, self.variables)
-        for rule in self.rules.values():
-            rulebase.add_rule(rule)
+        rulebase.add_rules(self.rules.values())
 
         return rulebase
-
-
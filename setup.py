@@ -17,7 +17,7 @@ setuptools.setup(
     author="Dominika Dlugosz",
     author_email="dominika.a.m.dlugosz@gmail.com",
     description="Little fuzzy logic toolbox",
-    packages=setuptools.find_packages(exclude=['examples']),
+    packages=setuptools.find_packages(exclude=['examples', 'benchmarks']),
     python_requires='>=3.6',
     install_requires=['numpy>=1.16', 'matplotlib', 'pandas']
 )
@@ -0,0 +1,15 @@
+import io
+
+from benchmarks import suite
+
+
+def test_suite_runs_every_case_and_compares():
+    stream = io.StringIO()
+    results = suite.run(quick=True, repeat=1, min_time=1e-4, stream=stream)
+
+    assert {result['case'] for result in results} == set(suite.CASES)
+    assert all(result['best'] > 0 for result in results)
+    assert not suite._files  # generated rule bases removed
+
+    suite.compare(results, dict(results=results, environment=suite.environment()), stream=stream)
+    assert stream.getvalue().count('1.00x') == len(results)
@@ -0,0 +1,48 @@
+import os
+import struct
+
+import numpy as np
+import pytest
+
+from fuzzy_fuss.rbs.binary_rule_base import BinaryRuleBase
+from fuzzy_fuss.rbs.rule_base_parser import RuleBaseParser
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), os.pardir, 'examples')
+
+
+@pytest.mark.parametrize('source', ['tipping_expressions_rulebase.txt', 'temperature_alarm_rulebase.txt'])
+def test_round_trip(source, tmp_path):
+    rule_base, measurements = RuleBaseParser().parse(os.path.join(EXAMPLES, source))
+    filename = str(tmp_path / 'rulebase.fzrb')
+    BinaryRuleBase.save(filename, rule_base, measurements)
+
+    loaded, loaded_measurements = BinaryRuleBase.load_rule_base(filename)
+    assert loaded_measurements == dict(measurements)
+    assert [str(rule) for rule in loaded] == [str(rule) for rule in rule_base]
+    assert {var: list(loaded.variables[var]) for var in loaded.variables} == \
+        {var: list(rule_base.variables[var]) for var in rule_base.variables}
+    assert loaded.evaluate(dict(measurements)) == rule_base.evaluate(dict(measurements))
+
+    plan, _ = BinaryRuleBase.load(filename)
+    assert isinstance(plan.set_params, np.memmap) or isinstance(plan.set_params.base, np.memmap)
+    batch = {name: np.linspace(0, value * 2, 101) for name, value in measurements.items()}
+    expected, results = rule_base.compile().evaluate_batch(batch), plan.evaluate_batch(batch)
+    if not isinstance(expected, dict):
+        expected, results = {None: expected}, {None: results}
+    for name in expected:
+        np.testing.assert_array_equal(results[name], expected[name])
+
+
+def test_other_versions_are_rejected_and_rewritten(tmp_path):
+    source = os.path.join(EXAMPLES, 'tipping_rulebase.txt')
+    cache = str(tmp_path / 'tipping.fzrb')
+    BinaryRuleBase.load_cached(source, cache=cache)
+
+    with open(cache, 'r+b') as f:
+        f.seek(4)
+        f.write(struct.pack('<I', BinaryRuleBase.VERSION - 1))
+    with pytest.raises(ValueError, match='Unsupported version'):
+        BinaryRuleBase.load(cache)
+
+    BinaryRuleBase.load_cached(source, cache=cache)
+    assert BinaryRuleBase.load(cache)[0].rule_names
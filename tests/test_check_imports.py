@@ -0,0 +1,12 @@
+import io
+import os
+
+from benchmarks import check_imports
+
+
+def test_inference_modules_import_headless(monkeypatch):
+    monkeypatch.chdir(os.path.join(os.path.dirname(__file__), os.pardir))  # the probes import from here
+    stream = io.StringIO()
+
+    assert check_imports.check(stream=stream) == []
+    assert stream.getvalue().count(' ok\n') == len(check_imports.MODULES)
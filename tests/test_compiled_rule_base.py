@@ -0,0 +1,79 @@
+import os
+
+import numpy as np
+import pytest
+
+from fuzzy_fuss.rbs.rule_base_parser import RuleBaseParser
+from fuzzy_fuss.rbs.binary_rule_base import BinaryRuleBase
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), os.pardir, 'examples')
+
+
+@pytest.fixture
+def tsk():
+    rule_base, _ = RuleBaseParser().parse(os.path.join(EXAMPLES, 'tipping_tsk_rulebase.txt'))
+    rng = np.random.default_rng(0)
+    return rule_base, {'driving': rng.uniform(0, 100, 2000), 'journey_time': rng.uniform(0, 30, 2000)}
+
+
+def test_compiled_tsk_matches_evaluate_batch(tsk, tmp_path):
+    rule_base, batch = tsk
+    expected = rule_base.evaluate_batch(batch)
+
+    np.testing.assert_array_equal(rule_base.compile().evaluate_batch(batch), expected)
+
+    filename = str(tmp_path / 'tipping.fzrb')
+    BinaryRuleBase.save(filename, rule_base)
+    plan, _ = BinaryRuleBase.load(filename)
+    np.testing.assert_array_equal(plan.evaluate_batch(batch), expected)
+
+
+def test_parallel_tsk_matches_evaluate_batch(tsk):
+    rule_base, batch = tsk
+    np.testing.assert_array_equal(rule_base.evaluate_parallel(batch, workers=2, chunk_size=300),
+                                  rule_base.evaluate_batch(batch))
+
+
+def test_wide_antecedents_are_not_expanded():
+    from fuzzy_fuss.fuzz.antecedent import And, Antecedent, Operand, Or
+
+    # AND of 10 ORs of 4 atoms: 4 ** 10 groups if expanded
+    antecedent = And([Or([Operand(4 * i + j) for j in range(4)]) for i in range(10)])
+    assert antecedent.groups(list(range(40))) == [()]
+
+    small = And([Or([Operand(0), Operand(1)]), Operand(2)])
+    assert small.groups(list(range(3))) == [(0, 2), (1, 2)]
+    assert len(Or([small] * Antecedent.MAX_GROUPS).groups(list(range(3)))) == 1
+
+
+def test_unindexed_rules_are_always_evaluated(monkeypatch):
+    from fuzzy_fuss.fuzz.antecedent import Antecedent
+
+    filename = os.path.join(EXAMPLES, 'tipping_expressions_rulebase.txt')
+    rule_base, measurements = RuleBaseParser().parse(filename)
+    expected = rule_base.evaluate(dict(measurements))
+
+    monkeypatch.setattr(Antecedent, 'MAX_GROUPS', 0)
+    rule_base, measurements = RuleBaseParser().parse(filename)
+    assert sorted(set(rule_base._get_index()['always_active'])) == list(range(len(rule_base)))
+    assert rule_base.evaluate(dict(measurements)) == expected
+
+
+@pytest.mark.parametrize('exact', [False, True])
+def test_compiled_matches_evaluate_batch(exact):
+    rule_base, _ = RuleBaseParser().parse(os.path.join(EXAMPLES, 'tipping_expressions_rulebase.txt'))
+    rng = np.random.default_rng(2)
+    batch = {'driving': rng.uniform(0, 100, 500), 'journey_time': rng.uniform(0, 30, 500)}
+
+    np.testing.assert_allclose(rule_base.compile().evaluate_batch(batch, grid_size=0.5, exact=exact),
+                               rule_base.evaluate_batch(batch, grid_size=0.5, exact=exact), rtol=1e-9)
+
+
+def test_compiled_is_immutable():
+    rule_base, _ = RuleBaseParser().parse(os.path.join(EXAMPLES, 'tipping_rulebase.txt'))
+    compiled = rule_base.compile()
+
+    with pytest.raises(AttributeError):
+        compiled.name = 'changed'
+    with pytest.raises(ValueError):
+        compiled.set_params[0, 0] = 0.
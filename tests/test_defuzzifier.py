@@ -0,0 +1,27 @@
+import pytest
+
+from fuzzy_fuss.fuzz.func import Func, Trapezoid, Triangle
+from fuzzy_fuss.fuzz.defuzzifier import Defuzzifier
+
+
+def narrow_peak():
+    """Plateau at 0.2 over [0, 1000] and a peak at 505, narrower than the initial adaptive grid"""
+
+    return Trapezoid(0, 0, 1000, 1000).cut(0.2) + Triangle(500, 505, 510)
+
+
+@pytest.mark.parametrize('method', Defuzzifier.METHODS)
+def test_adaptive_narrow_peak(method):
+    func = narrow_peak()
+    assert 10 < (func.support[1] - func.support[0]) / Defuzzifier.ADAPTIVE_INTERVALS
+
+    expected = Defuzzifier.defuzzify(func, method=method, exact=True)
+    assert Defuzzifier.defuzzify(func, method=method, tolerance=0.01) == pytest.approx(expected, abs=1e-6)
+
+
+@pytest.mark.parametrize('method', ('som', 'lom', 'mom'))
+def test_adaptive_narrow_peak_without_breakpoints(method):
+    plateau = Func(formula=lambda x: 0.2 + 0. * x, support=(0, 1000))
+    peak = Func(formula=Triangle(500, 505, 510), support=(500, 510))
+
+    assert Defuzzifier.defuzzify(plateau + peak, method=method, tolerance=0.01) == pytest.approx(505.)
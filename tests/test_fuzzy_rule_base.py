@@ -0,0 +1,86 @@
+import os
+
+import numpy as np
+import pytest
+
+from fuzzy_fuss.fuzz.fuzzy_rule_base import RuleBase
+from fuzzy_fuss.rbs.rule_base_parser import RuleBaseParser
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), os.pardir, 'examples')
+
+
+@pytest.fixture
+def tipping():
+    rule_base, _ = RuleBaseParser().parse(os.path.join(EXAMPLES, 'tipping_rulebase.txt'))
+    rng = np.random.default_rng(1)
+    return rule_base, {'driving': rng.uniform(0, 100, 50), 'journey_time': rng.uniform(0, 30, 50)}
+
+
+@pytest.mark.parametrize('composition', ['max-min', 'max-product'])
+def test_evaluate_batch_matches_evaluate(tipping, composition):
+    rule_base, batch = tipping
+    results = rule_base.evaluate_batch(batch, grid_size=0.5, composition=composition)
+
+    expected = [rule_base.evaluate({name: float(values[i]) for name, values in batch.items()}, grid_size=0.5,
+                                   composition=composition) for i in range(len(results))]
+    np.testing.assert_allclose(results, [np.nan if value is None else value for value in expected], rtol=1e-9)
+
+
+def test_outputs_evaluated_in_one_pass_match_separate_rule_bases():
+    rule_base, measurements = RuleBaseParser().parse(os.path.join(EXAMPLES, 'temperature_alarm_rulebase.txt'))
+    rng = np.random.default_rng(4)
+    batch = {'temperature': rng.uniform(0, 550, 40), 'current': rng.uniform(0, 30, 40)}
+
+    results, batch_results = rule_base.evaluate(dict(measurements)), rule_base.evaluate_batch(batch)
+    assert sorted(results) == sorted(batch_results) == ['alarm', 'change']
+    for name in results:
+        single = RuleBase(rule_base.name, rule_base.variables)
+        single.add_rules(rule for rule in rule_base if rule.conclusion[0] == name)
+        assert results[name] == single.evaluate(dict(measurements))
+        np.testing.assert_array_equal(batch_results[name], single.evaluate_batch(batch))
+
+
+def test_degree_table_gives_the_rule_weights():
+    rule_base, _ = RuleBaseParser().parse(os.path.join(EXAMPLES, 'tipping_expressions_rulebase.txt'))
+    measurements = {'driving': np.array([10., 55., 90.]), 'journey_time': np.array([3., 12., 25.])}
+    degrees = rule_base.fuzzify(measurements)
+
+    for (variable, value), row in rule_base.antecedent_index.items():
+        np.testing.assert_array_equal(degrees[row], rule_base.variables[variable][value].get_values(
+            measurements[variable]))
+    weights = rule_base.compute_weights(measurements, degrees=degrees)
+    for rule in rule_base:
+        np.testing.assert_array_equal(weights[rule.name], rule.compute_weight(rule_base.variables, measurements))
+
+
+def test_active_rules_are_the_firing_rules():
+    rule_base, _ = RuleBaseParser().parse(os.path.join(EXAMPLES, 'tipping_expressions_rulebase.txt'))
+    rng = np.random.default_rng(5)
+
+    skipped = 0
+    for driving, journey_time in zip(rng.uniform(0, 100, 200), rng.uniform(0, 30, 200)):
+        measurements = {'driving': driving, 'journey_time': journey_time}
+        degrees = rule_base.fuzzify(measurements)
+        active = set(rule_base.active_rules(degrees).tolist())
+        weights = rule_base.compute_weights(measurements, degrees=degrees)
+        assert {r for r, rule in enumerate(rule_base) if weights[rule.name] > 0} <= active
+        skipped += len(rule_base) - len(active)
+    assert skipped
+
+
+def test_profile_records_stages_without_changing_results():
+    rule_base, measurements = RuleBaseParser().parse(os.path.join(EXAMPLES, 'tipping_rulebase.txt'))
+    expected = rule_base.evaluate(dict(measurements))
+
+    calls = []
+    stats = rule_base.profile(hook=lambda stage, elapsed, counters: calls.append(stage))
+    assert rule_base.evaluate(dict(measurements)) == expected
+    rule_base.evaluate_batch({name: [value] * 3 for name, value in measurements.items()})
+
+    assert stats.evaluations == 2
+    assert set(stats.times) <= set(stats.STAGES) and 'fuzzification' in stats.times
+    assert calls and set(calls) == set(stats.calls)
+    assert stats.counters['rows'] >= 3
+
+    rule_base.profile(False)
+    assert rule_base.stats is None
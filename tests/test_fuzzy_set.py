@@ -0,0 +1,17 @@
+import numpy as np
+
+from fuzzy_fuss.fuzz.func import Maximum, Trapezoid
+from fuzzy_fuss.fuzz.fuzzy_set import FuzzySet
+
+
+def test_union_is_one_node_equal_to_the_sum():
+    fsets = [FuzzySet(Trapezoid(i, i + 1, i + 2, i + 4), variable_name='x', value_name=f"v{i}").cut(0.5 + i / 100)
+             for i in range(50)]
+    union = FuzzySet.union(*fsets)
+
+    assert type(union.membership_function) is Maximum
+    assert len(union.membership_function.operands) == len(fsets)
+    assert union.variable_name == 'x'
+    data = np.linspace(-1, 55, 1001)
+    np.testing.assert_array_equal(union.get_values(data), sum(fsets).get_values(data))
+    assert FuzzySet.union(fsets[0]) is fsets[0]
@@ -0,0 +1,30 @@
+import numpy as np
+
+from fuzzy_fuss.fuzz.fuzzy4tuple import Fuzzy4Tuple
+from fuzzy_fuss.fuzz.fuzzy_set_array import FuzzySetArray
+
+
+def test_array_matches_its_sets():
+    rng = np.random.default_rng(7)
+    a = rng.uniform(0, 100, 300)
+    fsets = FuzzySetArray(a, a + rng.uniform(0, 10, 300), rng.uniform(0, 5, 300), rng.uniform(0, 5, 300),
+                          variable_names=['x', 'y'] * 150, value_names=[f"v{i % 7}" for i in range(300)])
+    assert len(fsets.variable_table) == 2 and len(fsets.value_table) == 7
+
+    data = np.linspace(-10, 120, 53)
+    expected = np.stack([fset.get_values(data) for fset in fsets], axis=1)
+    np.testing.assert_allclose(fsets.memberships(data), expected, rtol=1e-12, atol=1e-15)
+    np.testing.assert_allclose(fsets.evaluate(a), [fset.get_values(x) for fset, x in zip(fsets, a)])
+
+    fset = fsets[-1]
+    assert isinstance(fset, Fuzzy4Tuple)
+    assert (fset.variable_name, fset.value_name) == ('y', 'v5')
+    assert (fset.a, fset.b, fset.alpha, fset.beta) == tuple(float(p[-1]) for p in fsets.params)
+
+    selected = fsets.select(variable_name='x', value_name='v0')
+    assert len(selected) == sum(1 for i in range(300) if i % 2 == 0 and i % 7 == 0)
+    assert set(selected.variable_names) == {'x'} and set(selected.value_names) == {'v0'}
+
+    copied = FuzzySetArray.from_sets(list(fsets))
+    np.testing.assert_array_equal(copied.corners(), fsets.corners())
+    assert list(copied.value_names) == list(fsets.value_names)
@@ -0,0 +1,41 @@
+import io
+import os
+import sys
+import subprocess
+
+import numpy as np
+import pytest
+
+from examples.fuzzy_system import read_chunks
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), os.pardir, 'examples')
+
+
+def test_csv_chunks():
+    stream = io.StringIO("x, y\n1,2\n\n3,4\n5,6\n")
+    chunks = list(read_chunks(stream, 'csv', 2, {'z': 7.}))
+
+    assert [sorted(chunk) for chunk in chunks] == [['x', 'y', 'z']] * 2
+    np.testing.assert_array_equal(np.concatenate([chunk['x'] for chunk in chunks]), [1, 3, 5])
+    np.testing.assert_array_equal(np.concatenate([chunk['y'] for chunk in chunks]), [2, 4, 6])
+
+
+@pytest.mark.parametrize('text, message', [
+    ("x,y\n1,2\n90\n3,4\n", "Line 3: expected 2 values"),
+    ("x,y\n1,2\n3,4,5\n", "Line 3: expected 2 values"),
+    ("x,y\n1,2\n60,\n", "Line 3: invalid value of variable y: ''"),
+    ("x,y\n1,a\n", "Line 2: invalid value of variable y: 'a'"),
+])
+def test_csv_invalid_rows(text, message):
+    with pytest.raises(ValueError, match=message):
+        list(read_chunks(io.StringIO(text), 'csv', 10, {}))
+
+
+@pytest.mark.parametrize('option', [['--stream', '-'], ['--serve', '0']])
+def test_tolerance_is_rejected_for_batches(option):
+    result = subprocess.run([sys.executable, 'fuzzy_system.py', 'tipping_rulebase.txt', '--tolerance', '0.01', *option],
+                            cwd=EXAMPLES, env={**os.environ, 'PYTHONPATH': os.pardir, 'MPLBACKEND': 'Agg'},
+                            stdin=subprocess.DEVNULL, capture_output=True, text=True, timeout=60)
+
+    assert result.returncode == 2
+    assert '--tolerance cannot be used with --stream or --serve' in result.stderr
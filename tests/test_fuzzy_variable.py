@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from fuzzy_fuss.fuzz.func import Trapezoid, Triangle
+from fuzzy_fuss.fuzz.fuzzy_set import FuzzySet
+from fuzzy_fuss.fuzz.fuzzy_variable import FuzzyVariable
+
+
+@pytest.fixture
+def variable():
+    rng = np.random.default_rng(6)
+    variable = FuzzyVariable('x')
+    for i, (a, d) in enumerate(np.sort(rng.uniform(0, 100, (200, 2)), axis=1)):
+        variable[f"t{i}"] = FuzzySet(Trapezoid(a, a + (d - a) / 3, d - (d - a) / 3, d) if i % 2 else
+                                     Triangle(a, (a + d) / 2, d))
+    return variable
+
+
+def test_nonzero_values_match_memberships(variable):
+    data = np.concatenate([np.linspace(-5, 105, 777), variable._get_interval_index()['endpoints']])
+    dense = variable.memberships(data)
+
+    sparse = variable.get_nonzero_values(data)
+    np.testing.assert_array_equal(sparse.to_dense(), dense)
+    assert np.all(sparse.values != 0)
+    assert variable.get_nonzero_values(data[100]) == {name: v for name, v in zip(variable, dense[100]) if v}
+
+
+def test_memberships_in_chunks_and_into_a_buffer(variable, monkeypatch):
+    from fuzzy_fuss.fuzz.func import PiecewiseLinear
+
+    variable['curve'] = FuzzySet(PiecewiseLinear([10, 40, 70], [0, 1, 0]))  # evaluated on its own
+    data = np.linspace(-5, 105, 1001)
+    expected = np.stack([fset.get_values(data) for fset in variable.values()], axis=1)
+
+    monkeypatch.setattr(FuzzyVariable, 'CHUNK_SIZE', 64)
+    out = np.full((len(data), len(variable)), np.nan)
+    assert variable.memberships(data, out=out) is out
+    np.testing.assert_array_equal(out, expected)
+    np.testing.assert_array_equal(variable.memberships(data[3]), expected[3])
+    with pytest.raises(ValueError):
+        variable.memberships(data, out=np.empty((len(data), 1)))
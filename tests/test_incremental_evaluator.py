@@ -0,0 +1,47 @@
+import pytest
+
+from fuzzy_fuss.rbs.rule_base_parser import RuleBaseParser
+
+# 'tax' only appears in a linear conclusion, never in an antecedent
+RULE_BASE = """tippingTax
+
+Rule 1: If driving is good and journey_time is short then tip = 1.5 * driving + 40
+Rule 2: If driving is average or journey_time is medium then tip = driving - 2 * journey_time + 60
+Rule 3: If not driving is bad and journey_time is very long then tip = 50 + 2 * tax
+
+driving
+
+bad 0 30 0 20
+average 50 50 20 20
+good 80 100 20 0
+
+journey_time
+
+short 0 0 0 10
+medium 10 10 5 5
+long 20 20 10 0
+
+journey_time = 18
+driving = 60
+tax = 3
+"""
+
+
+@pytest.fixture
+def parsed(tmp_path):
+    filename = tmp_path / 'rulebase.txt'
+    filename.write_text(RULE_BASE)
+    return RuleBaseParser().parse(filename)
+
+
+def test_update_input_of_linear_conclusions_only(parsed):
+    rule_base, measurements = parsed
+    evaluator = rule_base.incremental(measurements)
+    assert evaluator.value == pytest.approx(rule_base.evaluate(measurements))
+
+    for tax in (5., 8., 8., -1.):
+        measurements['tax'] = tax
+        assert evaluator.update(tax=tax) == pytest.approx(rule_base.evaluate(measurements))
+
+    measurements.update(driving=65., tax=2.)
+    assert evaluator.update(driving=65., tax=2.) == pytest.approx(rule_base.evaluate(measurements))
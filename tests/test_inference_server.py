@@ -0,0 +1,47 @@
+import os
+import json
+import asyncio
+
+import numpy as np
+
+from fuzzy_fuss.fuzz.inference_server import InferenceServer
+from fuzzy_fuss.rbs.rule_base_parser import RuleBaseParser
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), os.pardir, 'examples')
+
+
+def test_server_round_trip():
+    rule_base, measurements = RuleBaseParser().parse(os.path.join(EXAMPLES, 'temperature_alarm_rulebase.txt'))
+    server = InferenceServer(rule_base, max_batch=8, max_delay=0.05, defaults={'current': 17.}, grid_size=0.5)
+    temperatures = np.linspace(0, 550, 20)
+    expected = rule_base.compile().evaluate_batch({'temperature': temperatures, 'current': 17.}, grid_size=0.5)
+
+    async def session():
+        listening = asyncio.get_running_loop().create_future()
+        serving = asyncio.ensure_future(server.serve('127.0.0.1', 0, ready=listening.set_result))
+        port = (await listening).sockets[0].getsockname()[1]
+
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        requests = [{'id': i, 'temperature': t} for i, t in enumerate(temperatures.tolist())]
+        requests += [{'id': 'bad', 'temperature': 'hot'}]
+        writer.write(''.join(json.dumps(request) + '\n' for request in requests).encode())
+        await writer.drain()
+        responses = [json.loads(await reader.readline()) for _ in requests]
+
+        writer.write(b'{"op": "stats"}\n')
+        stats = json.loads(await reader.readline())
+        writer.close()
+        serving.cancel()
+        await asyncio.gather(serving, return_exceptions=True)
+        return responses, stats
+
+    responses, stats = asyncio.run(asyncio.wait_for(session(), 30))
+
+    by_id = {response.pop('id'): response for response in responses}
+    assert 'Invalid value of variable temperature' in by_id.pop('bad')['error']
+    for i in range(len(temperatures)):
+        for name in expected:
+            value = by_id[i][name]
+            assert np.isnan(expected[name][i]) if value is None else value == expected[name][i]
+    assert stats['requests'] == len(temperatures) and stats['errors'] == 1
+    assert stats['batches'] < len(temperatures)  # pipelined requests batched together
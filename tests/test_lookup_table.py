@@ -0,0 +1,32 @@
+import os
+
+import numpy as np
+
+from fuzzy_fuss.fuzz.lookup_table import LookupTable
+from fuzzy_fuss.rbs.rule_base_parser import RuleBaseParser
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), os.pardir, 'examples')
+
+
+def test_table_error_bound_and_round_trip(tmp_path):
+    rule_base, _ = RuleBaseParser().parse(os.path.join(EXAMPLES, 'tipping_tsk_rulebase.txt'))
+    table = LookupTable.build(rule_base, {'driving': (0, 100, 41), 'journey_time': (0, 30, 31)}, exact=True)
+
+    # exact on the grid points, within the measured error at the cell centres
+    grid = np.meshgrid(*table.axes, indexing='ij')
+    points = {name: g.ravel() for name, g in zip(table.names, grid)}
+    np.testing.assert_allclose(table(points), rule_base.evaluate_batch(points, exact=True), equal_nan=True)
+    centres = {name: (axis[1:] + axis[:-1]) / 2 for name, axis in zip(table.names, table.axes)}
+    centres = dict(zip(centres, (g.ravel() for g in np.meshgrid(*centres.values(), indexing='ij'))))
+    error = np.abs(table(centres) - rule_base.evaluate_batch(centres, exact=True))
+    assert 0 < table.max_error == np.nanmax(error)
+
+    # scalar and array paths agree
+    assert np.isclose(table(driving=37.3, journey_time=12.1),
+                      table({'driving': np.array([37.3]), 'journey_time': np.array([12.1])})[0])
+
+    filename = str(tmp_path / 'table.npz')
+    table.save(filename)
+    loaded = LookupTable.load(filename)
+    assert loaded.names == table.names and loaded.max_error == table.max_error
+    np.testing.assert_array_equal(loaded.values, table.values)
@@ -0,0 +1,22 @@
+import os
+
+import numpy as np
+
+from fuzzy_fuss.fuzz.parallel import ParallelEvaluator
+from fuzzy_fuss.rbs.rule_base_parser import RuleBaseParser
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), os.pardir, 'examples')
+
+
+def test_parallel_matches_evaluate_batch_in_order():
+    rule_base, _ = RuleBaseParser().parse(os.path.join(EXAMPLES, 'temperature_alarm_rulebase.txt'))
+    rng = np.random.default_rng(3)
+    batch = {'temperature': rng.uniform(0, 550, 1001), 'current': rng.uniform(0, 30, 1001)}
+    expected = rule_base.compile().evaluate_batch(batch, grid_size=0.5)
+
+    with ParallelEvaluator(rule_base, workers=2) as evaluator:
+        results = evaluator.evaluate_batch(batch, chunk_size=97, grid_size=0.5)
+
+    assert sorted(results) == sorted(expected) == ['alarm', 'change']
+    for name in expected:
+        np.testing.assert_array_equal(results[name], expected[name])
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from fuzzy_fuss.fuzz import piecewise
+from fuzzy_fuss.fuzz.defuzzifier import Defuzzifier
+
+
+def trapezoids(n, seed=0):
+    rng = np.random.default_rng(seed)
+    corners = np.sort(rng.uniform(0, 100, (n, 4)), axis=1)
+    return [piecewise.trapezoid(*params, height=height) for params, height in zip(corners, rng.uniform(0, 1, n))]
+
+
+@pytest.mark.parametrize('minimum', (False, True))
+def test_envelope_of_many_functions(minimum):
+    functions = trapezoids(4 * piecewise.ENVELOPE_GROUP + 5)
+    grid = np.linspace(-1, 101, 10001)
+    reduce = np.min if minimum else np.max
+    expected = reduce([piecewise.evaluate(xs, ys, grid) for xs, ys in functions], axis=0)
+
+    xs, ys = piecewise.envelope(functions, minimum=minimum)
+    np.testing.assert_allclose(piecewise.evaluate(xs, ys, grid), expected, atol=1e-12)
+
+
+@pytest.mark.parametrize('composition', Defuzzifier.COMPOSITIONS)
+def test_defuzzify_trapezoids_collapses_rules(composition):
+    params = np.array([[0, 10, 20, 30], [20, 30, 40, 50], [40, 50, 60, 70]] * 3, dtype=float)
+    weights = np.random.default_rng(0).uniform(0, 1, (len(params), 20))
+    weights[:, 5] = weights[:, 4]
+
+    batch = Defuzzifier.defuzzify_trapezoids(params, weights, composition=composition)
+    for i in range(weights.shape[1]):
+        set_weights = weights[:, i].reshape(3, 3).max(axis=0)
+        expected = Defuzzifier.defuzzify_trapezoids(params[:3], set_weights, composition=composition)
+        assert batch[i] == pytest.approx(expected)
+
+
+def test_set_algebra_stays_piecewise_linear():
+    from fuzzy_fuss.fuzz.func import PiecewiseLinear, Trapezoid, Triangle
+
+    f, g = Trapezoid(10, 20, 40, 60), Triangle(30, 55, 80)
+    grid = np.linspace(0, 100, 2001)
+    cases = [(f.cut(.6), np.minimum(f(grid), .6)), (-g, 1 - g(grid)), (f * .5, .5 * f(grid)),
+             ((f + g).cut(.7) * .5, .5 * np.minimum(np.maximum(f(grid), g(grid)), .7))]
+
+    for func, expected in cases:
+        assert func.breakpoints is not None
+        np.testing.assert_allclose(func(grid), expected, atol=1e-12)
+    assert all(isinstance(func, PiecewiseLinear) for func, _ in cases[:3])
+    np.testing.assert_allclose((f * g)(grid), np.minimum(f(grid), g(grid)), atol=1e-12)
@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+from fuzzy_fuss.rbs.reloadable_rule_base import ReloadableRuleBase
+from fuzzy_fuss.rbs.rule_base_parser import RuleBaseParser, RuleBaseSyntaxError
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), os.pardir, 'examples')
+
+
+@pytest.fixture
+def rule_base_file(tmp_path):
+    with open(os.path.join(EXAMPLES, 'tipping_rulebase.txt')) as f:
+        text = f.read()
+    filename = tmp_path / 'tipping.txt'
+    filename.write_text(text)
+    return filename, text
+
+
+def test_reload_keeps_unchanged_objects(rule_base_file, monkeypatch):
+    filename, text = rule_base_file
+    reloadable = ReloadableRuleBase(str(filename))
+    before = reloadable.rule_base
+
+    parsed = []
+    parse_line = RuleBaseParser.parse_line
+    monkeypatch.setattr(RuleBaseParser, 'parse_line', lambda self, line: parsed.append(line.strip())
+                        or parse_line(self, line))
+    filename.write_text(text.replace('long 20 20 10 0', 'long 25 25 10 0')
+                        .replace('then tip is small', 'then tip is moderate'))
+    assert reloadable.reload()
+
+    after = reloadable.rule_base
+    assert after is not before
+    assert after.variables['driving'] is before.variables['driving']
+    assert after.variables['journey_time'] is not before.variables['journey_time']
+    assert after['Rule 1'] is before['Rule 1']
+    assert after['Rule 4'] is not before['Rule 4']
+    assert not [line for line in parsed if line.startswith(('driving', 'bad', 'average', 'good')) and '=' not in line]
+    assert 'long 25 25 10 0' in parsed
+
+
+def test_failed_reload_keeps_the_version(rule_base_file):
+    filename, text = rule_base_file
+    reloadable = ReloadableRuleBase(str(filename))
+    version = reloadable.version
+
+    filename.write_text(text.replace('long 20 20 10 0', 'long 20 x 10 0'))
+    assert not reloadable.reload()
+    assert isinstance(reloadable.error, RuleBaseSyntaxError)
+    assert reloadable.error.line == text.splitlines().index('long 20 20 10 0') + 1
+    assert reloadable.version is version
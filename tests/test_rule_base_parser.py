@@ -0,0 +1,28 @@
+import os
+
+import pytest
+
+from fuzzy_fuss.rbs.rule_base_parser import RuleBaseParser, RuleBaseSyntaxError
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), os.pardir, 'examples')
+
+
+def test_syntax_error_reports_line_and_column(tmp_path):
+    filename = tmp_path / 'broken.txt'
+    filename.write_text("broken\n\nRule 1: if x is low then y is high\n\nx\n\nlow 0 1 x 1\n")
+
+    with pytest.raises(RuleBaseSyntaxError) as info:
+        RuleBaseParser().parse(str(filename))
+
+    assert (info.value.line, info.value.column) == (7, 9)
+    assert info.value.text == 'low 0 1 x 1'
+
+
+def test_connective_case_does_not_change_rules():
+    parser = RuleBaseParser()
+    lower = parser.parse_line('Rule 1: If driving is good and journey_time is short or tip is big then tip is big')
+    upper = parser.parse_line('RULE 2: IF driving is good AND journey_time is short OR tip is big THEN tip is big')
+
+    assert lower.prop_atoms == upper.prop_atoms
+    assert lower.prop_connectives == upper.prop_connectives == ['and', 'or']
+    assert lower.conclusion == upper.conclusion